@@ -0,0 +1,33 @@
+# app/db/pool.py
+"""
+Connection pools that time checkouts (db_pool_checkout_wait_seconds).
+
+The pool has no "about to check out" event, so the wait is measured around
+the public Pool.connect(): time blocked on a busy pool, opening a connection
+when the pool grows into its overflow, and the pre-ping. Only public pool
+API is overridden, so SQLAlchemy patch releases can't silently break it.
+"""
+import time
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from ..services import metrics
+
+
+class _TimedCheckout:
+    metrics_name = ""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            metrics.pool_wait.observe(time.perf_counter() - started, self.metrics_name)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    metrics_name = "sync"
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    metrics_name = "async"
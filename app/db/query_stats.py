@@ -0,0 +1,144 @@
+# app/db/query_stats.py
+"""
+Per-request SQL instrumentation.
+
+before/after_cursor_execute hooks on the engines (installed from
+db/session.py) time every statement. Inside a request, QueryStatsMiddleware
+puts a QueryStats in a contextvar, so the count, total DB time and the
+slowest few statements add up per request: threadpool handlers and async
+sessions copy the context, and they all share the one object. The totals go
+out as a Server-Timing header (visible in the browser's network panel).
+
+Statements slower than SLOW_QUERY_MS are logged on the "app.sql" logger,
+in or out of a request, with bound parameter values redacted to their type
+(form fields, emails and password hashes pass through here). A request whose
+DB time adds up past the same threshold is logged with its slowest statements.
+"""
+import heapq
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from ..settings import get_settings
+
+settings = get_settings()
+log = logging.getLogger("app.sql")
+
+TOP_N = 3                # slowest statements kept per request
+STATEMENT_PREVIEW = 300  # chars of SQL kept / logged
+
+_current: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+
+
+class QueryStats:
+    __slots__ = ("count", "total", "slowest", "_lock")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0                                # seconds
+        self.slowest: List[Tuple[float, str]] = []      # min-heap of (seconds, statement)
+        self._lock = threading.Lock()
+
+    def record(self, duration: float, statement: str) -> None:
+        with self._lock:
+            self.count += 1
+            self.total += duration
+            item = (duration, statement[:STATEMENT_PREVIEW])
+            if len(self.slowest) < TOP_N:
+                heapq.heappush(self.slowest, item)
+            elif duration > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, item)
+
+    def top(self) -> List[Tuple[float, str]]:
+        return sorted(self.slowest, reverse=True)
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.total * 1000:.1f};desc="{self.count} queries"'
+
+
+def current() -> Optional[QueryStats]:
+    return _current.get()
+
+
+def redact(params: Any) -> Any:
+    """Bound parameters with the values replaced by their type (and length)."""
+    def one(v):
+        if v is None:
+            return None
+        if isinstance(v, (str, bytes)):
+            return f"<{type(v).__name__}:{len(v)}>"
+        return f"<{type(v).__name__}>"
+    if isinstance(params, dict):
+        return {k: one(v) for k, v in params.items()}
+    if isinstance(params, (list, tuple)):
+        # executemany passes a sequence of parameter sets
+        if params and isinstance(params[0], (dict, list, tuple)):
+            return [redact(p) for p in params[:3]] + (["..."] if len(params) > 3 else [])
+        return [one(v) for v in params]
+    return one(params)
+
+
+def _before(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.record(duration, statement)
+    if settings.slow_query_ms and duration * 1000 >= settings.slow_query_ms:
+        log.warning(
+            "slow query %.1fms: %s params=%r",
+            duration * 1000, " ".join(statement.split())[:STATEMENT_PREVIEW], redact(parameters),
+        )
+
+
+def install(engine: Engine) -> None:
+    """Attach the timing hooks to `engine` (idempotent)."""
+    if not event.contains(engine, "before_cursor_execute", _before):
+        event.listen(engine, "before_cursor_execute", _before)
+        event.listen(engine, "after_cursor_execute", _after)
+
+
+class QueryStatsMiddleware:
+    """Gives each HTTP request its own QueryStats and reports it in Server-Timing."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = QueryStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and settings.server_timing:
+                headers = MutableHeaders(scope=message)
+                app_ms = (time.perf_counter() - started) * 1000
+                headers.append("Server-Timing", f"{stats.server_timing()}, app;dur={app_ms:.1f}")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            if settings.slow_query_ms and stats.total * 1000 >= settings.slow_query_ms:
+                # the request as a whole spent too long in the DB: say where
+                log.warning(
+                    "%s %s: %d queries, %.1fms in DB; slowest: %s",
+                    scope["method"], scope["path"], stats.count, stats.total * 1000,
+                    "; ".join(f"{d * 1000:.1f}ms {' '.join(sql.split())[:120]}" for d, sql in stats.top()),
+                )
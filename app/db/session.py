@@ -1,34 +1,71 @@
 # app/db/session.py
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
 from ..settings import get_settings
+from ..services import metrics
+from . import query_stats
+from .pool import TimedAsyncQueuePool, TimedQueuePool
 
 settings = get_settings()
 
-# Auto-detect and use appropriate PostgreSQL driver
+# psycopg 3 drives both engines: it speaks asyncio natively
 database_url = settings.database_url
 if database_url.startswith("postgresql://"):
-    # Try psycopg3 first (for production), fall back to psycopg2 (for local dev)
-    try:
-        import psycopg
-        database_url = database_url.replace("postgresql://", "postgresql+psycopg://", 1)
-    except ImportError:
-        try:
-            import psycopg2
-            database_url = database_url.replace("postgresql://", "postgresql+psycopg2://", 1)
-        except ImportError:
-            # Fall back to default PostgreSQL driver
-            pass
+    database_url = database_url.replace("postgresql://", "postgresql+psycopg://", 1)
+
+
+def pool_limits(limit: int):
+    """(pool_size, max_overflow) for a pool of at most `limit` connections: a third kept open."""
+    limit = max(1, limit)
+    size = max(1, limit // 3)
+    return size, limit - size
+
+
+# DB_MAX_CONNECTIONS caps both pools together (per worker process), so adding
+# the async engine didn't raise the worst-case Postgres connection count.
+# `async def` handlers use the async one, sync handlers and background jobs the sync one.
+ASYNC_CONNECTIONS = settings.db_max_connections // 2
+SYNC_POOL = pool_limits(settings.db_max_connections - ASYNC_CONNECTIONS)
+ASYNC_POOL = pool_limits(ASYNC_CONNECTIONS)
 
 engine = create_engine(
     database_url,
     pool_pre_ping=True,
     future=True,
-    pool_size=5,
-    max_overflow=10,
+    pool_size=SYNC_POOL[0],
+    max_overflow=SYNC_POOL[1],
     pool_recycle=3600,
+    poolclass=TimedQueuePool,
 )
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+# per-request query count / DB time / slow-query log (db/query_stats.py)
+query_stats.install(engine)
+# pool occupancy on /metrics (services/metrics.py)
+metrics.register_pool("sync", engine.pool)
+
+# Async path for `async def` handlers: a sync Session there blocks the event loop
+# (and every other in-flight request) for the length of each query.
+class AsyncBridgeSession(Session):
+    """Sync session class behind AsyncSession; session events attach here."""
+
+
+async_engine = create_async_engine(
+    database_url,
+    pool_pre_ping=True,
+    pool_size=ASYNC_POOL[0],
+    max_overflow=ASYNC_POOL[1],
+    pool_recycle=3600,
+    poolclass=TimedAsyncQueuePool,
+)
+query_stats.install(async_engine.sync_engine)
+metrics.register_pool("async", async_engine.sync_engine.pool)
+# expire_on_commit=False: templates read attributes after the handler commits,
+# and an expired attribute can't lazy-load outside the greenlet
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, expire_on_commit=False, autoflush=False, sync_session_class=AsyncBridgeSession
+)
+
 
 # Dependency (for FastAPI)
 def get_db():
@@ -37,3 +74,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Async dependency: use from `async def` handlers
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
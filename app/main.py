@@ -7,21 +7,34 @@ from typing import List
 
 from fastapi import FastAPI, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import HTMLResponse, PlainTextResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from starlette.templating import Jinja2Templates
 from starlette.middleware.sessions import SessionMiddleware
+from starlette.concurrency import run_in_threadpool
 from typing import Optional
 
 from .settings import get_settings
 
 # --- NEW: DB imports for dev-only table creation ---
 from .db.base import Base
-from .db.session import engine, SessionLocal
+from .db.session import engine, SessionLocal, AsyncBridgeSession
 from .models.site import Hours, SiteSetting
 # Import models so SQLAlchemy knows about them before create_all()
-from .models import user, menu, events, musician, rentals, site  # noqa: F401
+from .models import user, menu, events, musician, rentals, site, media, outbox, stats  # noqa: F401
+from .services import counters, invalidation, media_store
+from .db.query_stats import QueryStatsMiddleware
+from .services.conditional import ConditionalGetMiddleware
+from .services import metrics
+from .services import assets, image_meta, images
+from .services.static_files import CachedStaticFiles, PrecompressedGZipMiddleware
+
+# Evict cached data whenever a session commits changes to the rows behind it
+invalidation.install(SessionLocal)
+invalidation.install(AsyncBridgeSession)
+# Keep the dashboard's stat_counters in step with the same commits
+counters.install(SessionLocal)
+counters.install(AsyncBridgeSession)
 
 
 
@@ -42,7 +55,7 @@ ASSETS_DIR = os.path.join(os.path.dirname(BASE_DIR), "assets")
 templates = Jinja2Templates(directory=TEMPLATES_DIR)
 app.templates = templates
 # Serve /static (app-bundled JS/CSS/uploads) and /assets (brand images)
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+app.mount("/static", CachedStaticFiles(directory=STATIC_DIR), name="static")
 if os.path.isdir(ASSETS_DIR):
     app.mount("/assets", StaticFiles(directory=ASSETS_DIR), name="assets")
 
@@ -56,8 +69,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# gzip responses for speed
-app.add_middleware(GZipMiddleware, minimum_size=1024)
+# gzip responses for speed (built assets are precompressed, see services/assets.py)
+app.add_middleware(PrecompressedGZipMiddleware, minimum_size=1024)
 
 # Session handling
 app.add_middleware(
@@ -69,6 +82,17 @@ app.add_middleware(
     https_only=(settings.environment.lower() == "production")
 )
 
+# Conditional GET (ETag / 304) for handlers tagged with @etag / @cached_page.
+# Added after the app-level middleware so it can answer 304 before any of it runs.
+app.add_middleware(ConditionalGetMiddleware)
+
+# Request latency / size / status for /metrics; inside QueryStats so it can
+# read the request's query count, outside ConditionalGet so 304s are counted
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Outermost: per-request SQL counts/timings -> Server-Timing (db/query_stats.py)
+app.add_middleware(QueryStatsMiddleware)
+
 # ---------- Template globals ----------
 def template_globals(request: Request) -> dict:
     """Values available in all templates."""
@@ -87,6 +111,16 @@ def template_globals(request: Request) -> dict:
 
 templates.env.globals.update(template_globals=template_globals)
 
+# Fingerprinted /static + /assets URLs: {{ asset_url('/static/css/custom.css') }}
+assets.load()
+templates.env.globals["asset_url"] = assets.asset_url
+# Absolute URLs: {{ PUBLIC_URL }}{{ asset_url(...) }} (cached pages can't use request.url_for)
+templates.env.globals["PUBLIC_URL"] = settings.public_url.rstrip("/")
+# Resized images: {{ img_url(item.image_url, 800) }}, srcset="{{ srcset(item.image_url) }}"
+templates.env.globals.update(img_url=images.img_url, srcset=images.srcset)
+# <img {{ img_attrs(item.image) }}>: width/height + color/preview placeholder (services/image_meta.py)
+templates.env.globals["img_attrs"] = image_meta.img_attrs
+
 # ---------- Routers (mounted if present) ----------
 def _safe_include(prefix: str, router_path: str, router_name: str) -> None:
     """
@@ -148,6 +182,8 @@ def _get_site_settings():
 
 # public pages (/)
 _safe_include("", "app.routers.public", "router")
+# resized images (/img/*)
+_safe_include("", "app.routers.images", "router")
 # JSON APIs (/api/*)
 _safe_include("/api", "app.routers.api.menu", "router")
 _safe_include("/api", "app.routers.api.events", "router")
@@ -261,6 +297,27 @@ async def home(request: Request):
 async def healthz() -> str:
     return "ok"
 
+def _metrics_allowed(request: Request) -> bool:
+    import hmac
+    from .security.auth import get_current_admin
+    if get_current_admin(request):
+        return True
+    token = settings.metrics_token
+    auth = request.headers.get("authorization", "")
+    if token and hmac.compare_digest(auth.encode(), f"Bearer {token}".encode()):
+        return True
+    # behind a proxy every client looks local, so the IP allowlist only
+    # applies to requests that didn't come through one
+    if "x-forwarded-for" in request.headers:
+        return False
+    return bool(request.client) and request.client.host in settings.metrics_allow_ips
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics_endpoint(request: Request) -> Response:
+    if not _metrics_allowed(request):
+        return PlainTextResponse("Not Found", status_code=status.HTTP_404_NOT_FOUND)
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/robots.txt", response_class=PlainTextResponse)
 async def robots() -> str:
     # Allow indexing, point to sitemap
@@ -304,8 +361,9 @@ async def not_found(request: Request, exc):
     # Render a friendly 404 if template exists; fallback to text otherwise
     template_path = os.path.join(TEMPLATES_DIR, "public", "404.html")
     if os.path.isfile(template_path):
+        from .routers.public import ctx
         return templates.TemplateResponse(
-            "public/404.html", template_globals(request), status_code=status.HTTP_404_NOT_FOUND
+            "public/404.html", await ctx(request), status_code=status.HTTP_404_NOT_FOUND
         )
     return PlainTextResponse("Not Found", status_code=status.HTTP_404_NOT_FOUND)
 
@@ -315,3 +373,27 @@ async def startup_event():
     if settings.environment and settings.environment.lower() == "development":
         print("[DEV MODE] Creating database tables if not present...")
         Base.metadata.create_all(bind=engine)
+    # background delivery of queued form submissions
+    from .services.forms import dispatcher
+    dispatcher.start()
+    # keep weather / reviews warm so requests only read the cache
+    from .services.integrations import integrations
+    integrations.start()
+    # recount dashboard counters now, then periodically / after bulk writes
+    counters.reconciler.start()
+    # remove uploaded media no menu item / event uses any more
+    media_store.collector.start()
+    # index the resized-image disk cache off the event loop
+    await run_in_threadpool(images.disk_cache.load)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    from .services.forms import dispatcher
+    from .services.http_client import close_client
+    from .services.integrations import integrations
+    await dispatcher.stop()
+    await integrations.stop()
+    await counters.reconciler.stop()
+    await media_store.collector.stop()
+    images.shutdown()
+    await close_client()
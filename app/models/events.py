@@ -15,3 +15,6 @@ class Event(Base):
     venue_area  = Column(String(80), default="Deck")   # e.g., Deck, Indoors
     is_published = Column(Boolean, default=True)
     ticket_url  = Column(String(255), default="")      # future-friendly
+    # recurrence (see services/recurrence.py): start/end describe the first occurrence
+    rrule       = Column(String(255), nullable=True)   # e.g. "FREQ=WEEKLY;BYDAY=TH"
+    exdates     = Column(Text, nullable=True)          # skipped dates: "2025-12-25,2026-01-01"
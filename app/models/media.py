@@ -0,0 +1,25 @@
+# app/models/media.py
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from ..db.base import Base
+
+class MediaBlob(Base):
+    """One content-addressed file under static/media/cas (see services/media_store.py)."""
+    __tablename__ = "media_blobs"
+
+    sha256     = Column(String(64), primary_key=True)
+    url        = Column(String(255), nullable=False, unique=True)   # /static/media/cas/ab/<sha256>.jpg
+    mime       = Column(String(40), nullable=False)
+    size       = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class MediaMeta(Base):
+    """Probed once per image URL so pages can size and placeholder it (see services/image_meta.py)."""
+    __tablename__ = "media_meta"
+
+    url        = Column(String(255), primary_key=True)   # MenuItem/Event.image_url
+    width      = Column(Integer, nullable=False)
+    height     = Column(Integer, nullable=False)
+    color      = Column(String(7), nullable=False)       # dominant color, "#a0522d"
+    lqip       = Column(Text, nullable=False)            # data:image/webp;base64,... (a few hundred bytes)
+    created_at = Column(DateTime, default=datetime.utcnow)
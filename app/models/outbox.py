@@ -0,0 +1,20 @@
+# app/models/outbox.py
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Index
+from ..db.base import Base
+
+class OutboxMessage(Base):
+    """A form submission waiting to be forwarded (see services/forms.py)."""
+    __tablename__ = "outbox"
+
+    id              = Column(Integer, primary_key=True, index=True)
+    kind            = Column(String(30), nullable=False)            # musician|rental|contact -> Formspree endpoint
+    payload         = Column(JSON, nullable=False)
+    status          = Column(String(20), nullable=False, default="pending")  # pending|sent|dead|skipped
+    attempts        = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error      = Column(Text, nullable=True)
+    created_at      = Column(DateTime, default=datetime.utcnow)
+    sent_at         = Column(DateTime, nullable=True)
+
+    __table_args__ = (Index("ix_outbox_due", "status", "next_attempt_at"),)
@@ -0,0 +1,13 @@
+# app/models/stats.py
+from datetime import datetime
+from sqlalchemy import Column, String, BigInteger, DateTime
+from ..db.base import Base
+
+class StatCounter(Base):
+    """A maintained row count (see services/counters.py)."""
+    __tablename__ = "stat_counters"
+
+    metric     = Column(String(40), primary_key=True)              # rentals, menu_items, events, ...
+    bucket     = Column(String(80), primary_key=True, default="")  # "" = total, "status=new", "month=2025-10"
+    value      = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
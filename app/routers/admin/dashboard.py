@@ -1,11 +1,9 @@
 from fastapi import APIRouter, Request, Depends
 from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session
-from ...db.session import get_db
-from ...models.rentals import Rental
-from ...models.menu import MenuItem
-from ...models.events import Event
+from sqlalchemy.ext.asyncio import AsyncSession
+from ...db.session import get_async_db
 from ...security.auth import admin_required
+from ...services.counters import read_counters
 
 router = APIRouter()
 
@@ -19,28 +17,18 @@ def ctx(request: Request, **kw):
     return base
 
 @router.get("", response_class=HTMLResponse)
-async def admin_dashboard(request: Request, db: Session = Depends(get_db)):
+async def admin_dashboard(request: Request, db: AsyncSession = Depends(get_async_db)):
     admin_required(request)
     
-    # Get dashboard stats
+    # Get dashboard stats: maintained counters (services/counters.py), one small read
     try:
-        # Count new rentals
-        new_rentals = db.query(Rental).filter(Rental.status == "new").count()
-        total_rentals = db.query(Rental).count()
-        
-        # Count menu items
-        total_menu_items = db.query(MenuItem).count()
-        featured_items = db.query(MenuItem).filter(MenuItem.featured_rank > 0).count()
-        
-        # Count events
-        total_events = db.query(Event).count()
-        
+        c = await read_counters(db, "rentals", "menu_items", "events")
         stats = {
-            'new_rentals': new_rentals,
-            'total_rentals': total_rentals,
-            'total_menu_items': total_menu_items,
-            'featured_items': featured_items,
-            'total_events': total_events
+            'new_rentals': c["rentals"].get("status=new", 0),
+            'total_rentals': c["rentals"].get("", 0),
+            'total_menu_items': c["menu_items"].get("", 0),
+            'featured_items': c["menu_items"].get("featured=yes", 0),
+            'total_events': c["events"].get("", 0)
         }
     except Exception:
         stats = {
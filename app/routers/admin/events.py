@@ -1,12 +1,17 @@
 from fastapi import APIRouter, Request, Form, status, Depends, File, UploadFile, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional
-from ...db.session import get_db
+from ...db.session import get_async_db, get_db
 from ...models.events import Event
 from ...security.auth import admin_required
-from ...services.media import save_upload, delete_media
+from ...services.cache import cache
+from ...services.pagination import is_htmx_request, paginate, parse_date
+from ...services.media import save_upload, delete_media_later
+from ...services.recurrence import RecurrenceError, parse_exdates, parse_rrule
 import os
 
 router = APIRouter()
@@ -16,11 +21,48 @@ def ctx(request: Request, **kw):
     base.update(kw)
     return base
 
+def recurrence_fields(rrule: str | None, exdates: str | None):
+    """Validate the optional repeat rule / skipped dates; blank means one-off."""
+    rrule = (rrule or "").strip() or None
+    exdates = (exdates or "").strip() or None
+    try:
+        if rrule:
+            parse_rrule(rrule)
+        parse_exdates(exdates)
+    except RecurrenceError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid repeat rule: {e}")
+    return rrule, exdates
+
 @router.get("/events", response_class=HTMLResponse)
-def events_page(request: Request, db: Session = Depends(get_db)):
+async def events_page(request: Request, db: AsyncSession = Depends(get_async_db)):
     admin_required(request)
-    events = db.query(Event).order_by(Event.start.desc()).all()
-    return request.app.templates.TemplateResponse("admin/events.html", ctx(request, events=events))
+    query = select(Event)
+    state = request.query_params.get("state")  # published | draft
+    area = request.query_params.get("area")
+    date_from = parse_date(request.query_params.get("from"), "from")
+    date_to = parse_date(request.query_params.get("to"), "to")
+    if state in ("published", "draft"):
+        query = query.where(Event.is_published.is_(state == "published"))
+    if area and area != "all":
+        query = query.where(Event.venue_area == area)
+    if date_from:
+        query = query.where(Event.start >= date_from)
+    if date_to:
+        query = query.where(Event.start < date_to + timedelta(days=1))
+    filtered = any([state in ("published", "draft"), area not in (None, "", "all"), date_from, date_to])
+
+    page = await paginate(db, request, query, Event.start, Event.id, "events", filtered)
+    if is_htmx_request(request) and request.query_params.get("cursor"):
+        return request.app.templates.TemplateResponse("admin/_events_rows.html", ctx(request, page=page))
+
+    async def load_areas():
+        return [a for a in (await db.scalars(select(Event.venue_area).distinct())).all() if a]
+    areas = await cache.get_or_set_async("event_areas", load_areas, ttl=600, tags=("events",))
+    return request.app.templates.TemplateResponse(
+        "admin/events.html",
+        ctx(request, page=page, areas=areas, active_state=state or "all", active_area=area or "all",
+            date_from=request.query_params.get("from", ""), date_to=request.query_params.get("to", "")),
+    )
 
 @router.post("/events/create")
 async def create_event(
@@ -29,10 +71,13 @@ async def create_event(
     start: str = Form(...),  # datetime-local
     end: str | None = Form(None),  # datetime-local
     description: str | None = Form(None),
+    rrule: str | None = Form(None),
+    exdates: str | None = Form(None),
     image: Optional[UploadFile] = File(None),
     db: Session = Depends(get_db),
 ):
     admin_required(request)
+    rrule, exdates = recurrence_fields(rrule, exdates)
     # Parse HTML datetime-local → ISO (no timezone)
     start_dt = datetime.fromisoformat(start)
     end_dt = datetime.fromisoformat(end) if end else None
@@ -42,7 +87,8 @@ async def create_event(
     if image and image.filename:
         image_url = await save_upload(image, subdir="events")
 
-    e = Event(title=title, start=start_dt, end=end_dt, description=description or "", image_url=image_url)
+    e = Event(title=title, start=start_dt, end=end_dt, description=description or "", image_url=image_url,
+              rrule=rrule, exdates=exdates)
     db.add(e)
     db.commit()
     return RedirectResponse("/admin/events", status_code=status.HTTP_302_FOUND)
@@ -56,11 +102,12 @@ def delete_event(
     admin_required(request)
     e = db.get(Event, event_id)
     if e:
-        # Clean up associated image file (both local and cloud)
-        if e.image_url:
-            delete_media(e.image_url)
+        image_url = e.image_url
         db.delete(e)
         db.commit()
+        # Clean up associated image file (both local and cloud)
+        if image_url:
+            delete_media_later(image_url)
     return RedirectResponse("/admin/events", status_code=status.HTTP_302_FOUND)
 
 @router.get("/events/edit/{event_id}", response_class=HTMLResponse)
@@ -79,6 +126,8 @@ async def update_event(
     start: str = Form(...),
     end: str | None = Form(None),
     description: str | None = Form(None),
+    rrule: str | None = Form(None),
+    exdates: str | None = Form(None),
     image: Optional[UploadFile] = File(None),
     db: Session = Depends(get_db),
 ):
@@ -86,21 +135,26 @@ async def update_event(
     event = db.query(Event).get(event_id)
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
+    rrule, exdates = recurrence_fields(rrule, exdates)
     
     # Handle image replacement
+    old_image_url = None
     if image and image.filename:
-        # Clean up old image file (both local and cloud)
-        if event.image_url:
-            delete_media(event.image_url)
-        # Save new image
+        # Save new image; the old one is removed once the save has committed
         new_image_url = await save_upload(image, subdir="events")
-        event.image_url = new_image_url
+        if new_image_url:
+            old_image_url = event.image_url
+            event.image_url = new_image_url
     
     # Update other fields
     event.title = title.strip()
     event.start = datetime.fromisoformat(start)
     event.end = datetime.fromisoformat(end) if end else None
     event.description = (description or "").strip() or None
+    event.rrule = rrule
+    event.exdates = exdates
     
     db.commit()
+    if old_image_url:
+        delete_media_later(old_image_url)
     return RedirectResponse("/admin/events", status_code=status.HTTP_302_FOUND)
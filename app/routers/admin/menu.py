@@ -11,7 +11,8 @@ from sqlalchemy.orm import Session, joinedload
 from ...db.session import get_db
 from ...models.menu import MenuItem, MenuCategory, MenuTag, MenuItemTag
 from ...security.auth import admin_required
-from ...services.media import save_upload, delete_media
+from ...services.media import save_upload, delete_media_later
+from ...services.menu_search import search_item_ids
 
 router = APIRouter()
 
@@ -24,6 +25,8 @@ def menu_dashboard(request: Request, db: Session = Depends(get_db)):
     admin_required(request)
 
     q = (request.query_params.get("q") or "").strip()
+    tag_filter = request.query_params.getlist("tag")
+    cat_filter = request.query_params.getlist("category")
     categories = db.query(MenuCategory).order_by(MenuCategory.sort_order.asc(), MenuCategory.name.asc()).all()
     tags = db.query(MenuTag).order_by(MenuTag.type.asc(), MenuTag.name.asc()).all()
 
@@ -31,8 +34,10 @@ def menu_dashboard(request: Request, db: Session = Depends(get_db)):
         joinedload(MenuItem.tags),
         joinedload(MenuItem.category_rel)
     )
-    if q:
-        query = query.filter(MenuItem.name.ilike(f"%{q}%"))
+    if q or tag_filter or cat_filter:
+        # resolve the filter against the in-memory index, then load just those rows
+        ids = search_item_ids(q, tags=tag_filter, categories=cat_filter)
+        query = query.filter(MenuItem.id.in_(ids))
     items = query.order_by(MenuItem.name.asc()).all()
 
     featured = (
@@ -89,14 +94,12 @@ async def update_item(
         raise HTTPException(status_code=404, detail="Item not found")
     
     # Handle image replacement
+    old_image_url = None
     if image and image.filename:
-        # Clean up old image if it exists
-        if item.image_url:
-            delete_media(item.image_url)  # Works for both cloud and local images
-        
-        # Upload new image
+        # Upload new image; the old one is removed once the save has committed
         new_image_url = await save_upload(image, subdir="menu")
         if new_image_url:
+            old_image_url = item.image_url
             item.image_url = new_image_url
     
     # Update other fields
@@ -130,6 +133,8 @@ async def update_item(
             db.add(MenuItemTag(item_id=item.id, tag_id=t.id))
     
     db.commit()
+    if old_image_url:
+        delete_media_later(old_image_url)  # Works for both cloud and local images
     return RedirectResponse("/admin/menu", status_code=status.HTTP_303_SEE_OTHER)
 
 @router.post("/menu/feature")
@@ -222,9 +227,7 @@ def delete_item(request: Request, item_id: int, db: Session = Depends(get_db)):
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     
-    # Clean up image file if it exists
-    if item.image_url:
-        delete_media(item.image_url)  # Works for both cloud and local images
+    image_url = item.image_url
     
     # delete tag links first (delete one by one to avoid SQLAlchemy issues)
     try:
@@ -240,6 +243,9 @@ def delete_item(request: Request, item_id: int, db: Session = Depends(get_db)):
         db.rollback()
         print(f"Error deleting item: {e}")
         raise HTTPException(status_code=500, detail=f"Could not delete item: {str(e)}")
+    # Clean up image file once the item is gone
+    if image_url:
+        delete_media_later(image_url)  # Works for both cloud and local images
     return RedirectResponse("/admin/menu", status_code=status.HTTP_303_SEE_OTHER)
 
 # Keep existing category and tag creation routes
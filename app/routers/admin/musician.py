@@ -1,10 +1,14 @@
 # app/routers/admin/musician.py
+from datetime import timedelta
 from fastapi import APIRouter, Request, Form, Depends
 from fastapi.responses import HTMLResponse, RedirectResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ...db.session import get_db
+from ...db.session import get_async_db, get_db
 from ...models.musician import MusicianApp
 from ...security.auth import admin_required
+from ...services.pagination import is_htmx_request, paginate, parse_date
 
 router = APIRouter()
 
@@ -12,16 +16,32 @@ def ctx(request: Request, **kw):
     base = {"request": request}
     base.update(kw); return base
 
+STATUSES = ["new", "contacted", "booked", "closed"]
+
 @router.get("/musician", response_class=HTMLResponse)
-def musician_list(request: Request, db: Session = Depends(get_db)):
+async def musician_list(request: Request, db: AsyncSession = Depends(get_async_db)):
     admin_required(request)
-    apps = (
-        db.query(MusicianApp)
-        .order_by(MusicianApp.submitted_at.desc())
-        .limit(200)
-        .all()
+    query = select(MusicianApp)
+    status = request.query_params.get("status")
+    date_from = parse_date(request.query_params.get("from"), "from")
+    date_to = parse_date(request.query_params.get("to"), "to")
+    if status and status != "all":
+        query = query.where(MusicianApp.status == status)
+    if date_from:
+        query = query.where(MusicianApp.submitted_at >= date_from)
+    if date_to:
+        query = query.where(MusicianApp.submitted_at < date_to + timedelta(days=1))
+    filtered = any([status not in (None, "", "all"), date_from, date_to])
+
+    page = await paginate(db, request, query, MusicianApp.submitted_at, MusicianApp.id,
+                          "musician_applications", filtered)
+    if is_htmx_request(request) and request.query_params.get("cursor"):
+        return request.app.templates.TemplateResponse("admin/_musician_cards.html", ctx(request, page=page))
+    return request.app.templates.TemplateResponse(
+        "admin/musician.html",
+        ctx(request, page=page, statuses=STATUSES, active_status=status or "all",
+            date_from=request.query_params.get("from", ""), date_to=request.query_params.get("to", "")),
     )
-    return request.app.templates.TemplateResponse("admin/musician.html", ctx(request, apps=apps))
 
 @router.post("/musician/status")
 def musician_status(request: Request, id: int = Form(...), status: str = Form(...), db: Session = Depends(get_db)):
@@ -1,10 +1,14 @@
 # app/routers/admin/rentals.py
+from datetime import timedelta
 from fastapi import APIRouter, Request, Form, Depends, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse
-from sqlalchemy.orm import Session
-from ...db.session import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ...db.session import get_async_db
 from ...models.rentals import Rental
 from ...security.auth import admin_required
+from ...services.cache import cache
+from ...services.pagination import is_htmx_request, paginate, parse_date
 from ...settings import get_settings
 
 router = APIRouter()
@@ -20,37 +24,46 @@ def ctx(request: Request, **kw):
     return base
 
 @router.get("/rentals", response_class=HTMLResponse)
-async def rentals_list(request: Request, db: Session = Depends(get_db)):
+async def rentals_list(request: Request, db: AsyncSession = Depends(get_async_db)):
     # Ensure user is authenticated
     admin_required(request)
     
-    # Get rentals with sorting and basic filtering
-    query = db.query(Rental).order_by(Rental.date.desc())
-    
-    # Get filter parameters
+    # Filters (pushed into SQL; the page is a keyset slice on (date, id))
+    query = select(Rental)
     status = request.query_params.get("status")
     area = request.query_params.get("area")
-    
+    date_from = parse_date(request.query_params.get("from"), "from")
+    date_to = parse_date(request.query_params.get("to"), "to")
+
     if status and status != "all":
-        query = query.filter(Rental.status == status)
+        query = query.where(Rental.status == status)
     if area and area != "all":
-        query = query.filter(Rental.venue_area == area)
-    
-    # Get rentals
-    rentals = query.limit(200).all()
-    
-    # Get unique areas for filter dropdown
-    areas = db.query(Rental.venue_area).distinct().all()
-    areas = [a[0] for a in areas if a[0]]  # Remove None values
-    
+        query = query.where(Rental.venue_area == area)
+    if date_from:
+        query = query.where(Rental.date >= date_from)
+    if date_to:
+        query = query.where(Rental.date < date_to + timedelta(days=1))
+    filtered = any([status not in (None, "", "all"), area not in (None, "", "all"), date_from, date_to])
+
+    page = await paginate(db, request, query, Rental.date, Rental.id, "rentals", filtered)
+    if is_htmx_request(request) and request.query_params.get("cursor"):
+        return request.app.templates.TemplateResponse("admin/_rentals_rows.html", ctx(request, page=page))
+
+    # Unique areas for the filter dropdown (a full scan, so cached until a rental changes)
+    async def load_areas():
+        return [a for a in (await db.scalars(select(Rental.venue_area).distinct())).all() if a]
+    areas = await cache.get_or_set_async("rental_areas", load_areas, ttl=600, tags=("rentals",))
+
     return request.app.templates.TemplateResponse(
         "admin/rentals.html",
         ctx(
             request,
-            rows=rentals,
+            page=page,
             areas=areas,
             active_status=status or "all",
-            active_area=area or "all"
+            active_area=area or "all",
+            date_from=request.query_params.get("from", ""),
+            date_to=request.query_params.get("to", ""),
         )
     )
 
@@ -59,7 +72,7 @@ async def update_status(
     request: Request,
     id: int = Form(...),
     status: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Ensure user is authenticated
     admin_required(request)
@@ -70,12 +83,12 @@ async def update_status(
         raise HTTPException(status_code=400, detail="Invalid status")
     
     # Update rental status
-    rental = db.query(Rental).filter(Rental.id == id).first()
+    rental = await db.get(Rental, id)
     if not rental:
         raise HTTPException(status_code=404, detail="Rental not found")
     
     rental.status = status
-    db.commit()
+    await db.commit()
     
     # Redirect back to rentals page
     return RedirectResponse(
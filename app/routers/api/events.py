@@ -1,17 +1,25 @@
 # app/routers/api/events.py
 from fastapi import APIRouter, Query, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from datetime import datetime
-from ...db.session import get_db
+from datetime import datetime, timedelta
+from ...db.session import get_async_db, get_db
 from ...models.events import Event
+from ...services.conditional import etag
+from ...services.event_timeline import events_json, join_json
+from ...services.image_meta import attach as attach_image_meta
+from ...services.recurrence import expand
 
 router = APIRouter(tags=["Events"])
 
-def _iso(dt: datetime | None) -> str | None:
-    return dt.isoformat() if dt else None
+# FullCalendar asks for about six weeks; a longer window would expand
+# recurring events over years on the DB fallback path
+MAX_RANGE = timedelta(days=366)
 
 @router.get("/events/data")
+@etag("events")
 def events_data(
     start: str = Query(..., description="ISO date from FullCalendar"),
     end: str   = Query(..., description="ISO date from FullCalendar"),
@@ -23,33 +31,41 @@ def events_data(
         end_dt   = datetime.fromisoformat(end.replace("Z", ""))
     except Exception:
         return JSONResponse({"ok": False, "error": "bad_range"}, status_code=400)
+    # events are stored as naive wall-clock times; drop any offset FullCalendar sends
+    start_dt = start_dt.replace(tzinfo=None)
+    end_dt = end_dt.replace(tzinfo=None)
+    if end_dt < start_dt or end_dt - start_dt > MAX_RANGE:
+        return JSONResponse({"ok": False, "error": "bad_range"}, status_code=400)
+
+    body = events_json(start_dt, end_dt)
+    if body is not None:
+        return Response(body, media_type="application/json")
 
-    q = (
+    # outside the in-memory horizon: ask the DB
+    rows = (
         db.query(Event)
+          .filter(Event.is_published == True)  # noqa: E712
           .filter(Event.start <= end_dt)
-          .filter((Event.end == None) | (Event.end >= start_dt))
+          .filter((Event.rrule != None) | (func.coalesce(Event.end, Event.start) >= start_dt))  # noqa: E711
           .order_by(Event.start.asc())
+          .all()
     )
-    return [
-        {
-            "id": e.id,
-            "title": e.title,
-            "start": _iso(e.start),
-            "end": _iso(e.end),
-            "description": e.description or "",
-        }
-        for e in q.all()
-    ]
+    attach_image_meta(db, rows)
+    occurrences = sorted(
+        (o for e in rows for o in expand(e, start_dt, end_dt)),
+        key=lambda o: o.start,
+    )
+    return Response(join_json(occurrences), media_type="application/json")
 
 # Keep existing endpoints if they exist
 @router.get("/events")
-def get_events(db: Session = Depends(get_db)):
+@etag("events")
+async def get_events(db: AsyncSession = Depends(get_async_db)):
     """Get all upcoming events for display on public pages."""
-    events = (
-        db.query(Event)
-        .filter(Event.start >= datetime.now())
+    events = await db.scalars(
+        select(Event)
+        .where(Event.start >= datetime.now())
         .order_by(Event.start.asc())
         .limit(6)
-        .all()
     )
-    return events
+    return events.all()
@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 from ...db.session import get_db
 from ...models.musician import MusicianApp
 from ...models.rentals import Rental
+from ...services.forms import dispatcher, enqueue
 from datetime import datetime
 
 router = APIRouter()
@@ -29,7 +30,14 @@ async def musician_submit(
         link=(link or "").strip(), message=(message or "").strip() or None,
         submitted_at=datetime.utcnow(), status="new"
     )
-    db.add(row); db.commit(); db.refresh(row)
+    db.add(row)
+    # forwarded to Formspree in the background; committed with the row
+    enqueue(db, "musician", {
+        "name": row.name, "email": row.email, "phone": row.phone, "genre": row.genre,
+        "link": row.link, "message": row.message or "",
+    })
+    db.commit(); db.refresh(row)
+    dispatcher.notify()
 
     # Successfully saved to database
     return JSONResponse({"success": True, "id": row.id, "message": "Musician application submitted successfully"}, status_code=200)
@@ -62,7 +70,13 @@ async def rental_submit(
         submitted_at=datetime.utcnow(),  # Add this missing field
         status="new"
     )
-    db.add(row); db.commit(); db.refresh(row)
+    db.add(row)
+    enqueue(db, "rental", {
+        "name": row.name, "email": row.email, "phone": row.phone,
+        "date": date_str or "", "party_size": row.party_size, "message": row.message or "",
+    })
+    db.commit(); db.refresh(row)
+    dispatcher.notify()
 
     # Successfully saved to database
     return JSONResponse({"success": True, "id": row.id, "message": "Venue rental request submitted successfully"}, status_code=200)
@@ -70,10 +84,13 @@ async def rental_submit(
 @router.post("/contact")
 async def contact_submit(
     request: Request,
+    db: Session = Depends(get_db),
     name: str = Form(...),
     email: str = Form(...),
     message: str = Form(...),
 ):
-    # For now, just return success since there's no contact model
-    # You might want to add a Contact model later or handle this differently
+    # No contact model: the outbox row is the record until it's forwarded
+    enqueue(db, "contact", {"name": name.strip(), "email": email.strip(), "message": message.strip()})
+    db.commit()
+    dispatcher.notify()
     return JSONResponse({"success": True, "message": "Contact message received"}, status_code=200)
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from ...db.session import get_db
+from ...services import media_store
+from ...services.conditional import etag
+from ...services.media import delete_media_later
+from ...services.menu_snapshot import get_menu_snapshot
+from ...services.menu_search import search_items
 from ...models.menu import MenuItem, MenuCategory, MenuTag, MenuItemTag
 from ...schemas.menu import (
     CategoryCreate, CategoryOut,
@@ -14,8 +19,10 @@ router = APIRouter(tags=["Menu API"])
 
 # ---------- Categories ----------
 @router.get("/categories", response_model=List[CategoryOut])
-def list_categories(db: Session = Depends(get_db)):
-    return db.query(MenuCategory).order_by(MenuCategory.sort_order, MenuCategory.name).all()
+@etag("menu")
+def list_categories():
+    # served from the menu snapshot; response_model stays for the OpenAPI schema
+    return Response(get_menu_snapshot().categories_json, media_type="application/json")
 
 @router.post("/categories", response_model=CategoryOut, status_code=201)
 def create_category(payload: CategoryCreate, db: Session = Depends(get_db)):
@@ -34,8 +41,10 @@ def delete_category(cat_id: int, db: Session = Depends(get_db)):
 
 # ---------- Tags ----------
 @router.get("/tags", response_model=List[TagOut])
-def list_tags(db: Session = Depends(get_db)):
-    return db.query(MenuTag).order_by(MenuTag.type, MenuTag.name).all()
+@etag("menu")
+def list_tags():
+    # served from the menu snapshot; response_model stays for the OpenAPI schema
+    return Response(get_menu_snapshot().tags_json, media_type="application/json")
 
 @router.post("/tags", response_model=TagOut, status_code=201)
 def create_tag(payload: TagCreate, db: Session = Depends(get_db)):
@@ -53,11 +62,31 @@ def delete_tag(tag_id: int, db: Session = Depends(get_db)):
 
 # ---------- Items ----------
 @router.get("/items", response_model=List[ItemOut])
-def list_items(db: Session = Depends(get_db)):
-    return db.query(MenuItem).order_by(MenuItem.featured_rank.desc(), MenuItem.name).all()
+@etag("menu")
+def list_items():
+    # served from the menu snapshot; response_model stays for the OpenAPI schema
+    return Response(get_menu_snapshot().items_json, media_type="application/json")
+
+@router.get("/menu/search")
+@etag("menu")
+def search_menu(
+    q: str = Query("", description="Words to match against name/description (prefix match)"),
+    tags: Optional[str] = Query(None, description="Comma-separated tag slugs, all must match"),
+    category: Optional[str] = Query(None, description="Comma-separated category slugs, any may match"),
+    include_unavailable: bool = False,
+):
+    tag_list = [t.strip() for t in (tags or "").split(",") if t.strip()]
+    cat_list = [c.strip() for c in (category or "").split(",") if c.strip()]
+    return search_items(q, tags=tag_list, categories=cat_list, available_only=not include_unavailable)
+
+def _claim_image(url: Optional[str]) -> None:
+    # /api/upload URLs are collected unless a row uses them: keep it while we save
+    if url and not media_store.claim(url):
+        raise HTTPException(status_code=400, detail="Image upload expired, upload it again")
 
 @router.post("/items", response_model=ItemOut, status_code=201)
 def create_item(payload: ItemCreate, db: Session = Depends(get_db)):
+    _claim_image(payload.image_url)
     item = MenuItem(
         name=payload.name,
         price=payload.price,
@@ -71,13 +100,19 @@ def create_item(payload: ItemCreate, db: Session = Depends(get_db)):
     # tags
     for tag_id in payload.tag_ids:
         db.add(MenuItemTag(item_id=item.id, tag_id=tag_id))
-    db.commit(); db.refresh(item)
+    db.commit()
+    db.refresh(item)
     return item
 
 @router.put("/items/{item_id}", response_model=ItemOut)
 def update_item(item_id: int, payload: ItemUpdate, db: Session = Depends(get_db)):
     item = db.query(MenuItem).get(item_id)
     if not item: raise HTTPException(404)
+    old_image_url = item.image_url or ""
+    new_image_url = payload.image_url or ""
+    image_changed = new_image_url != old_image_url
+    if image_changed:
+        _claim_image(new_image_url)
     for k, v in payload.dict().items():
         if k == "tag_ids": continue
         setattr(item, k, v)
@@ -85,14 +120,21 @@ def update_item(item_id: int, payload: ItemUpdate, db: Session = Depends(get_db)
     db.query(MenuItemTag).filter(MenuItemTag.item_id==item_id).delete()
     for tag_id in payload.tag_ids:
         db.add(MenuItemTag(item_id=item_id, tag_id=tag_id))
-    db.commit(); db.refresh(item)
+    db.commit()
+    if image_changed and old_image_url:
+        delete_media_later(old_image_url)  # Works for both cloud and local images
+    db.refresh(item)
     return item
 
 @router.delete("/items/{item_id}", status_code=204)
 def delete_item(item_id: int, db: Session = Depends(get_db)):
     item = db.query(MenuItem).get(item_id)
     if not item: raise HTTPException(404)
-    db.delete(item); db.commit(); return
+    image_url = item.image_url
+    db.delete(item); db.commit()
+    if image_url:
+        delete_media_later(image_url)
+    return
 
 # ---------- Featured reorder (limit 3) ----------
 @router.post("/items/featured")
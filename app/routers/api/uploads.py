@@ -7,8 +7,10 @@ router = APIRouter(tags=["Uploads"])
 
 @router.post("/upload")
 async def upload(file: UploadFile = File(...)):
-    data = await file.read()
-    ok, res = save_upload(file.filename, file.content_type or "", data)
-    if not ok:
-        raise HTTPException(status_code=400, detail=res)
-    return JSONResponse({"ok": True, "url": res})
+    # streams to disk with the size cap / type sniffing (413 / 415 on reject).
+    # No row uses the URL yet: the create/update that saves it claims it, and
+    # media_store.collector removes uploads nobody saved after UNCLAIMED_GRACE.
+    url = await save_upload(file, subdir="uploads")
+    if not url:
+        raise HTTPException(status_code=400, detail="Upload failed")
+    return JSONResponse({"ok": True, "url": url})
@@ -0,0 +1,25 @@
+# app/routers/api/weather.py
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from ...services.cache import get_cached_site_settings_async
+from ...services.integrations import integrations, weather_for_site
+
+router = APIRouter(tags=["Integrations"])
+
+# Both endpoints read the integrations cache only; a miss schedules a
+# background refresh and answers immediately.
+
+@router.get("/weather")
+async def weather():
+    site = await get_cached_site_settings_async() or {}
+    if not site.get("show_weather"):
+        return JSONResponse({"ok": False, "reason": "disabled"})
+    data = weather_for_site(site)
+    if data is None:
+        return JSONResponse({"ok": False, "reason": "pending"}, headers={"Retry-After": "5"})
+    return JSONResponse({"ok": True, **data}, headers={"Cache-Control": "public, max-age=300"})
+
+@router.get("/integrations")
+async def integrations_summary():
+    """Cached ratings / followers / weather per provider (null if not fetched yet)."""
+    return JSONResponse({name: integrations.peek(name) for name in integrations.providers})
@@ -0,0 +1,45 @@
+# app/routers/images.py
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+
+from ..services import images
+from ..services.cache import SingleFlightTimeout
+from ..services.static_files import IMMUTABLE_CACHE_CONTROL
+
+router = APIRouter()
+
+# sources without a content hash in the path can still change under the same URL
+MUTABLE_CACHE_CONTROL = "public, max-age=86400"
+
+
+@router.get("/img/{width}/{fmt}/{path:path}")
+async def resized_image(request: Request, width: int, fmt: str, path: str):
+    """`path` scaled down to `width` px as WebP / JPEG (see services/images.py)."""
+    if width not in images.WIDTHS or (fmt not in images.FORMATS and fmt != images.AUTO):
+        raise HTTPException(status_code=404, detail="Unsupported size or format")
+    src = images.resolve_source(path)
+    if src is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    out_fmt = images.negotiate(fmt, request.headers.get("accept", ""))
+    try:
+        body, etag = await images.derivative_bytes(src, width, out_fmt)
+    except (SingleFlightTimeout, asyncio.TimeoutError):
+        raise HTTPException(status_code=503, detail="Image is still being resized, try again")
+    except Exception as e:
+        # undecodable / truncated source
+        print(f"Image resize error for {path}: {e!r}")
+        raise HTTPException(status_code=422, detail="Image could not be resized")
+
+    headers = {
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if path.startswith(images.IMMUTABLE_SOURCES) else MUTABLE_CACHE_CONTROL,
+        "ETag": etag,
+    }
+    if fmt == images.AUTO:
+        headers["Vary"] = "Accept"
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    # derivatives are small (at most WIDTHS[-1] px wide), so the body is sent from memory
+    return Response(body, media_type=images.FORMATS[out_fmt], headers=headers)
@@ -1,25 +1,29 @@
 # app/routers/public.py
 from fastapi import APIRouter, Request, Depends
 from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 import os
 import json
 
-from ..db.session import get_db
-from ..models.menu import MenuItem, MenuCategory, MenuTag
-from ..models.events import Event
+from ..db.session import get_async_db
 from ..models.site import SiteSetting
 from ..seo.schema import local_business, events as events_schema
+from ..services.event_timeline import upcoming_events
+from ..services.menu_snapshot import get_menu_snapshot_async
+from ..services.page_cache import cached_page
 
 router = APIRouter()
 
-def ctx(request: Request, **kw):
-    from ..services.cache import get_cached_hours, get_cached_site_settings
+async def ctx(request: Request, **kw):
+    from ..services.cache import get_cached_hours_async, get_cached_site_settings_async
     from ..settings import get_settings
     from datetime import datetime
     
     settings = get_settings()
+    # async loaders: a cold cache is filled in a worker thread, never on the loop
+    site_obj = await get_cached_site_settings_async()
     
     base = {
         "request": request,
@@ -30,8 +34,8 @@ def ctx(request: Request, **kw):
         "ENV": settings.environment,
         "CURRENT_YEAR": datetime.now().year,
         "GOOGLE_MAPS_API_KEY": settings.google_maps_api_key,
-        "HOURS_HTML": get_cached_hours(),
-        "SITE_OBJ": get_cached_site_settings(),
+        "HOURS_HTML": await get_cached_hours_async(),
+        "SITE_OBJ": site_obj,
     }
     base.update(kw)
     return base
@@ -43,69 +47,50 @@ def get_template_name(base_name: str, request: Request) -> str:
     return f"public/{base_name}"
 
 @router.get("/", response_class=HTMLResponse)
-async def home(request: Request, db: Session = Depends(get_db)):
-    featured = (
-        db.query(MenuItem)
-        .filter(MenuItem.featured_rank > 0, MenuItem.available == True)  # noqa: E712
-        .order_by(MenuItem.featured_rank.asc()).limit(3).all()
-    )
-    events = (
-        db.query(Event)
-        .filter(Event.is_published == True, Event.start >= datetime.utcnow())  # noqa: E712
-        .order_by(Event.start.asc()).limit(3).all()
-    )
-    site = db.query(SiteSetting).first()
+@cached_page("menu", "events")
+async def home(request: Request, db: AsyncSession = Depends(get_async_db)):
+    featured = (await get_menu_snapshot_async()).featured
+    events = await upcoming_events(3)
+    site = await db.scalar(select(SiteSetting).limit(1))
     lb = json.dumps(local_business(site or SiteSetting()), ensure_ascii=False)
     ev = json.dumps(events_schema(events), ensure_ascii=False)
 
     return request.app.templates.TemplateResponse(
         get_template_name("home.html", request),
-        ctx(request, featured=featured, events=events, site=site, jsonld_local=lb, jsonld_events=ev)
+        await ctx(request, featured=featured, events=events, site=site, jsonld_local=lb, jsonld_events=ev)
     )
 
 @router.get("/menu", response_class=HTMLResponse)
-async def menu(request: Request, db: Session = Depends(get_db)):
-    categories = db.query(MenuCategory).order_by(MenuCategory.sort_order.asc(), MenuCategory.name.asc()).all()
-    tags = db.query(MenuTag).order_by(MenuTag.type.asc(), MenuTag.name.asc()).all()
-    items = db.query(MenuItem).options(joinedload(MenuItem.tags)).order_by(MenuItem.name.asc()).all()
-
-    cat_payload = [{"id": c.slug or str(c.id), "name": c.name} for c in categories]
-    tag_payload = [t.slug for t in tags]
-    item_payload = []
-    for it in items:
-        # use slug for category if present
-        cat_slug = next((c.slug for c in categories if c.id == getattr(it, "category_id", None)), getattr(it, "category", "other"))
-        item_payload.append({
-            "id": it.id,
-            "name": it.name,
-            "price": float(it.price),
-            "category": cat_slug or "other",
-            "tags": [t.slug for t in (getattr(it, "tags", []) or [])],
-            "img": it.image_url or "/assets/images/placeholders/dish-1.jpg",
-        })
-
+@cached_page("menu")
+async def menu(request: Request):
+    snap = await get_menu_snapshot_async()
     return request.app.templates.TemplateResponse(
         get_template_name("menu.html", request),
-        ctx(request, categories=cat_payload, tags=tag_payload, items=item_payload)
+        await ctx(request, categories=snap.categories, tags=snap.tags, items=snap.items)
     )
 
 @router.get("/ordering", response_class=HTMLResponse)
+@cached_page()
 async def ordering(request: Request):
-    return request.app.templates.TemplateResponse(get_template_name("ordering.html", request), ctx(request))
+    return request.app.templates.TemplateResponse(get_template_name("ordering.html", request), await ctx(request))
 
 @router.get("/shopify", response_class=HTMLResponse)
+@cached_page()
 async def shopify(request: Request):
-    return request.app.templates.TemplateResponse(get_template_name("shopify.html", request), ctx(request))
+    return request.app.templates.TemplateResponse(get_template_name("shopify.html", request), await ctx(request))
 
 @router.get("/musician", response_class=HTMLResponse)
+@cached_page()
 async def musician(request: Request):
-    return request.app.templates.TemplateResponse(get_template_name("musician.html", request), ctx(request))
+    return request.app.templates.TemplateResponse(get_template_name("musician.html", request), await ctx(request))
 
 @router.get("/rentals", response_class=HTMLResponse)
+@cached_page()
 async def rentals(request: Request):
-    return request.app.templates.TemplateResponse(get_template_name("rentals.html", request), ctx(request))
+    return request.app.templates.TemplateResponse(get_template_name("rentals.html", request), await ctx(request))
 
 @router.get("/location", response_class=HTMLResponse)
-async def location(request: Request, db: Session = Depends(get_db)):
-    site = db.query(SiteSetting).first()
-    return request.app.templates.TemplateResponse(get_template_name("location.html", request), ctx(request, site=site))
+@cached_page()
+async def location(request: Request, db: AsyncSession = Depends(get_async_db)):
+    site = await db.scalar(select(SiteSetting).limit(1))
+    return request.app.templates.TemplateResponse(get_template_name("location.html", request), await ctx(request, site=site))
@@ -11,6 +11,8 @@ class EventCreate(BaseModel):
     venue_area: Optional[str] = "Deck"
     is_published: bool = True
     ticket_url: Optional[str] = ""
+    rrule: Optional[str] = None
+    exdates: Optional[str] = None
 
 class EventUpdate(EventCreate):
     pass
@@ -25,5 +27,7 @@ class EventOut(BaseModel):
     venue_area: Optional[str]
     is_published: bool
     ticket_url: Optional[str]
+    rrule: Optional[str] = None
+    exdates: Optional[str] = None
     class Config:
         from_attributes = True
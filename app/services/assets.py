@@ -0,0 +1,169 @@
+# app/services/assets.py
+"""
+Fingerprinted static assets.
+
+build() copies every file under app/static (except uploaded media) and
+/assets to app/static/_build/ with a content hash in its name
+("css/custom.css" -> "_build/static/css/custom.3f9a0c1d.css"), writes .gz
+and (with the optional `brotli` package) .br siblings for text types, and
+records the mapping in _build/manifest.json. Templates link through the
+asset_url() Jinja global, so a changed file gets a new URL and old ones can
+be cached forever: CachedStaticFiles serves _build/ with an immutable
+Cache-Control and picks the precompressed sibling from Accept-Encoding, and
+the gzip middleware skips it (services/static_files.py).
+
+Run at build time (scripts/build_assets.py) and again on startup; both are
+incremental. With DEBUG on, asset_url() notices edited sources and rebuilds
+them on the fly.
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import threading
+from typing import Dict, Optional, Tuple
+
+from ..settings import get_settings
+
+try:
+    import brotli
+except ImportError:  # .br variants are skipped; .gz still works
+    brotli = None
+
+APP_DIR = os.path.dirname(os.path.dirname(__file__))
+STATIC_DIR = os.path.join(APP_DIR, "static")
+ASSETS_DIR = os.path.join(os.path.dirname(APP_DIR), "assets")
+BUILD_DIR = os.path.join(STATIC_DIR, "_build")
+MANIFEST = os.path.join(BUILD_DIR, "manifest.json")
+
+# URL prefix -> source directory
+SOURCES = {"/static/": STATIC_DIR, "/assets/": ASSETS_DIR}
+SKIP_DIRS = {"_build", "media"}                # generated / user uploads
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt", ".html", ".xml", ".map", ".ico"}
+MIN_COMPRESS_BYTES = 256
+HASH_LEN = 8
+
+_manifest: Dict[str, Dict] = {}
+_lock = threading.Lock()
+
+
+def _fingerprint(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()[:HASH_LEN]
+
+
+def _write_compressed(out: str) -> None:
+    with open(out, "rb") as f:
+        data = f.read()
+    if len(data) < MIN_COMPRESS_BYTES:
+        return
+    variants = [(".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", lambda d: brotli.compress(d, quality=11)))
+    for ext, compress in variants:
+        packed = compress(data)
+        if len(packed) < len(data):  # not worth it otherwise
+            tmp = f"{out}{ext}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(packed)
+            os.replace(tmp, out + ext)
+
+
+def _build_one(url: str, src: str) -> Dict:
+    """Fingerprint one source file into BUILD_DIR; returns its manifest entry."""
+    digest = _fingerprint(src)
+    root, ext = os.path.splitext(url.lstrip("/"))
+    rel = f"{root}.{digest}{ext}"                  # static/css/custom.3f9a0c1d.css
+    out = os.path.join(BUILD_DIR, *rel.split("/"))
+    if not os.path.exists(out):
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+        tmp = out + ".tmp"
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, out)
+        if ext.lower() in COMPRESSIBLE:
+            _write_compressed(out)
+    return {"url": f"/static/_build/{rel}", "src": src, "mtime": os.stat(src).st_mtime}
+
+
+def _sources():
+    for prefix, root in SOURCES.items():
+        if not os.path.isdir(root):
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            if dirpath == root:
+                dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS and not d.startswith(".")]
+            for name in filenames:
+                if name.startswith("."):
+                    continue
+                src = os.path.join(dirpath, name)
+                rel = os.path.relpath(src, root).replace(os.sep, "/")
+                yield prefix + rel, src
+
+
+def build() -> Dict[str, Dict]:
+    """(Re)build every asset and the manifest; unchanged files are not rewritten."""
+    manifest = {url: _build_one(url, src) for url, src in _sources()}
+    os.makedirs(BUILD_DIR, exist_ok=True)
+    tmp = MANIFEST + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, MANIFEST)
+    with _lock:
+        _manifest.clear()
+        _manifest.update(manifest)
+    return manifest
+
+
+def load() -> None:
+    """Use an existing manifest (from the build step), or build one."""
+    try:
+        with open(MANIFEST) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        build()
+        return
+    with _lock:
+        _manifest.clear()
+        _manifest.update(manifest)
+
+
+def _normalize(path: str) -> str:
+    path = "/" + path.lstrip("/")
+    if not path.startswith(tuple(SOURCES)):
+        path = "/static" + path                    # asset_url("css/custom.css")
+    return path
+
+
+def asset_url(path: str) -> str:
+    """Fingerprinted URL for a /static or /assets path (the path itself if unknown)."""
+    path = _normalize(path)
+    entry = _manifest.get(path)
+    if entry is None:
+        return path
+    if get_settings().debug:
+        try:
+            if os.stat(entry["src"]).st_mtime != entry["mtime"]:
+                entry = _build_one(path, entry["src"])
+                with _lock:
+                    _manifest[path] = entry
+        except OSError:
+            return path
+    return entry["url"]
+
+
+def pick_encoding(full_path: str, accept_encoding: str) -> Tuple[str, Optional[str]]:
+    """(file to send, Content-Encoding or None) for a built asset."""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(name.strip())
+    for encoding, ext in (("br", ".br"), ("gzip", ".gz")):
+        if encoding in accepted and os.path.exists(full_path + ext):
+            return full_path + ext, encoding
+    return full_path, None
+
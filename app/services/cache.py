@@ -1,19 +1,385 @@
-from functools import lru_cache
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+# app/services/cache.py
+"""
+In-process cache for small values that every page renders (hours footer,
+site settings, ...).
+
+Each entry carries its own TTL and is stamped with the data version of the
+tags it depends on. Committed writes bump those versions (see
+services/invalidation.py), which evicts the dependent entries from every
+registered cache. The TTL is the backstop for writes made by another worker
+process.
+
+Misses are single-flight: when an entry expires or is evicted, the first
+caller rebuilds it and concurrent callers (threads or coroutines) wait for
+that result instead of all running the same queries.
+"""
+import asyncio
+import inspect
+import threading
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
 
 from ..db.session import SessionLocal
 from ..models.site import Hours, SiteSetting
 
+HOURS_TTL = 60 * 60          # 1 hour
+SITE_SETTINGS_TTL = 60 * 60  # 1 hour
+FLIGHT_TIMEOUT = 30.0        # seconds a follower waits for the leader's result
+
+_MISSING = object()
+
+
+class SingleFlightTimeout(TimeoutError):
+    pass
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent computations of the same key: the first caller runs
+    the function, everyone else arriving before it finishes gets the same
+    value (or the same exception). Nothing is remembered afterwards; caching
+    is the caller's job.
+
+    do() serves threads (sync handlers run in the threadpool). do_async()
+    serves coroutines: a sync `fn` runs in a worker thread through do(), so
+    it coalesces with sync callers too; a coroutine function runs as one
+    shared task that a cancelled caller doesn't take down with it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._tasks: Dict[Tuple[int, str], "asyncio.Task"] = {}
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = FLIGHT_TIMEOUT) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            if not call.done.wait(timeout):
+                raise SingleFlightTimeout(f"timed out waiting for {key!r}")
+            if call.error is not None:
+                raise call.error
+            return call.value
+        try:
+            call.value = fn()
+            return call.value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    async def do_async(
+        self,
+        key: str,
+        fn: Callable[[], Any],
+        timeout: Optional[float] = FLIGHT_TIMEOUT,
+    ) -> Any:
+        if not inspect.iscoroutinefunction(fn):
+            return await asyncio.to_thread(self.do, key, fn, timeout)
+        loop = asyncio.get_running_loop()
+        task_key = (id(loop), key)
+        task = self._tasks.get(task_key)
+        if task is None:
+            task = loop.create_task(fn())
+            self._tasks[task_key] = task
+            task.add_done_callback(lambda _t: self._tasks.pop(task_key, None))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            raise SingleFlightTimeout(f"timed out waiting for {key!r}") from None
+
+    def in_flight(self) -> int:
+        return len(self._calls) + len(self._tasks)
+
+
+flight = SingleFlight()
+
+
+class DataVersions:
+    """
+    Monotonic data version per tag ("menu", "events", "site", "hours", ...).
+    Shared by every TTLCache so a single bump invalidates all of them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._tags: Dict[str, int] = {}
+        # wall-clock time of the last bump per tag, for Last-Modified headers
+        self._touched: Dict[str, float] = {}
+        self.started_at = time.time()
+
+    @property
+    def current(self) -> int:
+        return self._version
+
+    def get(self, tag: str) -> int:
+        return self._tags.get(tag, 0)
+
+    def bump(self, *tags: str) -> int:
+        with self._lock:
+            self._version += 1
+            now = time.time()
+            for tag in tags:
+                self._tags[tag] = self._version
+                self._touched[tag] = now
+            return self._version
+
+    def modified_at(self, tags: Iterable[str]) -> float:
+        """Latest bump time among `tags` (process start if never bumped)."""
+        return max((self._touched.get(t, self.started_at) for t in tags), default=self.started_at)
+
+    def stamp(self, tags: Iterable[str]) -> Tuple[Tuple[str, int], ...]:
+        return tuple((t, self._tags.get(t, 0)) for t in tags)
+
+    def is_current(self, stamp: Tuple[Tuple[str, int], ...]) -> bool:
+        return all(self._tags.get(t, 0) == v for t, v in stamp)
+
+
+versions = DataVersions()
+_registry: "weakref.WeakValueDictionary[str, TTLCache]" = weakref.WeakValueDictionary()
+
+
+class TTLCache:
+    """
+    Thread-safe key/value cache with per-key TTLs, tag versions and counters.
+    Sync route handlers run in the threadpool, so every mutation takes the lock.
+    """
+
+    def __init__(self, name: str, default_ttl: float = 3600, maxsize: int = 512):
+        self.name = name
+        self.default_ttl = default_ttl
+        self.maxsize = maxsize
+        # key -> (value, expires_at, ((tag, version), ...))
+        self._data: Dict[str, Tuple[Any, float, Tuple[Tuple[str, int], ...]]] = {}
+        # tag -> keys, so invalidate_tags() can evict eagerly
+        self._by_tag: Dict[str, Set[str]] = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        _registry[name] = self
+
+    # ---------- versions ----------
+    @property
+    def version(self) -> int:
+        """Global data version; increases on every bump."""
+        return versions.current
+
+    def tag_version(self, tag: str) -> int:
+        return versions.get(tag)
+
+    def bump_version(self, *tags: str) -> int:
+        """Mark data behind `tags` as changed. Returns the new global version."""
+        return invalidate_tags(*tags)
+
+    def _is_fresh(self, entry, now: float) -> bool:
+        _, expires_at, stamp = entry
+        return expires_at > now and versions.is_current(stamp)
+
+    # ---------- get / set ----------
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self._is_fresh(entry, time.monotonic()):
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return default
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[float] = None,
+        tags: Iterable[str] = (),
+        stamp: Optional[Tuple[Tuple[str, int], ...]] = None,
+    ) -> None:
+        """
+        Store `value`. Pass `stamp=versions.stamp(tags)` taken before the value
+        was built to keep a concurrent commit from being masked.
+        """
+        with self._lock:
+            self._store(key, value, ttl, stamp if stamp is not None else versions.stamp(tags))
+
+    def _store(self, key: str, value: Any, ttl: Optional[float], stamp) -> None:
+        if key in self._data:
+            self._unindex(key)
+        elif len(self._data) >= self.maxsize:
+            # dicts keep insertion order, so the first key is the oldest entry
+            self._drop(next(iter(self._data)))
+        ttl = self.default_ttl if ttl is None else ttl
+        self._data[key] = (value, time.monotonic() + ttl, stamp)
+        for tag, _ in stamp:
+            self._by_tag.setdefault(tag, set()).add(key)
+
+    def _unindex(self, key: str) -> None:
+        for tag, _ in self._data[key][2]:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+    def _drop(self, key: str) -> None:
+        self._unindex(key)
+        del self._data[key]
+        self.evictions += 1
+
+    def _peek(self, key: str) -> Any:
+        """Fresh value or _MISSING, without touching the counters."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self._is_fresh(entry, time.monotonic()):
+                return entry[0]
+            return _MISSING
+
+    def _fill(self, key: str, factory: Callable[[], Any], ttl: Optional[float], tags: Tuple[str, ...]) -> Any:
+        # another caller may have filled it while we waited to lead
+        value = self._peek(key)
+        if value is not _MISSING:
+            return value
+        stamp = versions.stamp(tags)
+        value = factory()
+        with self._lock:
+            self._store(key, value, ttl, stamp)
+        return value
+
+    async def _fill_async(self, key, factory: Callable[[], Awaitable[Any]], ttl, tags) -> Any:
+        value = self._peek(key)
+        if value is not _MISSING:
+            return value
+        stamp = versions.stamp(tags)
+        value = await factory()
+        with self._lock:
+            self._store(key, value, ttl, stamp)
+        return value
+
+    def get_or_set(
+        self,
+        key: str,
+        factory: Callable[[], Any],
+        ttl: Optional[float] = None,
+        tags: Iterable[str] = (),
+        timeout: Optional[float] = FLIGHT_TIMEOUT,
+    ) -> Any:
+        """
+        Return the cached value or build it with `factory()`.
+        Tag versions are read *before* building, so a write that lands while
+        the factory runs leaves the new entry already stale. Concurrent
+        misses share one build (see SingleFlight); its exception propagates
+        to all of them.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        tags = tuple(tags)
+        return flight.do(f"{self.name}:{key}", lambda: self._fill(key, factory, ttl, tags), timeout)
+
+    async def get_or_set_async(
+        self,
+        key: str,
+        factory: Callable[[], Any],
+        ttl: Optional[float] = None,
+        tags: Iterable[str] = (),
+        timeout: Optional[float] = FLIGHT_TIMEOUT,
+    ) -> Any:
+        """
+        get_or_set for async callers. A hit returns without leaving the loop;
+        on a miss a sync `factory` runs in a worker thread (so a cold cache
+        doesn't block the event loop) and a coroutine factory is awaited.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        tags = tuple(tags)
+        if inspect.iscoroutinefunction(factory):
+            async def fill():
+                return await self._fill_async(key, factory, ttl, tags)
+        else:
+            def fill():
+                return self._fill(key, factory, ttl, tags)
+        return await flight.do_async(f"{self.name}:{key}", fill, timeout)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+
+    def evict_tags(self, tags: Iterable[str]) -> int:
+        """Drop every entry that depends on any of `tags`. Returns the count."""
+        with self._lock:
+            keys: Set[str] = set()
+            for tag in tags:
+                keys |= self._by_tag.get(tag, set())
+            for key in keys:
+                self._drop(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.evictions += len(self._data)
+            self._data.clear()
+            self._by_tag.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "version": versions.current,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+cache = TTLCache("globals")
+
+
+def invalidate_tags(*tags: str) -> int:
+    """Bump the data version of `tags` and evict dependent entries from every cache."""
+    version = versions.bump(*tags)
+    for c in list(_registry.values()):
+        c.evict_tags(tags)
+    return version
+
+
+# Older name, kept for callers that bump by hand (scripts, one-off fixes)
+bump_version = invalidate_tags
+
+
+def all_cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: c.stats() for name, c in list(_registry.items())}
+
+
 def convert_to_12hour(time_str: str) -> str:
     """Convert 24-hour format time to 12-hour format with am/pm"""
     if not time_str or time_str == '—':
         return time_str
-    
+
     try:
         # Parse the time string (e.g., "11:00" or "22:00")
         hour, minute = map(int, time_str.split(':'))
-        
+
         # Convert to 12-hour format
         if hour == 0:
             return f"12:{minute:02d}am"
@@ -26,11 +392,9 @@ def convert_to_12hour(time_str: str) -> str:
     except (ValueError, AttributeError):
         return time_str
 
-@lru_cache(maxsize=1)
-def get_cached_hours() -> Optional[str]:
-    """Cache hours HTML for 1 hour since it rarely changes"""
+def _build_hours_html() -> Optional[str]:
+    db = SessionLocal()
     try:
-        db = SessionLocal()
         rows = db.query(Hours).all()
         if not rows:
             return None
@@ -48,40 +412,69 @@ def get_cached_hours() -> Optional[str]:
                 close_ = convert_to_12hour(r.close) if r.close else '—'
                 parts.append(f"<div>{label}: {open_}–{close_}</div>")
         return "".join(parts) if parts else None
-    except Exception:
-        return None
     finally:
         db.close()
 
-@lru_cache(maxsize=1)
-def get_cached_site_settings() -> Optional[Dict[str, Any]]:
-    """Cache site settings for 1 hour since they rarely change"""
+def _build_site_settings() -> Optional[Dict[str, Any]]:
+    db = SessionLocal()
     try:
-        db = SessionLocal()
         site = db.query(SiteSetting).first()
-        if site:
-            # Convert to dict to avoid SQLAlchemy object serialization issues
-            return {
-                'id': site.id,
-                'name': site.name,
-                'tagline': site.tagline,
-                'description': site.description,
-                'address': site.address,
-                'phone': site.phone,
-                'email': site.email,
-                'facebook': site.facebook,
-                'instagram': site.instagram,
-                'twitter': site.twitter,
-                'created_at': site.created_at.isoformat() if site.created_at else None,
-                'updated_at': site.updated_at.isoformat() if site.updated_at else None
-            }
+        if not site:
+            return None
+        # Convert to dict to avoid SQLAlchemy object serialization issues
+        return {
+            'id': site.id,
+            'site_name': site.site_name,
+            'phone': site.phone,
+            'email': site.email,
+            'address': site.address,
+            'city': site.city,
+            'state': site.state,
+            'zip': site.zip,
+            'lat': site.lat,
+            'lng': site.lng,
+            'hero_title': site.hero_title,
+            'hero_sub': site.hero_sub,
+            'show_weather': site.show_weather,
+            'facebook': site.facebook,
+            'instagram': site.instagram,
+            'tiktok': site.tiktok,
+            'youtube': site.youtube,
+        }
+    finally:
+        db.close()
+
+def get_cached_hours() -> Optional[str]:
+    """Hours HTML, cached for 1 hour or until the hours are edited"""
+    try:
+        return cache.get_or_set("hours_html", _build_hours_html, ttl=HOURS_TTL, tags=("hours",))
+    except Exception:
+        # DB hiccup: don't cache the failure, just render without hours
         return None
+
+def get_cached_site_settings() -> Optional[Dict[str, Any]]:
+    """Site settings, cached for 1 hour or until they are edited"""
+    try:
+        return cache.get_or_set("site_settings", _build_site_settings, ttl=SITE_SETTINGS_TTL, tags=("site",))
+    except Exception:
+        return None
+
+async def get_cached_hours_async() -> Optional[str]:
+    """get_cached_hours() for async handlers: a miss is built in a worker thread."""
+    try:
+        return await cache.get_or_set_async("hours_html", _build_hours_html, ttl=HOURS_TTL, tags=("hours",))
+    except Exception:
+        return None
+
+async def get_cached_site_settings_async() -> Optional[Dict[str, Any]]:
+    """get_cached_site_settings() for async handlers: a miss is built in a worker thread."""
+    try:
+        return await cache.get_or_set_async("site_settings", _build_site_settings, ttl=SITE_SETTINGS_TTL, tags=("site",))
     except Exception:
         return None
-    finally:
-        db.close()
 
 def clear_caches() -> None:
-    """Clear all cached data - call this when data is updated"""
-    get_cached_hours.cache_clear()
-    get_cached_site_settings.cache_clear()
+    """Clear all cached data - normally not needed, see services/invalidation.py"""
+    versions.bump()
+    for c in list(_registry.values()):
+        c.clear()
@@ -2,15 +2,29 @@
 """
 Cloud storage service for handling image uploads.
 Supports Cloudinary with fallback to local storage.
+
+The Cloudinary SDK is blocking, so every call runs on a small dedicated
+thread pool (CLOUD_WORKERS). Awaited calls first take one of
+CLOUD_MAX_PENDING slots (an asyncio.Semaphore, so waiters queue in order),
+with an HTTP timeout on the SDK call and an overall deadline on the await. A
+caller that times out or is cancelled stops waiting straight away; an
+upload that still lands afterwards is destroyed so it isn't orphaned.
+Fire-and-forget deletes go straight onto the same pool.
 """
 
+import asyncio
+import functools
 import os
 import uuid
-from typing import Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
 from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
 import cloudinary
 import cloudinary.uploader
 from ..settings import get_settings
+from . import media_store, metrics
+from .media_stream import StagedUpload, stage_upload
 
 settings = get_settings()
 
@@ -26,6 +40,77 @@ if all([settings.cloudinary_cloud_name, settings.cloudinary_api_key, settings.cl
 else:
     CLOUDINARY_ENABLED = False
 
+CLOUD_WORKERS = 4          # concurrent Cloudinary calls per process
+CLOUD_MAX_PENDING = 16     # awaited calls running + queued; callers beyond this wait their turn
+UPLOAD_TIMEOUT = 60.0      # seconds, whole upload including the queue wait
+DELETE_TIMEOUT = 15.0
+HTTP_TIMEOUT = 30          # passed to the SDK so a stuck socket frees its thread
+
+_pool = ThreadPoolExecutor(max_workers=CLOUD_WORKERS, thread_name_prefix="cloudinary")
+_pending = asyncio.BoundedSemaphore(CLOUD_MAX_PENDING)
+
+
+class CloudTimeout(Exception):
+    pass
+
+
+async def _submit(call: Callable[[], Any], timeout: float) -> Future:
+    """Queue `call` on the pool once a pending slot is free; the slot is released when it finishes."""
+    try:
+        await asyncio.wait_for(_pending.acquire(), timeout)
+    except asyncio.TimeoutError:
+        raise CloudTimeout("cloud storage queue is full") from None
+    loop = asyncio.get_running_loop()
+    try:
+        fut = _pool.submit(call)
+    except Exception:
+        _pending.release()
+        raise
+    fut.add_done_callback(lambda _: loop.call_soon_threadsafe(_pending.release))
+    return fut
+
+
+async def run_cloud_call(
+    call: Callable[[], Any],
+    timeout: float = UPLOAD_TIMEOUT,
+    on_abandon: Optional[Callable[[Any], None]] = None,
+) -> Any:
+    """
+    Await a blocking SDK call (a no-arg callable, e.g. a functools.partial)
+    without blocking the event loop.
+
+    Waits for a pending slot (up to `timeout`), then for the call itself. If
+    the caller gives up (timeout or cancellation) the call keeps running in
+    its thread; `on_abandon(result)` is invoked with whatever it returns.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    fut = await _submit(call, timeout)
+
+    try:
+        with metrics.outbound("cloudinary"):
+            return await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(fut)), max(deadline - loop.time(), 0.01)
+            )
+    except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+        if on_abandon is not None:
+            def _cleanup(done: Future):
+                if not done.cancelled() and done.exception() is None:
+                    on_abandon(done.result())
+            fut.add_done_callback(_cleanup)
+        if isinstance(e, asyncio.TimeoutError):
+            raise CloudTimeout(f"cloud call timed out after {timeout:g}s") from None
+        raise
+
+
+def _destroy_uploaded(result: Any) -> None:
+    public_id = (result or {}).get("public_id")
+    if public_id:
+        try:
+            cloudinary.uploader.destroy(public_id, timeout=HTTP_TIMEOUT)
+        except Exception as e:
+            print(f"Orphaned upload cleanup error: {e}")
+
 async def upload_image(
     file: UploadFile, 
     folder: str = "menu",
@@ -47,64 +132,79 @@ async def upload_image(
     if not file or not file.filename:
         return None
     
+    # Stream to disk first: size cap and type check happen before any upload
+    # (UploadRejected propagates so the caller can report it)
+    staged = await stage_upload(file)
     try:
-        # Read file content
-        file_content = await file.read()
-        
         if CLOUDINARY_ENABLED:
-            # Upload to Cloudinary with optimization
-            result = cloudinary.uploader.upload(
-                file_content,
+            # Upload to Cloudinary with optimization (the SDK streams from the path)
+            upload = functools.partial(
+                cloudinary.uploader.upload,
+                staged.path,
                 folder=f"mine606/{folder}",
-                public_id=f"{uuid.uuid4().hex}_{file.filename.split('.')[0]}",
+                public_id=f"{uuid.uuid4().hex}_{os.path.splitext(file.filename)[0]}",
                 transformation=[
                     {"width": max_width, "crop": "limit"},
                     {"quality": quality, "fetch_format": "auto"}
                 ],
                 allowed_formats=["jpg", "jpeg", "png", "webp"],
-                max_file_size=5000000  # 5MB limit
+                max_file_size=settings.max_upload_bytes,
+                timeout=HTTP_TIMEOUT,
             )
+            result = await run_cloud_call(upload, timeout=UPLOAD_TIMEOUT, on_abandon=_destroy_uploaded)
             return result.get("secure_url")
         else:
             # Fallback to local storage
-            return await _save_local(file, file_content, folder)
+            return await _save_local(staged)
             
     except Exception as e:
         print(f"Image upload error: {e}")
         # Try local fallback even if Cloudinary fails
         if CLOUDINARY_ENABLED:
             try:
-                return await _save_local(file, file_content, folder)
+                return await _save_local(staged)
             except Exception:
                 pass
         return None
+    finally:
+        staged.discard()
 
-async def _save_local(file: UploadFile, content: bytes, folder: str) -> str:
-    """Fallback local storage implementation."""
-    # Create directory structure
-    base_dir = os.path.dirname(os.path.dirname(__file__))  # app/
-    media_dir = os.path.join(base_dir, "static", "media", folder)
-    
-    from datetime import datetime
-    year_month = datetime.now().strftime("%Y/%m")
-    full_dir = os.path.join(media_dir, year_month)
-    os.makedirs(full_dir, exist_ok=True)
-    
-    # Generate unique filename
-    file_ext = os.path.splitext(file.filename)[1].lower()
-    unique_name = f"{uuid.uuid4().hex}{file_ext}"
-    file_path = os.path.join(full_dir, unique_name)
-    
-    # Save file
-    with open(file_path, "wb") as f:
-        f.write(content)
-    
-    # Return URL path
-    return f"/static/media/{folder}/{year_month}/{unique_name}"
+async def _save_local(staged: StagedUpload) -> str:
+    """Fallback local storage implementation (content-addressed, deduplicated)."""
+    return await run_in_threadpool(media_store.store, staged)
+
+def _cloudinary_public_id(image_url: str) -> Optional[str]:
+    # URL format: https://res.cloudinary.com/cloud/image/upload/v123/folder/public_id.ext
+    parts = image_url.split("/")
+    if len(parts) >= 7:
+        # Get everything after upload/ and remove file extension
+        public_id_with_folder = "/".join(parts[7:])
+        return os.path.splitext(public_id_with_folder)[0]
+    return None
+
+def _is_cloud_url(image_url: str) -> bool:
+    return CLOUDINARY_ENABLED and "cloudinary.com" in image_url
+
+def _delete_local(image_url: str) -> bool:
+    if media_store.is_cas_url(image_url):
+        # shared blob: media_store.collector removes it once no row uses it
+        return True
+    if image_url.startswith("/static/"):
+        base_dir = os.path.dirname(os.path.dirname(__file__))
+        file_path = os.path.join(base_dir, image_url[1:])  # Remove leading /
+        if os.path.exists(file_path):
+            os.remove(file_path)
+            return True
+    return False
+
+def _destroy(public_id: str) -> bool:
+    result = cloudinary.uploader.destroy(public_id, timeout=HTTP_TIMEOUT)
+    return result.get("result") == "ok"
 
 def delete_image(image_url: str) -> bool:
     """
-    Delete an image from Cloudinary or local storage.
+    Delete an image from Cloudinary or local storage (blocking; see
+    delete_image_async / delete_image_later from request handlers).
     
     Args:
         image_url: The image URL to delete
@@ -116,34 +216,48 @@ def delete_image(image_url: str) -> bool:
         return False
     
     try:
-        if CLOUDINARY_ENABLED and "cloudinary.com" in image_url:
-            # Extract public_id from Cloudinary URL
-            # URL format: https://res.cloudinary.com/cloud/image/upload/v123/folder/public_id.ext
-            parts = image_url.split("/")
-            if len(parts) >= 7:
-                # Get everything after upload/ and remove file extension
-                public_id_with_folder = "/".join(parts[7:])
-                public_id = os.path.splitext(public_id_with_folder)[0]
-                
-                result = cloudinary.uploader.destroy(public_id)
-                return result.get("result") == "ok"
+        if _is_cloud_url(image_url):
+            public_id = _cloudinary_public_id(image_url)
+            if public_id:
+                return _destroy(public_id)
         else:
-            # Local file deletion
-            if image_url.startswith("/static/"):
-                base_dir = os.path.dirname(os.path.dirname(__file__))
-                file_path = os.path.join(base_dir, image_url[1:])  # Remove leading /
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    return True
+            return _delete_local(image_url)
     except Exception as e:
         print(f"Image deletion error: {e}")
     
     return False
 
+async def delete_image_async(image_url: str) -> bool:
+    """Awaitable delete_image: the remote call runs on the cloud pool."""
+    if not image_url:
+        return False
+    if not _is_cloud_url(image_url):
+        return await run_in_threadpool(delete_image, image_url)
+    try:
+        return await run_cloud_call(functools.partial(delete_image, image_url), timeout=DELETE_TIMEOUT)
+    except CloudTimeout as e:
+        print(f"Image deletion error: {e}")
+        return False
+
+def delete_image_later(image_url: str) -> None:
+    """
+    Fire-and-forget delete for when the caller doesn't need the outcome
+    (replacing or removing an image on save). Never blocks: it is queued on
+    the cloud pool, which bounds the threads, without waiting for a pending
+    slot. Callable from sync handlers (worker threads) too.
+    """
+    if not image_url:
+        return
+    try:
+        _pool.submit(delete_image, image_url)
+    except RuntimeError as e:   # pool shut down (process exiting)
+        print(f"Image deletion skipped for {image_url}: {e}")
+
 def get_storage_info() -> dict:
     """Get information about the current storage configuration."""
     return {
         "cloudinary_enabled": CLOUDINARY_ENABLED,
+        "cloud_workers": CLOUD_WORKERS,
         "cloud_name": settings.cloudinary_cloud_name if CLOUDINARY_ENABLED else None,
         "storage_type": "Cloudinary" if CLOUDINARY_ENABLED else "Local"
     }
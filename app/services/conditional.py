@@ -0,0 +1,152 @@
+# app/services/conditional.py
+"""
+Conditional GET (ETag / Last-Modified -> 304) for read-only routes.
+
+Handlers opt in with @etag("menu", ...) naming the data they read (public
+pages get it through @cached_page). ConditionalGetMiddleware computes the
+validators from the data versions in services/cache.py *before* the handler
+runs, so a matching If-None-Match / If-Modified-Since is answered without
+touching the DB or rendering anything.
+
+The ETag hashes: tag versions, a per-process boot id (versions restart at 0),
+a time window (same backstop as the cache TTLs for "upcoming" content and
+writes made by another worker), the full path + query, the HTMX variant and
+the content-coding the client will get. It says nothing about who is
+asking, so logged-in admins (who bypass the page cache and may see more)
+get no validators at all and a private Cache-Control instead.
+"""
+import hashlib
+import os
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+
+from ..security.auth import get_current_admin
+from .cache import versions
+from .page_cache import pick_encoding
+
+VALIDATOR_WINDOW = 5 * 60  # seconds; keep in line with page_cache.PAGE_TTL
+BOOT_ID = os.urandom(8).hex()
+
+
+def etag(*tags: str):
+    """Mark a GET handler as cacheable by clients; validators derive from `tags`."""
+    def decorator(fn):
+        fn.etag_tags = tuple(tags)
+        return fn
+    return decorator
+
+
+def compute_validators(scope, headers: Headers, tags: Iterable[str]) -> Tuple[str, float]:
+    tags = tuple(tags)
+    now = time.time()
+    window = int(now // VALIDATOR_WINDOW)
+    parts = [
+        BOOT_ID,
+        str(window),
+        scope.get("path", ""),
+        scope.get("query_string", b"").decode("latin-1"),
+        "htmx" if headers.get("hx-request") else "full",
+        pick_encoding(headers.get("accept-encoding", ""), ("br", "gzip")) or "identity",
+    ]
+    parts += [f"{t}={v}" for t, v in versions.stamp(tags)]
+    tag = hashlib.sha1("|".join(parts).encode()).hexdigest()[:24]
+    last_modified = max(versions.modified_at(tags), window * VALIDATOR_WINDOW)
+    return f'"{tag}"', last_modified
+
+
+def is_not_modified(headers: Headers, etag_value: str, last_modified: float) -> bool:
+    inm = headers.get("if-none-match")
+    if inm is not None:
+        # If-None-Match wins over If-Modified-Since (RFC 9110 13.2.2)
+        candidates = {c.strip() for c in inm.split(",")}
+        return "*" in candidates or etag_value in candidates
+    ims = headers.get("if-modified-since")
+    if ims:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(ims).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+VARY = ("Accept-Encoding", "HX-Request")
+ADMIN_CACHE_CONTROL = "private, no-cache"
+
+
+def add_vary(headers: MutableHeaders, *names: str) -> None:
+    """Add `names` to Vary, skipping any already listed (page_cache / GZip set some)."""
+    present = {v.strip().lower() for v in headers.get("vary", "").split(",") if v.strip()}
+    for name in names:
+        if name.lower() not in present:
+            headers.add_vary_header(name)
+            present.add(name.lower())
+
+
+class ConditionalGetMiddleware:
+    """Pure ASGI so it can short-circuit before routing and decorate any response."""
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: Optional[Dict[str, Tuple[str, ...]]] = None
+
+    def _tags_for(self, scope) -> Optional[Tuple[str, ...]]:
+        if self._routes is None:
+            routes: Dict[str, Tuple[str, ...]] = {}
+            for route in getattr(scope.get("app"), "routes", []):
+                tags = getattr(getattr(route, "endpoint", None), "etag_tags", None)
+                methods = getattr(route, "methods", None) or ()
+                if tags is not None and "GET" in methods and "{" not in route.path:
+                    routes[route.path] = tags
+            self._routes = routes
+        return self._routes.get(scope.get("path", ""))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+        tags = self._tags_for(scope)
+        if tags is None:
+            await self.app(scope, receive, send)
+            return
+
+        if get_current_admin(Request(scope)) is not None:
+            await self.app(scope, receive, self._private(send))
+            return
+
+        headers = Headers(scope=scope)
+        etag_value, last_modified = compute_validators(scope, headers, tags)
+        validators = {
+            "ETag": etag_value,
+            "Last-Modified": formatdate(last_modified, usegmt=True),
+            # let browsers keep the body but always revalidate
+            "Cache-Control": "no-cache",
+        }
+
+        if is_not_modified(headers, etag_value, last_modified):
+            out = MutableHeaders(validators)
+            add_vary(out, *VARY)
+            await send({"type": "http.response.start", "status": 304, "headers": out.raw})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_validators(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                out = MutableHeaders(scope=message)
+                for k, v in validators.items():
+                    out[k] = v
+                add_vary(out, *VARY)
+            await send(message)
+
+        await self.app(scope, receive, send_with_validators)
+
+    @staticmethod
+    def _private(send):
+        async def send_private(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["Cache-Control"] = ADMIN_CACHE_CONTROL
+            await send(message)
+        return send_private
@@ -0,0 +1,356 @@
+# app/services/counters.py
+"""
+Maintained row counts for the admin dashboard (stat_counters).
+
+Each tracked model has a metric ("rentals") whose rows are the total
+(bucket "") plus one row per dimension value ("status=new",
+"month=2025-10"). Reading the dashboard is then a single small SELECT
+instead of COUNT(*) scans that grow with the tables.
+
+Counts are kept in step from the session's after_flush: inserts add one to
+the total and their buckets, deletes take one away, and an update that
+moves a row between buckets (a rental going new -> approved) moves the
+count. The deltas are upserted on the flush's own connection, so they
+commit or roll back with the rows they describe.
+
+Anything that bypasses the unit of work (query.update()/.delete(), Core or
+raw SQL, bulk seeding) can't be counted that way: ORM bulk statements mark
+the metric stale and CounterReconciler recounts it shortly after the commit.
+The reconciler also recounts everything on startup and every
+RECONCILE_INTERVAL, correcting any drift. A recount takes no lock: it reads
+the counters and counts the table in one REPEATABLE READ snapshot, and
+since counter deltas commit with their rows the two agree unless something
+drifted. The difference is then added as a delta, like any flush, so
+writes committed after the snapshot are neither lost nor blocked.
+
+Adding a breakdown is one Dim in SPECS: it's counted from then on, and the
+next reconcile backfills it.
+"""
+import asyncio
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Type, Union
+
+from sqlalchemy import case, event, func, inspect, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.orm.base import NO_VALUE
+from starlette.concurrency import run_in_threadpool
+
+from ..db.session import SessionLocal
+from ..models.events import Event
+from ..models.menu import MenuItem
+from ..models.musician import MusicianApp
+from ..models.rentals import Rental
+from ..models.stats import StatCounter
+
+RECONCILE_INTERVAL = 15 * 60   # seconds between full recounts
+STALE_DELAY = 5.0              # batch up stale marks for this long before recounting
+
+TOTAL = ""
+Bucket = Tuple[str, str]       # (metric, bucket)
+
+
+def _month(value: Optional[datetime]) -> Optional[str]:
+    return value.strftime("%Y-%m") if value else None
+
+
+@dataclass
+class Dim:
+    """One breakdown of a metric: bucket "<name>=<value>" per row."""
+    name: str
+    attr: str                                  # column the value comes from
+    value: Callable[[Any], Optional[str]]      # python: column value -> bucket value
+    sql: Callable[[Any], Any]                  # SQL: column -> bucket value expression
+
+
+def plain(name: str, attr: str) -> Dim:
+    return Dim(name, attr, lambda v: None if v is None else str(v), lambda col: col)
+
+
+def by_month(name: str, attr: str) -> Dim:
+    return Dim(name, attr, _month, lambda col: func.to_char(col, "YYYY-MM"))
+
+
+def yes_no(name: str, attr: str, test: Callable[[Any], bool], sql_test: Callable[[Any], Any]) -> Dim:
+    return Dim(
+        name, attr,
+        lambda v: "yes" if test(v) else "no",
+        lambda col: case((sql_test(col), "yes"), else_="no"),
+    )
+
+
+@dataclass
+class Spec:
+    metric: str
+    model: Type
+    dims: List[Dim] = field(default_factory=list)
+
+
+SPECS: List[Spec] = [
+    Spec("rentals", Rental, [plain("status", "status"), by_month("month", "submitted_at")]),
+    Spec("musician", MusicianApp, [plain("status", "status"), by_month("month", "submitted_at")]),
+    Spec("menu_items", MenuItem, [
+        yes_no("featured", "featured_rank", lambda v: bool(v and v > 0), lambda c: c > 0),
+        yes_no("available", "available", bool, lambda c: c.is_(True)),
+    ]),
+    Spec("events", Event, [
+        yes_no("published", "is_published", bool, lambda c: c.is_(True)),
+        by_month("month", "start"),
+    ]),
+]
+SPEC_BY_MODEL: Dict[Type, Spec] = {s.model: s for s in SPECS}
+SPEC_BY_METRIC: Dict[str, Spec] = {s.metric: s for s in SPECS}
+
+_STALE = "counters_stale"      # key in Session.info: metrics to recount after commit
+
+
+def spec_for(cls: Type) -> Optional[Spec]:
+    for klass in cls.__mro__:
+        spec = SPEC_BY_MODEL.get(klass)
+        if spec:
+            return spec
+    return None
+
+
+def bucket(dim: Dim, raw: Any) -> Optional[str]:
+    value = dim.value(raw)
+    return None if value is None else f"{dim.name}={value}"
+
+
+# ---------- incremental (after_flush) ----------
+class _Unknown(Exception):
+    """A deleted row's dimension value wasn't loaded: recount instead."""
+
+
+def _old_value(obj, attr: str):
+    """The value as last flushed/loaded (before this flush's changes)."""
+    attr_state = inspect(obj).attrs[attr]
+    hist = attr_state.history
+    if hist.deleted:
+        return hist.deleted[0]
+    if hist.added:
+        return None  # was NULL (or never loaded, which we can't tell apart)
+    value = attr_state.loaded_value
+    if value is NO_VALUE:
+        raise _Unknown(attr)
+    return value
+
+
+def _add(deltas: Counter, spec: Spec, obj, sign: int, old: bool = False) -> None:
+    buckets = [bucket(dim, _old_value(obj, dim.attr) if old else getattr(obj, dim.attr)) for dim in spec.dims]
+    for b in [TOTAL] + buckets:
+        if b is not None:
+            deltas[(spec.metric, b)] += sign
+
+
+def _moved(deltas: Counter, spec: Spec, obj) -> None:
+    state = inspect(obj)
+    for dim in spec.dims:
+        hist = state.attrs[dim.attr].history
+        if not hist.has_changes():
+            continue
+        before = bucket(dim, hist.deleted[0] if hist.deleted else None)
+        after = bucket(dim, hist.added[0] if hist.added else None)
+        if before != after:
+            if before is not None:
+                deltas[(spec.metric, before)] -= 1
+            if after is not None:
+                deltas[(spec.metric, after)] += 1
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    deltas: Counter = Counter()
+    stale: Set[str] = set()
+    for obj in session.new:
+        spec = spec_for(type(obj))
+        if spec:
+            _add(deltas, spec, obj, +1)
+    for obj in session.dirty:
+        spec = spec_for(type(obj))
+        if spec and obj not in session.deleted:
+            _moved(deltas, spec, obj)
+    for obj in session.deleted:
+        spec = spec_for(type(obj))
+        if spec:
+            try:
+                _add(deltas, spec, obj, -1, old=True)
+            except _Unknown:
+                stale.add(spec.metric)
+                deltas[(spec.metric, TOTAL)] -= 1
+    if stale:
+        session.info.setdefault(_STALE, set()).update(stale)
+    apply_deltas(session.connection(), deltas)
+
+
+def apply_deltas(conn, deltas: Dict[Bucket, int]) -> None:
+    rows = [
+        {"metric": metric, "bucket": b, "value": n}
+        for (metric, b), n in sorted(deltas.items())   # fixed order: no lock-order deadlocks
+        if n
+    ]
+    if not rows:
+        return
+    stmt = pg_insert(StatCounter.__table__)
+    conn.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["metric", "bucket"],
+            set_={"value": StatCounter.__table__.c.value + stmt.excluded.value, "updated_at": func.now()},
+        ),
+        rows,
+    )
+
+
+def _do_orm_execute(state) -> None:
+    # query.update()/.delete() don't go through the flush: recount after commit
+    if not (state.is_update or state.is_delete or state.is_insert):
+        return
+    mapper = state.bind_mapper
+    spec = spec_for(mapper.class_) if mapper is not None else None
+    if spec:
+        state.session.info.setdefault(_STALE, set()).add(spec.metric)
+
+
+def _after_commit(session: Session) -> None:
+    stale = session.info.pop(_STALE, None)
+    if stale:
+        reconciler.mark_stale(stale)
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_STALE, None)
+
+
+_installed: Set[int] = set()
+
+
+def install(factory: Union[sessionmaker, Type[Session]]) -> None:
+    """Attach the counting listeners to a session factory (idempotent)."""
+    if id(factory) in _installed:
+        return
+    event.listen(factory, "after_flush", _after_flush)
+    event.listen(factory, "do_orm_execute", _do_orm_execute)
+    event.listen(factory, "after_commit", _after_commit)
+    event.listen(factory, "after_rollback", _after_rollback)
+    _installed.add(id(factory))
+
+
+# ---------- reading ----------
+async def read_counters(db, *metrics: str) -> Dict[str, Dict[str, int]]:
+    """{metric: {bucket: value}} in one query; missing buckets read as 0 via .get()."""
+    stmt = select(StatCounter.metric, StatCounter.bucket, StatCounter.value)
+    if metrics:
+        stmt = stmt.where(StatCounter.metric.in_(metrics))
+    out: Dict[str, Dict[str, int]] = defaultdict(dict)
+    for metric, b, value in (await db.execute(stmt)).all():
+        out[metric][b] = int(value)
+    return out
+
+
+# ---------- reconciliation ----------
+def _recount(db: Session, spec: Spec) -> Dict[str, int]:
+    table = spec.model.__table__
+    counts = {TOTAL: db.scalar(select(func.count()).select_from(table)) or 0}
+    for dim in spec.dims:
+        expr = dim.sql(table.c[dim.attr])
+        for value, n in db.execute(select(expr, func.count()).group_by(expr)).all():
+            if value is not None:
+                counts[f"{dim.name}={value}"] = n
+    return counts
+
+
+def _drift(spec: Spec) -> Tuple[Dict[str, int], Dict[Bucket, int]]:
+    """(true counts, correction) for one metric, both from a single snapshot."""
+    db = SessionLocal()
+    try:
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        stored = dict(db.execute(
+            select(StatCounter.bucket, StatCounter.value).where(StatCounter.metric == spec.metric)
+        ).all())
+        counts = _recount(db, spec)
+    finally:
+        db.rollback()
+        db.close()
+    deltas = {
+        (spec.metric, b): counts.get(b, 0) - int(stored.get(b, 0))
+        for b in set(counts) | set(stored)
+    }
+    return counts, deltas
+
+
+def reconcile(metrics: Optional[List[str]] = None) -> Dict[str, Dict[str, int]]:
+    """Recount `metrics` (default: all) from the source tables and correct the stored values."""
+    specs = [SPEC_BY_METRIC[m] for m in metrics] if metrics else SPECS
+    result = {}
+    for spec in specs:
+        counts, deltas = _drift(spec)
+        db = SessionLocal()
+        try:
+            conn = db.connection()
+            apply_deltas(conn, deltas)
+            # buckets nothing falls into any more (a month with every row deleted)
+            conn.execute(
+                StatCounter.__table__.delete()
+                .where(StatCounter.metric == spec.metric, StatCounter.value == 0)
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        result[spec.metric] = counts
+    return result
+
+
+class CounterReconciler:
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stale: Set[str] = set()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="counter-reconciler")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def mark_stale(self, metrics: Set[str]) -> None:
+        """Recount these soon (commits can happen in worker threads)."""
+        self._stale |= set(metrics)
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _run(self) -> None:
+        full = True  # recount everything on startup
+        while True:
+            if not full:
+                await asyncio.sleep(STALE_DELAY)  # let a burst of bulk writes settle
+            self._wake.clear()
+            stale, self._stale = sorted(self._stale), set()
+            try:
+                if full or stale:
+                    await run_in_threadpool(reconcile, None if full else stale)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Counter reconcile error: {e!r}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), RECONCILE_INTERVAL)
+                full = False
+            except asyncio.TimeoutError:
+                full = True
+
+
+reconciler = CounterReconciler()
@@ -0,0 +1,194 @@
+# app/services/event_timeline.py
+"""
+In-memory timeline of published events for the calendar feed.
+
+Loaded once per "events" data version for a horizon around today. Events no
+longer than SHORT_SPAN sit in a list sorted by start, so a range query is
+two bisects plus the k hits. Longer (multi-day) events go into a small
+centered interval tree so one long festival can't widen every scan.
+Each event is serialized to JSON once at load time; a response is just a
+join of the hits.
+
+Recurring events (Event.rrule) are kept as rules and expanded lazily for
+the requested window by services/recurrence.py, which caches per month.
+
+Requests outside the loaded horizon return None so the caller can fall back
+to the database.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func
+
+from ..db.session import SessionLocal
+from ..models.events import Event
+from .cache import cache
+from .image_meta import attach as attach_image_meta
+from .recurrence import Occurrence, expand
+
+TIMELINE_TTL = 60 * 60
+HORIZON_PAST = timedelta(days=400)
+HORIZON_FUTURE = timedelta(days=800)
+SHORT_SPAN = timedelta(days=1)
+
+# (start, effective_end, occurrence); an event without `end` ends at its start
+Entry = Tuple[datetime, datetime, Occurrence]
+
+
+def serialize_event(e) -> bytes:
+    return Occurrence(e).json
+
+
+def join_json(occurrences) -> bytes:
+    return b"[" + b",".join(o.json for o in occurrences) + b"]"
+
+
+def _rule_row(e: Event) -> SimpleNamespace:
+    """Detached copy of a recurring event; the timeline holds no ORM state."""
+    return SimpleNamespace(**{k: getattr(e, k) for k in (
+        "id", "title", "start", "end", "description", "image_url",
+        "venue_area", "ticket_url", "rrule", "exdates", "image_meta",
+    )})
+
+
+class _IntervalNode:
+    """Centered interval tree node (static, built once per timeline)."""
+    __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+    def __init__(self, entries: List[Entry]):
+        points = sorted(p for s, e, _ in entries for p in (s, e))
+        self.center = points[len(points) // 2]
+        here, left, right = [], [], []
+        for entry in entries:
+            if entry[1] < self.center:
+                left.append(entry)
+            elif entry[0] > self.center:
+                right.append(entry)
+            else:
+                here.append(entry)
+        self.by_start = sorted(here, key=lambda x: x[0])
+        self.by_end = sorted(here, key=lambda x: x[1], reverse=True)
+        self.left = _IntervalNode(left) if left else None
+        self.right = _IntervalNode(right) if right else None
+
+    def query(self, lo: datetime, hi: datetime, out: List[Entry]) -> None:
+        if hi < self.center:
+            # every interval here contains center > hi, so only start <= hi matters
+            for entry in self.by_start:
+                if entry[0] > hi:
+                    break
+                out.append(entry)
+            if self.left:
+                self.left.query(lo, hi, out)
+        elif lo > self.center:
+            for entry in self.by_end:
+                if entry[1] < lo:
+                    break
+                out.append(entry)
+            if self.right:
+                self.right.query(lo, hi, out)
+        else:
+            out.extend(self.by_start)
+            if self.left:
+                self.left.query(lo, hi, out)
+            if self.right:
+                self.right.query(lo, hi, out)
+
+
+class EventTimeline:
+    def __init__(self, entries: List[Entry], recurring: List[SimpleNamespace], horizon: Tuple[datetime, datetime]):
+        self.horizon = horizon
+        self._recurring = recurring
+        short = sorted((e for e in entries if e[1] - e[0] <= SHORT_SPAN), key=lambda x: x[0])
+        long_ = [e for e in entries if e[1] - e[0] > SHORT_SPAN]
+        self._short = short
+        self._starts = [e[0] for e in short]
+        self._long = _IntervalNode(long_) if long_ else None
+        self.size = len(entries) + len(recurring)
+
+    def covers(self, lo: datetime, hi: datetime) -> bool:
+        return self.horizon[0] <= lo and hi <= self.horizon[1]
+
+    def query(self, lo: datetime, hi: datetime) -> List[Occurrence]:
+        """Occurrences overlapping [lo, hi], ordered by start."""
+        # a short event overlapping lo started no earlier than lo - SHORT_SPAN
+        i = bisect_left(self._starts, lo - SHORT_SPAN)
+        j = bisect_right(self._starts, hi)
+        hits = [e[2] for e in self._short[i:j] if e[1] >= lo]
+        extra: List[Occurrence] = []
+        if self._long:
+            long_hits: List[Entry] = []
+            self._long.query(lo, hi, long_hits)
+            extra += [e[2] for e in long_hits]
+        for event in self._recurring:
+            extra += expand(event, lo, hi)
+        if extra:
+            hits = sorted(hits + extra, key=lambda o: o.start)
+        return hits
+
+    def query_json(self, lo: datetime, hi: datetime) -> bytes:
+        return join_json(self.query(lo, hi))
+
+    def upcoming(self, now: datetime, limit: int) -> List[Occurrence]:
+        """Next `limit` occurrences starting at or after `now`."""
+        span = timedelta(days=31)
+        while True:
+            hi = min(now + span, self.horizon[1])
+            found = [o for o in self.query(now, hi) if o.start >= now]
+            if len(found) >= limit or hi >= self.horizon[1]:
+                return found[:limit]
+            span *= 4
+
+
+def _build() -> EventTimeline:
+    now = datetime.utcnow()
+    lo, hi = now - HORIZON_PAST, now + HORIZON_FUTURE
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Event)
+              .filter(Event.is_published == True)  # noqa: E712
+              .filter((Event.rrule == None) | (Event.rrule == ""))  # noqa: E711
+              .filter(Event.start <= hi)
+              # still running at `lo`; one expression so ix_events_until can serve it
+              .filter(func.coalesce(Event.end, Event.start) >= lo)
+              .all()
+        )
+        # rules can start long before the horizon, so load them all
+        recurring = (
+            db.query(Event)
+              .filter(Event.is_published == True)  # noqa: E712
+              .filter(Event.rrule != None, Event.rrule != "")  # noqa: E711
+              .filter(Event.start <= hi)
+              .all()
+        )
+        attach_image_meta(db, rows + recurring)
+        entries = [(e.start, max(e.end or e.start, e.start), Occurrence(e)) for e in rows]
+        rules = [_rule_row(e) for e in recurring]
+    finally:
+        db.close()
+    return EventTimeline(entries, rules, (lo, hi))
+
+
+def get_timeline() -> EventTimeline:
+    return cache.get_or_set("event_timeline", _build, ttl=TIMELINE_TTL, tags=("events",))
+
+
+async def get_timeline_async() -> EventTimeline:
+    """For async handlers: a rebuild runs in a worker thread, not on the loop."""
+    return await cache.get_or_set_async("event_timeline", _build, ttl=TIMELINE_TTL, tags=("events",))
+
+
+def events_json(lo: datetime, hi: datetime) -> Optional[bytes]:
+    """Serialized events overlapping [lo, hi], or None if outside the loaded horizon."""
+    timeline = get_timeline()
+    if not timeline.covers(lo, hi):
+        return None
+    return timeline.query_json(lo, hi)
+
+
+async def upcoming_events(limit: int = 3) -> List[Occurrence]:
+    """Next published occurrences (recurring events expanded), for the homepage."""
+    return (await get_timeline_async()).upcoming(datetime.utcnow(), limit)
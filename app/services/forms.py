@@ -1,29 +1,209 @@
 # app/services/forms.py
-from typing import Dict, Optional
+"""
+Forwarding form submissions to Formspree through a DB outbox.
+
+The form routes call enqueue() before committing, so the outbox row lands in
+the same transaction as the MusicianApp/Rental row and the POST returns
+without any outbound call. OutboxDispatcher (started from main.py) drains
+due rows in the background:
+
+- the shared keep-alive client from services/http_client.py,
+- rows claimed per pass are grouped by destination, with a per-destination
+  concurrency cap,
+- failures retry with exponential backoff + jitter; 4xx other than 408/429
+  (and MAX_ATTEMPTS exhausted) mark the row dead,
+- claiming pushes next_attempt_at out by a lease and uses SKIP LOCKED, so
+  several workers can run dispatchers without double-sending.
+"""
+import asyncio
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
 import httpx
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from ..db.session import SessionLocal
+from ..models.outbox import OutboxMessage
 from ..settings import get_settings
+from . import metrics
+from .http_client import get_client
 
 settings = get_settings()
 
-async def forward_to_formspree(kind: str, payload: Dict) -> Dict:
+BATCH_SIZE = 50
+PER_DESTINATION = 4            # concurrent POSTs to one endpoint
+POLL_INTERVAL = 5.0            # seconds between scans when nothing wakes us
+LEASE = timedelta(minutes=2)   # a claimed row is invisible to other dispatchers this long
+BACKOFF_BASE = 10              # seconds; 10, 20, 40, ... capped at BACKOFF_MAX
+BACKOFF_MAX = 60 * 60
+MAX_ATTEMPTS = 12
+HTTP_TIMEOUT = 10.0
+
+
+def endpoint_for(kind: str) -> Optional[str]:
+    return {
+        "musician": settings.formspree_musician_endpoint,
+        "rental": settings.formspree_rental_endpoint,
+        "contact": settings.formspree_contact_endpoint,
+    }.get(kind)
+
+
+def enqueue(db: Session, kind: str, payload: Dict) -> OutboxMessage:
+    """
+    Queue `payload` for delivery to the `kind` endpoint. Only adds to the
+    session: it's sent once the caller commits.
+    """
+    msg = OutboxMessage(kind=kind, payload=payload, status="pending", attempts=0,
+                        next_attempt_at=datetime.utcnow())
+    db.add(msg)
+    return msg
+
+
+def backoff(attempts: int) -> timedelta:
+    delay = min(BACKOFF_BASE * 2 ** max(attempts - 1, 0), BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+async def forward_to_formspree(kind: str, payload: Dict, client: Optional[httpx.AsyncClient] = None) -> Dict:
     """
     kind: 'musician' | 'rental' | 'contact'
     payload: flattened dict
     """
-    endpoints = {
-        "musician": settings.formspree_musician_endpoint,
-        "rental": settings.formspree_rental_endpoint,
-        "contact": settings.formspree_contact_endpoint,
-    }
-    url: Optional[str] = endpoints.get(kind)
+    url: Optional[str] = endpoint_for(kind)
     if not url:
         return {"ok": False, "reason": "Formspree endpoint not configured"}
 
-    async with httpx.AsyncClient(timeout=10) as client:
-        try:
-            r = await client.post(url, data=payload, headers={"Accept": "application/json"})
+    try:
+        with metrics.outbound("formspree") as call:
+            r = await (client or get_client()).post(
+                url, data=payload, headers={"Accept": "application/json"}, timeout=HTTP_TIMEOUT
+            )
             if r.status_code in (200, 201, 202):
                 return {"ok": True}
+            call.outcome = "error"
             return {"ok": False, "status": r.status_code, "body": r.text}
-        except Exception as e:
-            return {"ok": False, "reason": str(e)}
+    except Exception as e:
+        return {"ok": False, "reason": str(e)}
+
+
+# ---------- dispatcher ----------
+Claimed = Tuple[int, str, Dict, int]  # (id, kind, payload, attempts so far)
+
+
+def _claim(limit: int) -> List[Claimed]:
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        rows = (
+            db.query(OutboxMessage)
+              .filter(OutboxMessage.status == "pending", OutboxMessage.next_attempt_at <= now)
+              .order_by(OutboxMessage.id.asc())
+              .limit(limit)
+              .with_for_update(skip_locked=True)
+              .all()
+        )
+        for row in rows:
+            row.next_attempt_at = now + LEASE
+        claimed = [(r.id, r.kind, dict(r.payload or {}), r.attempts) for r in rows]
+        db.commit()
+        return claimed
+    finally:
+        db.close()
+
+
+def _record(results: List[Tuple[Claimed, Dict]]) -> None:
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        for (msg_id, _kind, _payload, attempts), result in results:
+            row = db.get(OutboxMessage, msg_id)
+            if row is None:
+                continue
+            row.attempts = attempts + 1
+            if result.get("ok"):
+                row.status, row.sent_at, row.last_error = "sent", now, None
+                continue
+            status = result.get("status")
+            row.last_error = str(result.get("reason") or f"HTTP {status}: {result.get('body', '')}")[:1000]
+            if result.get("reason") == "Formspree endpoint not configured":
+                row.status = "skipped"
+            elif (status and 400 <= status < 500 and status not in (408, 429)) or row.attempts >= MAX_ATTEMPTS:
+                row.status = "dead"
+            else:
+                row.next_attempt_at = now + backoff(row.attempts)
+        db.commit()
+    finally:
+        db.close()
+
+
+class OutboxDispatcher:
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        self._client = client
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="outbox-dispatcher")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def notify(self) -> None:
+        """Something was just committed to the outbox: skip the poll wait."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def drain_once(self) -> int:
+        """Deliver one batch of due messages; returns how many were attempted."""
+        claimed = await run_in_threadpool(_claim, BATCH_SIZE)
+        if not claimed:
+            return 0
+        client = self._client or get_client()
+        by_destination: Dict[str, List[Claimed]] = defaultdict(list)
+        for msg in claimed:
+            by_destination[endpoint_for(msg[1]) or ""].append(msg)
+
+        async def deliver(msgs: List[Claimed]):
+            sem = asyncio.Semaphore(PER_DESTINATION)
+
+            async def one(msg: Claimed):
+                async with sem:
+                    return msg, await forward_to_formspree(msg[1], msg[2], client=client)
+
+            return await asyncio.gather(*(one(m) for m in msgs))
+
+        groups = await asyncio.gather(*(deliver(msgs) for msgs in by_destination.values()))
+        results = [r for group in groups for r in group]
+        await run_in_threadpool(_record, results)
+        return len(results)
+
+    async def _run(self) -> None:
+        while True:
+            # clear before draining so a notify() that lands mid-drain isn't lost
+            self._wake.clear()
+            try:
+                # keep going while full batches come back
+                while await self.drain_once() >= BATCH_SIZE:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Outbox dispatch error: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+
+dispatcher = OutboxDispatcher()
@@ -0,0 +1,32 @@
+# app/services/http_client.py
+"""
+One pooled, keep-alive httpx.AsyncClient per process for outbound calls
+(Formspree outbox, external integrations). Created lazily on the running
+loop; closed from main.py's shutdown hook. Callers pass their own timeout
+per request.
+"""
+from typing import Optional
+
+import httpx
+
+DEFAULT_TIMEOUT = 10.0
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=DEFAULT_TIMEOUT,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            follow_redirects=True,
+        )
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
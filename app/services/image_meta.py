@@ -0,0 +1,99 @@
+# app/services/image_meta.py
+"""
+Image metadata: displayed width/height, dominant color and a tiny inline
+preview (LQIP), stored per image URL in media_meta.
+
+It is probed once, when the upload is saved (services/media.py), and for
+older rows by scripts/backfill_image_meta.py. The menu snapshot and the
+event timeline load it together with the rows that reference the URL, so
+pages can emit width/height (no layout shift) and paint the color / preview
+while the real image loads without ever opening an image at render time.
+
+Writes go through the ORM session, so invalidation.py rebuilds the menu and
+event payloads after the commit; another process writing the table (the
+backfill) is picked up when those caches expire.
+"""
+from typing import Dict, Iterable, List, Optional
+
+from fastapi import UploadFile
+from markupsafe import Markup
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from starlette.concurrency import run_in_threadpool
+
+from ..db.session import SessionLocal
+from ..models.media import MediaMeta
+from .image_worker import probe
+
+FIELDS = ("width", "height", "color", "lqip")
+
+
+def as_dict(row: MediaMeta) -> dict:
+    """The payload shape: {"width", "height", "color", "lqip"}."""
+    return {k: getattr(row, k) for k in FIELDS}
+
+
+def upsert(db, url: str, meta: dict) -> None:
+    """Store `meta` for `url` on `db` (the caller commits)."""
+    values = {"url": url, **{k: meta[k] for k in FIELDS}}
+    stmt = pg_insert(MediaMeta).values(**values)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[MediaMeta.url],
+        set_={**{k: stmt.excluded[k] for k in FIELDS}, "created_at": func.now()},
+    ))
+
+
+def save(url: str, meta: dict) -> None:
+    db = SessionLocal()
+    try:
+        upsert(db, url, meta)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def record_upload(file: UploadFile, url: str) -> Optional[dict]:
+    """
+    Probe a just-saved upload and store the result for `url`. Failures are
+    logged, not raised: the upload itself has already succeeded, and the
+    backfill can fill the gap later.
+    """
+    try:
+        await file.seek(0)
+        meta = await run_in_threadpool(probe, file.file)
+        await run_in_threadpool(save, url, meta)
+        return meta
+    except Exception as e:
+        print(f"Image metadata error for {url}: {e!r}")
+        return None
+
+
+def lookup(db, urls: Iterable[str]) -> Dict[str, dict]:
+    """{url: metadata} for the given URLs, in one query (sync session)."""
+    wanted = sorted({u for u in urls if u})
+    if not wanted:
+        return {}
+    rows = db.scalars(select(MediaMeta).where(MediaMeta.url.in_(wanted))).all()
+    return {r.url: as_dict(r) for r in rows}
+
+
+def attach(db, rows: List) -> None:
+    """Set `image_meta` (dict or None) on each row with an image_url."""
+    found = lookup(db, (getattr(r, "image_url", None) for r in rows))
+    for r in rows:
+        r.image_meta = found.get(r.image_url or "")
+
+
+def img_attrs(meta: Optional[dict]) -> Markup:
+    """
+    width/height plus a color / preview background for an <img>, e.g.
+    <img src="..." {{ img_attrs(item.image) }}>; empty when unknown.
+    """
+    if not meta:
+        return Markup("")
+    return Markup(
+        'width="{w}" height="{h}" style="background: {c} url(\'{p}\') center / cover no-repeat"'
+    ).format(w=int(meta["width"]), h=int(meta["height"]), c=meta["color"], p=meta["lqip"])
@@ -0,0 +1,91 @@
+# app/services/image_worker.py
+"""
+Pillow work: resizing for the image process pool (services/images.py) and
+metadata probing for uploads / the backfill (services/image_meta.py).
+
+Kept free of app imports so spawned workers start quickly: only this module
+and Pillow are loaded in them.
+"""
+import base64
+import io
+import os
+
+from PIL import Image, ImageOps
+
+ORIENTATION = 0x0112           # EXIF tag; 5-8 mean the image is stored rotated 90 degrees
+PROBE_SIZE = 64                # working size for the color / preview
+LQIP_SIZE = 16                 # placeholder preview, scaled up and blurred by the browser
+
+SAVE_OPTIONS = {
+    "webp": {"format": "WEBP", "method": 4},
+    "jpeg": {"format": "JPEG", "optimize": True, "progressive": True},
+}
+
+
+def _flatten(im: Image.Image, keep_alpha: bool) -> Image.Image:
+    has_alpha = im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info)
+    if not has_alpha:
+        return im.convert("RGB")
+    im = im.convert("RGBA")
+    if keep_alpha:
+        return im
+    background = Image.new("RGB", im.size, (255, 255, 255))
+    background.paste(im, mask=im.getchannel("A"))
+    return background
+
+
+def render(src: str, dst: str, width: int, fmt: str, quality: int) -> int:
+    """Write `src` scaled down to `width` (never up) as `fmt` to `dst`; returns its size."""
+    with Image.open(src) as im:
+        if im.format == "JPEG" and im.width > width:
+            # let libjpeg decode straight at 1/2, 1/4 or 1/8 scale
+            im.draft("RGB", (width, max(1, im.height * width // im.width)))
+        im = ImageOps.exif_transpose(im)
+        if im.width > width:
+            height = max(1, round(im.height * width / im.width))
+            im = im.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+        im = _flatten(im, keep_alpha=(fmt == "webp"))
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        tmp = f"{dst}.{os.getpid()}.tmp"
+        try:
+            im.save(tmp, quality=quality, **SAVE_OPTIONS[fmt])
+            os.replace(tmp, dst)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+    return os.path.getsize(dst)
+
+
+def _dominant_color(im: Image.Image) -> str:
+    """Most common of a handful of median-cut colors, as "#rrggbb"."""
+    quantized = im.quantize(colors=5, method=Image.Quantize.MEDIANCUT)
+    _, index = max(quantized.getcolors())
+    r, g, b = quantized.getpalette()[index * 3:index * 3 + 3]
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def probe(src) -> dict:
+    """
+    Displayed width/height, dominant color and a tiny base64 WebP preview of
+    `src` (a path or a binary file object).
+    """
+    with Image.open(src) as im:
+        width, height = im.size
+        if im.getexif().get(ORIENTATION, 1) in (5, 6, 7, 8):
+            width, height = height, width
+        if im.format == "JPEG":
+            im.draft("RGB", (PROBE_SIZE, PROBE_SIZE))
+        small = ImageOps.exif_transpose(im)
+        small = _flatten(small, keep_alpha=False)
+    small.thumbnail((PROBE_SIZE, PROBE_SIZE))
+    preview = small.copy()
+    preview.thumbnail((LQIP_SIZE, LQIP_SIZE))
+    buf = io.BytesIO()
+    preview.save(buf, format="WEBP", quality=40)
+    return {
+        "width": width,
+        "height": height,
+        "color": _dominant_color(small),
+        "lqip": "data:image/webp;base64," + base64.b64encode(buf.getvalue()).decode(),
+    }
@@ -0,0 +1,279 @@
+# app/services/images.py
+"""
+Resized image derivatives, served at /img/{width}/{format}/{path}.
+
+`path` is a local source ("assets/images/logo.png",
+"static/media/cas/ab/<sha256>.jpg"); the first request for a size decodes
+it once, scales it down to `width` and re-encodes it as WebP or JPEG ("auto"
+picks WebP when the Accept header allows it). Only WIDTHS are served, so the
+number of derivatives per image is bounded.
+
+The Pillow work runs in a small process pool (IMAGE_WORKERS), so a burst of
+cold thumbnails can't starve the event loop or the request threadpool, and
+concurrent requests for the same derivative share one render (cache.flight).
+Results go to a disk cache under app/.image_cache keyed by source path,
+mtime, size, width and format, trimmed least-recently-used first to
+IMAGE_CACHE_MAX_BYTES. Each worker process keeps its own index of that
+directory, so with several workers the bound is approximate.
+
+Templates use img_url() / srcset(); they route local paths through
+asset_url() first, so the source path (and hence the /img URL) carries a
+content hash and the response can be cached as immutable. Cloudinary URLs
+get the equivalent Cloudinary transformation instead.
+"""
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from ..settings import get_settings
+from . import image_worker, metrics
+from .assets import APP_DIR, ASSETS_DIR, STATIC_DIR, asset_url
+from .cache import flight
+
+CACHE_DIR = os.path.join(APP_DIR, ".image_cache")
+WIDTHS = (160, 320, 480, 640, 800, 1200, 1600)
+FORMATS = {"webp": "image/webp", "jpeg": "image/jpeg"}
+AUTO = "auto"
+QUALITY = {"webp": 80, "jpeg": 82}
+SOURCE_EXTS = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
+ROOTS = {"static/": STATIC_DIR, "assets/": ASSETS_DIR}   # path prefix -> directory
+IMMUTABLE_SOURCES = ("static/_build/", "static/media/cas/")  # content hash in the path
+DEFAULT_SRCSET = (320, 640, 800, 1200)
+RENDER_TIMEOUT = 30.0
+
+_CLOUDINARY_UPLOAD = "/image/upload/"
+
+
+def resolve_source(path: str) -> Optional[str]:
+    """Filesystem path for an /img source path, or None if it isn't one we serve."""
+    for prefix, root in ROOTS.items():
+        if path.startswith(prefix):
+            full = os.path.normpath(os.path.join(root, path[len(prefix):]))
+            if (
+                full.startswith(root + os.sep)
+                and os.path.splitext(full)[1].lower() in SOURCE_EXTS
+                and os.path.isfile(full)
+            ):
+                return full
+    return None
+
+
+def negotiate(fmt: str, accept: str) -> str:
+    if fmt == AUTO:
+        return "webp" if "image/webp" in accept else "jpeg"
+    return fmt
+
+
+# ---------- disk cache ----------
+class DiskLRU:
+    """Size-bounded directory of derivatives, evicted least recently used first."""
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()   # path -> size, oldest first
+        self._total = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def path_for(self, key: str, fmt: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.{fmt}")
+
+    def load(self) -> None:
+        """Index what's already on disk (oldest mtime first); cheap to call again."""
+        with self._lock:
+            if self._loaded:
+                return
+            found = []
+            for dirpath, _, filenames in os.walk(self.root):
+                for name in filenames:
+                    path = os.path.join(dirpath, name)
+                    if name.endswith(".tmp"):
+                        continue
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    found.append((st.st_mtime, path, st.st_size))
+            for _, path, size in sorted(found):
+                self._entries[path] = size
+                self._total += size
+            self._loaded = True
+        self._evict()
+
+    def hit(self, path: str) -> bool:
+        self.load()
+        try:
+            size = os.stat(path).st_size
+        except OSError:
+            size = None
+        with self._lock:
+            if size is None:   # never made, or removed by another worker
+                self._total -= self._entries.pop(path, 0)
+                return False
+            # rendered by another worker process: adopt it
+            self._total += size - self._entries.pop(path, 0)
+            self._entries[path] = size
+        try:
+            os.utime(path)   # so a restart re-reads the recency order
+        except OSError:
+            pass
+        return True
+
+    def add(self, path: str, size: int) -> None:
+        with self._lock:
+            self._total += size - self._entries.pop(path, 0)
+            self._entries[path] = size
+        self._evict()
+
+    def _evict(self) -> None:
+        while True:
+            with self._lock:
+                # never the newest entry: it's about to be sent
+                if self._total <= self.max_bytes or len(self._entries) <= 1:
+                    return
+                path, size = self._entries.popitem(last=False)
+                self._total -= size
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"files": len(self._entries), "bytes": self._total, "max_bytes": self.max_bytes}
+
+
+disk_cache = DiskLRU(CACHE_DIR, get_settings().image_cache_max_bytes)
+
+
+# ---------- process pool ----------
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the parent has threads (threadpool, pools, reconcilers)
+            _pool = ProcessPoolExecutor(
+                max_workers=get_settings().image_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+async def _run(*args) -> int:
+    global _pool
+    pool = _executor()
+    try:
+        return await asyncio.wait_for(
+            asyncio.get_running_loop().run_in_executor(pool, image_worker.render, *args),
+            RENDER_TIMEOUT,
+        )
+    except BrokenProcessPool:
+        # a worker died (OOM on a huge image?): start a fresh pool next time
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        raise
+
+
+async def derivative(src: str, width: int, fmt: str) -> str:
+    """Path of `src` resized to `width` as `fmt`, rendering it on a cache miss."""
+    st = os.stat(src)
+    quality = QUALITY[fmt]
+    key = hashlib.sha256(f"{src}|{st.st_mtime_ns}|{st.st_size}|{width}|{fmt}|{quality}".encode()).hexdigest()
+    dst = disk_cache.path_for(key, fmt)
+    if disk_cache.hit(dst):
+        metrics.image_cache.inc("hit")
+        return dst
+    metrics.image_cache.inc("miss")
+
+    async def _make() -> str:
+        if disk_cache.hit(dst):   # finished just before we got here
+            return dst
+        with metrics.image_render.time(fmt):
+            size = await _run(src, dst, width, fmt, quality)
+        disk_cache.add(dst, size)
+        return dst
+
+    return await flight.do_async(f"img:{key}", _make)
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def derivative_bytes(src: str, width: int, fmt: str) -> Tuple[bytes, str]:
+    """
+    (body, ETag) of a derivative. The bytes are read before returning, so a
+    concurrent eviction can't unlink the file between lookup and send; if it
+    went just before the read, it's rendered again once.
+    """
+    for attempt in (1, 2):
+        path = await derivative(src, width, fmt)
+        try:
+            body = await run_in_threadpool(_read, path)
+        except FileNotFoundError:
+            if attempt == 2:
+                raise
+            continue
+        # the file name is the cache key: source, mtime, size, width, format
+        return body, '"' + os.path.splitext(os.path.basename(path))[0][:32] + '"'
+
+
+# ---------- template helpers ----------
+def _snap(width: int) -> int:
+    """The smallest allowed width >= `width` (the largest one past the end)."""
+    for w in WIDTHS:
+        if w >= width:
+            return w
+    return WIDTHS[-1]
+
+
+def _source_path(url: str) -> Optional[str]:
+    url = str(url)
+    if not url.startswith(("/static/", "/assets/")):
+        return None
+    return asset_url(url.split("?", 1)[0]).lstrip("/")
+
+
+def img_url(url, width: int, fmt: str = AUTO) -> str:
+    """URL for `url` at (about) `width` px; unknown / remote URLs come back unchanged."""
+    if not url:
+        return ""
+    width = _snap(width)
+    url = str(url)
+    if _CLOUDINARY_UPLOAD in url and "res.cloudinary.com" in url:
+        cl_fmt = "f_auto" if fmt == AUTO else f"f_{'jpg' if fmt == 'jpeg' else fmt}"
+        return url.replace(_CLOUDINARY_UPLOAD, f"{_CLOUDINARY_UPLOAD}w_{width},c_limit,{cl_fmt},q_auto/", 1)
+    path = _source_path(url)
+    if path is None or os.path.splitext(path)[1].lower() not in SOURCE_EXTS:
+        return url
+    return f"/img/{width}/{fmt}/{path}"
+
+
+def srcset(url, widths: Iterable[int] = DEFAULT_SRCSET, fmt: str = AUTO) -> str:
+    """A srcset attribute value ("... 320w, ... 640w"), or "" if `url` can't be resized."""
+    if not url or img_url(url, WIDTHS[0], fmt) == str(url):
+        return ""
+    return ", ".join(f"{img_url(url, w, fmt)} {w}w" for w in sorted({_snap(w) for w in widths}))
@@ -0,0 +1,287 @@
+# app/services/integrations.py
+"""
+External integrations (OpenWeather, Google Places, Yelp, Facebook Graph).
+
+Request handlers only ever *peek* at the cache: they never wait on the
+network. A stale or missing entry schedules a background refresh and the
+caller gets whatever is cached (possibly None) right away
+(stale-while-revalidate). Refreshes are single-flight per provider, so a
+burst of homepage loads triggers one upstream call, and a background loop
+started from main.py refreshes entries before they go stale.
+
+Providers are pluggable: register() replaces one by name, and
+INTEGRATIONS_FAKE=true (or use_fake_providers()) swaps in canned data for
+offline work.
+"""
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+
+from ..settings import get_settings
+from . import metrics
+from .cache import TTLCache, get_cached_site_settings_async
+from .http_client import get_client
+
+settings = get_settings()
+
+REFRESH_INTERVAL = 60        # seconds between background sweeps
+REFRESH_AHEAD = 0.8          # refresh once an entry is this far into its ttl
+FETCH_TIMEOUT = 8.0
+RETRY_AFTER = 60             # don't retry a failing provider more often than this
+
+# name -> (data, fetched_at); kept for stale_ttl, fresh for ttl.
+# Tagged "site": a location / page change evicts it.
+store = TTLCache("integrations", default_ttl=6 * 60 * 60, maxsize=32)
+
+
+class Provider(ABC):
+    name = ""
+    ttl = 30 * 60              # fresh for
+    stale_ttl = 6 * 60 * 60    # still served (while refreshing) until
+
+    def configured(self, site: Dict[str, Any]) -> bool:
+        return False
+
+    @abstractmethod
+    async def fetch(self, client: httpx.AsyncClient, site: Dict[str, Any]) -> Dict[str, Any]:
+        """The provider's data for `site` (cached as-is); raise on any failure."""
+
+
+class WeatherProvider(Provider):
+    name = "weather"
+    ttl = 15 * 60
+    stale_ttl = 3 * 60 * 60
+
+    def configured(self, site):
+        return bool(settings.openweather_api_key and site.get("lat") and site.get("lng"))
+
+    async def fetch(self, client, site):
+        r = await client.get(
+            "https://api.openweathermap.org/data/2.5/weather",
+            params={"lat": site["lat"], "lon": site["lng"], "units": "imperial",
+                    "appid": settings.openweather_api_key},
+            timeout=FETCH_TIMEOUT,
+        )
+        r.raise_for_status()
+        body = r.json()
+        current = (body.get("weather") or [{}])[0]
+        return {
+            "temp": round(body["main"]["temp"]),
+            "feels_like": round(body["main"].get("feels_like", body["main"]["temp"])),
+            "description": current.get("description", ""),
+            "icon": current.get("icon", ""),
+        }
+
+
+class PlacesProvider(Provider):
+    name = "places"
+
+    def configured(self, site):
+        return bool(settings.google_places_api_key and site.get("site_name"))
+
+    async def fetch(self, client, site):
+        query = ", ".join(filter(None, [site.get("site_name"), site.get("address"), site.get("city"), site.get("state")]))
+        r = await client.get(
+            "https://maps.googleapis.com/maps/api/place/findplacefromtext/json",
+            params={"input": query, "inputtype": "textquery",
+                    "fields": "place_id,name,rating,user_ratings_total",
+                    "key": settings.google_places_api_key},
+            timeout=FETCH_TIMEOUT,
+        )
+        r.raise_for_status()
+        place = (r.json().get("candidates") or [{}])[0]
+        return {
+            "rating": place.get("rating"),
+            "count": place.get("user_ratings_total", 0),
+            "url": f"https://www.google.com/maps/place/?q=place_id:{place['place_id']}" if place.get("place_id") else "",
+        }
+
+
+class YelpProvider(Provider):
+    name = "yelp"
+
+    def configured(self, site):
+        return bool(settings.yelp_api_key and site.get("site_name") and site.get("lat") and site.get("lng"))
+
+    async def fetch(self, client, site):
+        r = await client.get(
+            "https://api.yelp.com/v3/businesses/search",
+            params={"term": site["site_name"], "latitude": site["lat"], "longitude": site["lng"], "limit": 1},
+            headers={"Authorization": f"Bearer {settings.yelp_api_key}"},
+            timeout=FETCH_TIMEOUT,
+        )
+        r.raise_for_status()
+        biz = (r.json().get("businesses") or [{}])[0]
+        return {"rating": biz.get("rating"), "count": biz.get("review_count", 0), "url": biz.get("url", "")}
+
+
+class FacebookProvider(Provider):
+    name = "facebook"
+
+    @staticmethod
+    def _page(site) -> str:
+        # SiteSetting.facebook holds the page URL; the Graph API wants its slug
+        return urlparse(site.get("facebook") or "").path.strip("/").split("/")[0]
+
+    def configured(self, site):
+        return bool(settings.facebook_graph_token and self._page(site))
+
+    async def fetch(self, client, site):
+        r = await client.get(
+            f"https://graph.facebook.com/v19.0/{self._page(site)}",
+            params={"fields": "name,fan_count,followers_count", "access_token": settings.facebook_graph_token},
+            timeout=FETCH_TIMEOUT,
+        )
+        r.raise_for_status()
+        page = r.json()
+        return {"followers": page.get("followers_count") or page.get("fan_count") or 0, "url": site.get("facebook", "")}
+
+
+class FakeProvider(Provider):
+    """Canned data, always configured; for offline dev and tests."""
+
+    def __init__(self, name: str, data: Dict[str, Any], ttl: float = 60):
+        self.name = name
+        self.data = data
+        self.ttl = ttl
+        self.calls = 0
+
+    def configured(self, site):
+        return True
+
+    async def fetch(self, client, site):
+        self.calls += 1
+        return dict(self.data)
+
+
+FAKE_DATA = {
+    "weather": {"temp": 68, "feels_like": 67, "description": "clear sky", "icon": "01d"},
+    "places": {"rating": 4.6, "count": 312, "url": ""},
+    "yelp": {"rating": 4.5, "count": 87, "url": ""},
+    "facebook": {"followers": 5400, "url": ""},
+}
+
+
+class Integrations:
+    def __init__(self):
+        self.providers: Dict[str, Provider] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._failed_at: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, provider: Provider) -> None:
+        self.providers[provider.name] = provider
+        store.delete(provider.name)
+
+    # ---------- request path: cache only ----------
+    def _entry(self, name: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        return store.get(name)
+
+    def peek(self, name: str) -> Optional[Dict[str, Any]]:
+        """Cached data for `name` (maybe stale, maybe None); never waits on the network."""
+        entry = self._entry(name)
+        provider = self.providers.get(name)
+        if provider is not None and (entry is None or time.time() - entry[1] > provider.ttl):
+            self._schedule(name)
+        return entry[0] if entry else None
+
+    def _schedule(self, name: str) -> None:
+        if name in self._inflight or time.time() - self._failed_at.get(name, 0) < RETRY_AFTER:
+            return
+        try:
+            asyncio.get_running_loop().create_task(self.refresh(name))
+        except RuntimeError:
+            pass  # no loop (sync caller in a worker thread): the sweep will get it
+
+    # ---------- refresh (single-flight) ----------
+    async def refresh(self, name: str) -> Optional[Dict[str, Any]]:
+        task = self._inflight.get(name)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._fetch(name))
+            self._inflight[name] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(name, None))
+        # shield: one caller giving up doesn't cancel the fetch for the others
+        return await asyncio.shield(task)
+
+    async def _fetch(self, name: str) -> Optional[Dict[str, Any]]:
+        provider = self.providers.get(name)
+        if provider is None:
+            return None
+        site = await get_cached_site_settings_async() or {}
+        if not provider.configured(site):
+            return None
+        try:
+            with metrics.outbound(name):
+                data = await asyncio.wait_for(provider.fetch(get_client(), site), FETCH_TIMEOUT)
+        except Exception as e:
+            self._failed_at[name] = time.time()
+            print(f"Integration refresh error ({name}): {e!r}")
+            return None
+        self._failed_at.pop(name, None)
+        store.set(name, (data, time.time()), ttl=provider.stale_ttl, tags=("site",))
+        return data
+
+    # ---------- background sweep ----------
+    async def refresh_due(self) -> None:
+        now = time.time()
+        due = []
+        for name, provider in self.providers.items():
+            entry = self._entry(name)
+            if entry is None or now - entry[1] > provider.ttl * REFRESH_AHEAD:
+                if now - self._failed_at.get(name, 0) >= RETRY_AFTER:
+                    due.append(name)
+        if due:
+            await asyncio.gather(*(self.refresh(n) for n in due), return_exceptions=True)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Integration sweep error: {e!r}")
+            await asyncio.sleep(REFRESH_INTERVAL)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="integrations-refresh")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+integrations = Integrations()
+
+
+def use_real_providers() -> None:
+    for provider in (WeatherProvider(), PlacesProvider(), YelpProvider(), FacebookProvider()):
+        integrations.register(provider)
+
+
+def use_fake_providers(data: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+    for name, payload in (data or FAKE_DATA).items():
+        integrations.register(FakeProvider(name, payload))
+
+
+if settings.integrations_fake:
+    use_fake_providers()
+else:
+    use_real_providers()
+
+
+def weather_for_site(site: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Weather widget data, or None if disabled / not fetched yet."""
+    if not site or not site.get("show_weather"):
+        return None
+    return integrations.peek("weather")
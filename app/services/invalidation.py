@@ -0,0 +1,95 @@
+# app/services/invalidation.py
+"""
+Cache invalidation driven by SQLAlchemy session events.
+
+Routers just commit. While a session flushes we note which mapped classes
+were inserted/updated/deleted (plus bulk query.update()/.delete() calls),
+translate them to cache tags, and once the transaction commits we bump those
+tags in services/cache.py. Rolled-back work never invalidates anything.
+"""
+from typing import Dict, Set, Tuple, Type, Union
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..models.events import Event
+from ..models.media import MediaMeta
+from ..models.menu import MenuCategory, MenuItem, MenuItemTag, MenuTag
+from ..models.musician import MusicianApp
+from ..models.rentals import Rental
+from ..models.site import HolidayOverride, Hours, SiteSetting
+from .cache import invalidate_tags
+
+# mapped class -> cache tags that depend on its rows
+TAGS_BY_MODEL: Dict[Type, Tuple[str, ...]] = {
+    MenuItem: ("menu",),
+    MenuTag: ("menu",),
+    MenuCategory: ("menu",),
+    MenuItemTag: ("menu",),
+    Event: ("events",),
+    SiteSetting: ("site",),
+    Hours: ("hours",),
+    HolidayOverride: ("hours",),
+    Rental: ("rentals",),
+    MusicianApp: ("musician",),
+    MediaMeta: ("menu", "events"),     # image sizes/placeholders in both payloads
+}
+
+_PENDING = "cache_tags"  # key in Session.info
+
+
+def _pending(session: Session) -> Set[str]:
+    return session.info.setdefault(_PENDING, set())
+
+
+def tags_for(cls: Type) -> Tuple[str, ...]:
+    for klass in cls.__mro__:
+        tags = TAGS_BY_MODEL.get(klass)
+        if tags:
+            return tags
+    return ()
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    pending = _pending(session)
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        # dirty can hold objects with no net column change; tags are cheap,
+        # a spurious bump only costs one rebuild
+        pending.update(tags_for(type(obj)))
+
+
+def _do_orm_execute(state) -> None:
+    # query.update()/.delete() and insert() statements bypass the unit of work,
+    # so catch them here
+    if not (state.is_update or state.is_delete or state.is_insert):
+        return
+    mapper = state.bind_mapper
+    if mapper is not None:
+        _pending(state.session).update(tags_for(mapper.class_))
+
+
+def _after_commit(session: Session) -> None:
+    tags = session.info.pop(_PENDING, None)
+    if tags:
+        invalidate_tags(*sorted(tags))
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING, None)
+
+
+_installed: Set[int] = set()
+
+
+def install(factory: Union[sessionmaker, Type[Session]]) -> None:
+    """
+    Attach the listeners to a session factory (idempotent). AsyncSession runs
+    on a sync Session class, so pass db.session.AsyncBridgeSession for those.
+    """
+    if id(factory) in _installed:
+        return
+    event.listen(factory, "after_flush", _after_flush)
+    event.listen(factory, "do_orm_execute", _do_orm_execute)
+    event.listen(factory, "after_commit", _after_commit)
+    event.listen(factory, "after_rollback", _after_rollback)
+    _installed.add(id(factory))
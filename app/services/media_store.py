@@ -0,0 +1,180 @@
+# app/services/media_store.py
+"""
+Content-addressed store for locally saved media.
+
+Files live at static/media/cas/<first 2 hex>/<sha256><ext>, so the same
+bytes uploaded twice (one photo on several menu items, or an edit form
+re-saved with the same image) share one file and one URL. Since the URL
+changes whenever the content does, it's served with an immutable
+Cache-Control (see services/static_files.py).
+
+media_blobs has one row per blob. Whether a blob is still in use isn't
+counted: it's whatever MenuItem/Event.image_url rows hold its URL, so a
+write path that changes image_url some other way can't make it drift.
+MediaCollector periodically removes blobs no row uses that haven't been
+stored or claimed within UNCLAIMED_GRACE; the grace covers uploads whose
+URL hasn't been saved onto a row yet (/api/upload hands back a URL for a
+later create/update call, which claim()s it).
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from starlette.concurrency import run_in_threadpool
+
+from ..db.session import SessionLocal
+from ..models.events import Event
+from ..models.media import MediaBlob
+from ..models.menu import MenuItem
+from .media_stream import MEDIA_ROOT, StagedUpload
+
+CAS_DIR = os.path.join(MEDIA_ROOT, "cas")
+CAS_PREFIX = "/static/media/cas/"
+UNCLAIMED_GRACE = timedelta(days=1)
+COLLECT_INTERVAL = 60 * 60     # seconds between collection passes
+COLLECT_BATCH = 100
+
+
+def is_cas_url(url: Optional[str]) -> bool:
+    return bool(url) and url.startswith(CAS_PREFIX)
+
+
+def cas_url(sha256: str, ext: str) -> str:
+    return f"{CAS_PREFIX}{sha256[:2]}/{sha256}{ext}"
+
+
+def _path_for(url: str) -> str:
+    rel = url[len(CAS_PREFIX):]
+    # URLs come from our own rows, but never let one point outside CAS_DIR
+    path = os.path.normpath(os.path.join(CAS_DIR, rel))
+    if not path.startswith(CAS_DIR + os.sep):
+        raise ValueError(f"not a media store path: {url}")
+    return path
+
+
+def store(staged: StagedUpload) -> str:
+    """Put `staged`'s bytes in the store (once per content); returns its URL."""
+    url = cas_url(staged.sha256, staged.ext)
+    db = SessionLocal()
+    try:
+        stmt = (
+            pg_insert(MediaBlob)
+            .values(sha256=staged.sha256, url=url, mime=staged.mime, size=staged.size)
+            # restarts the grace period, so a blob about to be collected is kept
+            .on_conflict_do_update(index_elements=[MediaBlob.sha256], set_={"created_at": func.now()})
+            .returning(MediaBlob.url)
+        )
+        url = db.execute(stmt).scalar_one()
+        # we hold the row lock until commit: place the bytes if they're not there
+        path = _path_for(url)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(staged.path, path)
+            staged.path = None
+        db.commit()
+        return url
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+        staged.discard()
+
+
+def claim(url: Optional[str]) -> bool:
+    """
+    Keep the blob at `url` while it's being saved onto a row (restarts its
+    grace period). True for non-CAS URLs; False if the blob is already gone.
+    """
+    if not is_cas_url(url):
+        return True
+    db = SessionLocal()
+    try:
+        blob = db.query(MediaBlob).filter(MediaBlob.url == url).with_for_update().first()
+        if blob is None:
+            return False
+        blob.created_at = datetime.utcnow()
+        db.commit()
+        return True
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _in_use(url_col):
+    return (
+        select(MenuItem.id).where(MenuItem.image_url == url_col).exists()
+        | select(Event.id).where(Event.image_url == url_col).exists()
+    )
+
+
+def collect_unreferenced(grace: timedelta = UNCLAIMED_GRACE, limit: int = COLLECT_BATCH) -> int:
+    """Remove up to `limit` blobs no row uses, idle for longer than `grace`; returns how many."""
+    db = SessionLocal()
+    removed = 0
+    try:
+        blobs = (
+            db.query(MediaBlob)
+              .filter(MediaBlob.created_at < datetime.utcnow() - grace, ~_in_use(MediaBlob.url))
+              .order_by(MediaBlob.created_at)
+              .limit(limit)
+              .with_for_update(skip_locked=True)   # stores / claims in progress win
+              .all()
+        )
+        for blob in blobs:
+            db.delete(blob)
+            db.flush()
+            try:
+                os.unlink(_path_for(blob.url))
+            except FileNotFoundError:
+                pass
+            removed += 1
+        db.commit()
+        return removed
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+class MediaCollector:
+    """Background task: collect_unreferenced() every COLLECT_INTERVAL."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="media-collector")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                removed = COLLECT_BATCH
+                while removed == COLLECT_BATCH:
+                    removed = await run_in_threadpool(collect_unreferenced)
+                    if removed:
+                        print(f"Collected {removed} unused media blobs")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Media collection error: {e!r}")
+            await asyncio.sleep(COLLECT_INTERVAL)
+
+
+collector = MediaCollector()
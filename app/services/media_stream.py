@@ -0,0 +1,126 @@
+# app/services/media_stream.py
+"""
+Streaming writer for uploaded media.
+
+An UploadFile is copied in CHUNK_SIZE pieces to a temp file under
+app/.upload_tmp (same filesystem as the final location, but outside the
+/static mount so partial files are never served), so memory stays
+flat no matter how big the upload is. On the way through we enforce
+settings.max_upload_bytes, hash the bytes (SHA-256) and sniff the real type
+from the magic bytes; the client's filename and Content-Type are not
+trusted. services/media_store.py then renames the temp file atomically
+into place, so readers never see a half-written file.
+"""
+import hashlib
+import os
+import tempfile
+from typing import BinaryIO, Optional
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from ..settings import get_settings
+from . import metrics
+
+APP_DIR = os.path.dirname(os.path.dirname(__file__))
+MEDIA_ROOT = os.path.join(APP_DIR, "static", "media")
+TMP_DIR = os.path.join(APP_DIR, ".upload_tmp")
+CHUNK_SIZE = 64 * 1024
+SNIFF_BYTES = 16
+
+EXT_BY_MIME = {"image/jpeg": ".jpg", "image/png": ".png", "image/webp": ".webp", "image/gif": ".gif"}
+
+
+class UploadRejected(ValueError):
+    status_code = 400
+
+
+class UploadTooLarge(UploadRejected):
+    status_code = 413
+
+
+class UnsupportedMedia(UploadRejected):
+    status_code = 415
+
+
+def sniff_mime(head: bytes) -> Optional[str]:
+    """Image type from the leading bytes, or None if it isn't one we accept."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+class StagedUpload:
+    """A fully received, validated upload sitting in TMP_DIR."""
+    __slots__ = ("path", "size", "sha256", "mime", "filename")
+
+    def __init__(self, path: str, size: int, sha256: str, mime: str, filename: str):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.mime = mime
+        self.filename = filename
+
+    @property
+    def ext(self) -> str:
+        return EXT_BY_MIME[self.mime]
+
+    def discard(self) -> None:
+        if self.path:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+
+
+def _copy(src: BinaryIO, max_bytes: int, filename: str) -> StagedUpload:
+    os.makedirs(TMP_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=TMP_DIR, suffix=".part")
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    mime = None
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"File is larger than {max_bytes / 1_000_000:g} MB")
+                if mime is None:
+                    head += chunk[:SNIFF_BYTES - len(head)]
+                    if len(head) >= SNIFF_BYTES:
+                        # reject non-images before reading the rest
+                        mime = sniff_mime(head)
+                        if mime is None:
+                            raise UnsupportedMedia("Unsupported file type")
+                digest.update(chunk)
+                out.write(chunk)
+        if mime is None:
+            mime = sniff_mime(head)
+        if mime is None:
+            raise UnsupportedMedia("Unsupported file type")
+        return StagedUpload(tmp_path, size, digest.hexdigest(), mime, filename)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+async def stage_upload(file: UploadFile, max_bytes: Optional[int] = None) -> StagedUpload:
+    """Stream `file` to a temp file (from the start), validating as we go."""
+    limit = max_bytes or get_settings().max_upload_bytes
+    await file.seek(0)
+    # one threadpool hop for the whole copy instead of one per chunk
+    with metrics.upload_stage.time():
+        staged = await run_in_threadpool(_copy, file.file, limit, file.filename or "upload")
+    metrics.upload_size.observe(staged.size)
+    return staged
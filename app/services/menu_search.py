@@ -0,0 +1,203 @@
+# app/services/menu_search.py
+"""
+In-memory search / facet index over menu items.
+
+Built from the menu snapshot (services/menu_snapshot.py), so it costs no
+queries. Each item gets a slot; postings and facets are Python ints used as
+bitsets (bit n = slot n), which keeps "vegan AND gluten-free in Starters"
+down to a couple of integer ANDs. Prefix matching walks a sorted token list
+with bisect.
+
+When a new snapshot is built (menu edit, or TTL expiry), only items whose
+indexed fields changed are re-indexed; everything else keeps its bits.
+"""
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional
+
+from .menu_snapshot import get_menu_snapshot
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    folded = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().lower()
+    return _TOKEN_RE.findall(folded)
+
+
+def _doc_key(row: Dict[str, Any]):
+    """The fields the index depends on; a change here means re-index the item."""
+    return (row["name"], row.get("description"), row["category"], tuple(row["tags"]), row["available"])
+
+
+def _bits(mask: int) -> Iterable[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class MenuSearchIndex:
+    def __init__(self):
+        self._snapshot = None                   # snapshot the index was last synced to
+        self._lock = threading.Lock()
+        self._slot_by_id: Dict[int, int] = {}
+        self._id_by_slot: Dict[int, int] = {}
+        self._free: List[int] = []
+        self._next_slot = 0
+        self._docs: Dict[int, tuple] = {}       # item id -> _doc_key at index time
+        self._postings: Dict[str, int] = {}     # token -> bitset
+        self._tokens: List[str] = []            # sorted, for prefix scans
+        self._by_tag: Dict[str, int] = {}       # tag slug -> bitset
+        self._by_category: Dict[str, int] = {}  # category slug -> bitset
+        self._available = 0
+        self._all = 0
+        self._order: Dict[int, int] = {}        # item id -> position in snapshot (name order)
+
+    # ---------- maintenance ----------
+    def _alloc(self, item_id: int) -> int:
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = self._next_slot
+            self._next_slot += 1
+        self._slot_by_id[item_id] = slot
+        self._id_by_slot[slot] = item_id
+        return slot
+
+    @staticmethod
+    def _clear_bit(table: Dict[str, int], key: str, bit: int) -> bool:
+        mask = table.get(key, 0) & ~bit
+        if mask:
+            table[key] = mask
+            return False
+        table.pop(key, None)
+        return True
+
+    def _remove(self, item_id: int) -> None:
+        slot = self._slot_by_id.pop(item_id)
+        del self._id_by_slot[slot]
+        name, desc, category, tags, _ = self._docs.pop(item_id)
+        bit = 1 << slot
+        for tok in set(tokenize(name)) | set(tokenize(desc)):
+            if self._clear_bit(self._postings, tok, bit):
+                i = bisect_left(self._tokens, tok)
+                if i < len(self._tokens) and self._tokens[i] == tok:
+                    del self._tokens[i]
+        for tag in tags:
+            self._clear_bit(self._by_tag, tag, bit)
+        self._clear_bit(self._by_category, category, bit)
+        self._available &= ~bit
+        self._all &= ~bit
+        self._free.append(slot)
+
+    def _add(self, item_id: int, doc: tuple) -> None:
+        slot = self._alloc(item_id)
+        bit = 1 << slot
+        name, desc, category, tags, available = doc
+        for tok in set(tokenize(name)) | set(tokenize(desc)):
+            if tok not in self._postings:
+                insort(self._tokens, tok)
+            self._postings[tok] = self._postings.get(tok, 0) | bit
+        for tag in tags:
+            self._by_tag[tag] = self._by_tag.get(tag, 0) | bit
+        self._by_category[category] = self._by_category.get(category, 0) | bit
+        if available:
+            self._available |= bit
+        self._all |= bit
+        self._docs[item_id] = doc
+
+    def sync(self, snapshot) -> None:
+        """Bring the index in line with `snapshot`, touching only changed items."""
+        if snapshot is self._snapshot:
+            return
+        with self._lock:
+            if snapshot is self._snapshot:
+                return
+            seen = set()
+            for row in snapshot.items:
+                item_id = row["id"]
+                seen.add(item_id)
+                doc = _doc_key(row)
+                old = self._docs.get(item_id)
+                if old == doc:
+                    continue
+                if old is not None:
+                    self._remove(item_id)
+                self._add(item_id, doc)
+            for item_id in [i for i in self._docs if i not in seen]:
+                self._remove(item_id)
+            self._order = {row["id"]: pos for pos, row in enumerate(snapshot.items)}
+            self._snapshot = snapshot
+
+    # ---------- queries ----------
+    def _prefix_mask(self, prefix: str) -> int:
+        mask = 0
+        i = bisect_left(self._tokens, prefix)
+        while i < len(self._tokens) and self._tokens[i].startswith(prefix):
+            mask |= self._postings[self._tokens[i]]
+            i += 1
+        return mask
+
+    def search(
+        self,
+        q: str = "",
+        tags: Iterable[str] = (),
+        categories: Iterable[str] = (),
+        available_only: bool = False,
+    ) -> List[int]:
+        """
+        Item ids matching every query term (as a prefix), every tag, and any
+        of the categories, in menu (name) order.
+        """
+        with self._lock:
+            return self._search(q, tags, categories, available_only)
+
+    def _search(self, q, tags, categories, available_only) -> List[int]:
+        mask = self._all
+        for term in tokenize(q):
+            mask &= self._prefix_mask(term)
+            if not mask:
+                return []
+        for tag in tags:
+            mask &= self._by_tag.get(tag, 0)
+        categories = list(categories)
+        if categories:
+            cat_mask = 0
+            for slug in categories:
+                cat_mask |= self._by_category.get(slug, 0)
+            mask &= cat_mask
+        if available_only:
+            mask &= self._available
+        ids = [self._id_by_slot[s] for s in _bits(mask)]
+        ids.sort(key=lambda i: self._order.get(i, 0))
+        return ids
+
+
+_index = MenuSearchIndex()
+
+
+def search_item_ids(
+    q: str = "",
+    tags: Iterable[str] = (),
+    categories: Iterable[str] = (),
+    available_only: bool = False,
+) -> List[int]:
+    _index.sync(get_menu_snapshot())
+    return _index.search(q, tags=tags, categories=categories, available_only=available_only)
+
+
+def search_items(
+    q: str = "",
+    tags: Iterable[str] = (),
+    categories: Iterable[str] = (),
+    available_only: bool = False,
+) -> List[Dict[str, Any]]:
+    """Search and return the snapshot rows for the matching items."""
+    snapshot = get_menu_snapshot()
+    ids = search_item_ids(q, tags=tags, categories=categories, available_only=available_only)
+    return [snapshot.item_by_id[i] for i in ids if i in snapshot.item_by_id]
@@ -0,0 +1,119 @@
+# app/services/menu_snapshot.py
+"""
+Precomputed menu, rebuilt once per "menu" data version.
+
+Everything the public /menu page, the homepage carousel and the read-only
+/api menu lists need is derived here in one pass: template payloads, lookup
+maps and pre-serialized JSON bodies. Handlers just pick fields off the
+snapshot, so a menu view costs no queries until an admin edits the menu
+(services/invalidation.py evicts it on commit).
+"""
+from typing import Any, Dict, List
+
+from pydantic import TypeAdapter
+
+from ..db.session import SessionLocal
+from ..models.menu import MenuCategory, MenuItem, MenuTag
+from ..schemas.menu import CategoryOut, ItemOut, TagOut
+from .cache import cache, versions
+from .image_meta import lookup as image_lookup
+
+MENU_TTL = 60 * 60  # invalidation does the real work; this is the cross-worker backstop
+PLACEHOLDER_IMG = "/assets/images/placeholders/dish-1.jpg"
+FEATURED_LIMIT = 3
+
+_categories_json = TypeAdapter(List[CategoryOut])
+_tags_json = TypeAdapter(List[TagOut])
+_items_json = TypeAdapter(List[ItemOut])
+
+
+class MenuSnapshot:
+    __slots__ = (
+        "version",
+        # template payloads
+        "categories", "tags", "items", "featured",
+        # lookup maps
+        "category_by_id", "category_by_slug", "tag_by_slug", "item_by_id",
+        # pre-serialized API bodies (same shape as the response_model output)
+        "categories_json", "tags_json", "items_json",
+    )
+
+    def __init__(self, **kw):
+        for k in self.__slots__:
+            setattr(self, k, kw.get(k))
+
+
+def _dump(adapter: TypeAdapter, rows) -> bytes:
+    return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+
+def _build() -> MenuSnapshot:
+    version = versions.get("menu")
+    db = SessionLocal()
+    try:
+        categories = db.query(MenuCategory).order_by(MenuCategory.sort_order.asc(), MenuCategory.name.asc()).all()
+        tags = db.query(MenuTag).order_by(MenuTag.type.asc(), MenuTag.name.asc()).all()
+        # MenuItem.tags is lazy="selectin": one extra IN query for all items
+        items = db.query(MenuItem).order_by(MenuItem.name.asc()).all()
+        # width/height/color/preview per image (services/image_meta.py)
+        images = image_lookup(db, (it.image_url for it in items))
+
+        # plain dicts only: nothing in the snapshot should hold on to ORM state
+        cat_rows = [{"id": c.id, "name": c.name, "slug": c.slug, "sort_order": c.sort_order} for c in categories]
+        tag_rows = [{"id": t.id, "name": t.name, "slug": t.slug, "type": t.type, "icon": t.icon} for t in tags]
+        slug_by_cat_id = {c.id: c.slug for c in categories}
+        item_payload = []
+        item_by_id: Dict[int, Dict[str, Any]] = {}
+        for it in items:
+            # use slug for category if present
+            cat_slug = slug_by_cat_id.get(it.category_id) or it.category
+            row = {
+                "id": it.id,
+                "name": it.name,
+                "price": float(it.price),
+                "category": cat_slug or "other",
+                "tags": [t.slug for t in (it.tags or [])],
+                "img": it.image_url or PLACEHOLDER_IMG,
+                "image_url": it.image_url or "",
+                "image": images.get(it.image_url or ""),
+                "description": it.description,
+                "available": bool(it.available),
+                "featured_rank": it.featured_rank or 0,
+            }
+            item_payload.append(row)
+            item_by_id[it.id] = row
+
+        featured = sorted(
+            (r for r in item_payload if r["featured_rank"] > 0 and r["available"]),
+            key=lambda r: r["featured_rank"],
+        )[:FEATURED_LIMIT]
+
+        # API keeps its historical order: featured first, then by name
+        api_items = sorted(items, key=lambda it: (-(it.featured_rank or 0), it.name))
+
+        return MenuSnapshot(
+            version=version,
+            categories=[{"id": c.slug or str(c.id), "name": c.name} for c in categories],
+            tags=[t.slug for t in tags],
+            items=item_payload,
+            featured=featured,
+            category_by_id={c.id: cat_rows[i] for i, c in enumerate(categories)},
+            category_by_slug={c.slug: cat_rows[i] for i, c in enumerate(categories) if c.slug},
+            tag_by_slug={t.slug: tag_rows[i] for i, t in enumerate(tags)},
+            item_by_id=item_by_id,
+            categories_json=_dump(_categories_json, categories),
+            tags_json=_dump(_tags_json, tags),
+            items_json=_dump(_items_json, api_items),
+        )
+    finally:
+        db.close()
+
+
+def get_menu_snapshot() -> MenuSnapshot:
+    return cache.get_or_set("menu_snapshot", _build, ttl=MENU_TTL, tags=("menu",))
+
+
+async def get_menu_snapshot_async() -> MenuSnapshot:
+    """For async handlers: a rebuild runs in a worker thread, not on the loop."""
+    return await cache.get_or_set_async("menu_snapshot", _build, ttl=MENU_TTL, tags=("menu",))
+
@@ -0,0 +1,279 @@
+# app/services/metrics.py
+"""
+In-process metrics in the Prometheus text format (served at /metrics).
+
+A deliberately small registry, no client library: counters, gauges and
+fixed-bucket histograms keyed by label tuples, each behind one lock, so a
+request costs a handful of dict lookups. Route labels use the matched route
+template ("/api/events/data", "/admin/events/edit/{event_id}"), never the raw
+path, to keep cardinality bounded.
+
+Some values are read at scrape time instead of being recorded: cache stats
+(services/cache.py) and connection pool occupancy (register_pool).
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from ..db.query_stats import current as current_query_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+Labels = Tuple[str, ...]
+
+
+def _fmt_labels(names: Tuple[str, ...], values: Labels, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(v: float) -> str:
+    # %g would round large counters to 6 significant digits
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *a, **kw):
+        super().__init__(*a, **kw)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_fmt_labels(self.labels, k)} {_num(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last = +Inf), sum, count]
+        self._series: Dict[Labels, list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *labels: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v[0]), v[1], v[2]) for k, v in self._series.items()]
+        out = self.header()
+        bounds = [f'le="{b}"' for b in self.buckets] + ['le="+Inf"']
+        for labels, counts, total, count in items:
+            running = 0
+            for le, n in zip(bounds, counts):
+                running += n
+                out.append(f"{self.name}_bucket{_fmt_labels(self.labels, labels, le)} {running}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.labels, labels)} {_num(total)}")
+            out.append(f"{self.name}_count{_fmt_labels(self.labels, labels)} {count}")
+        return out
+
+
+registry: List[_Metric] = []
+_collectors: List[Callable[[], List[str]]] = []
+
+# ---------- HTTP ----------
+http_requests = Counter("http_requests_total", "Responses by route and status code.", ("method", "route", "status"))
+http_latency = Histogram("http_request_duration_seconds", "Time to the end of the response body.", ("method", "route"))
+http_size = Histogram("http_response_size_bytes", "Response body size (as sent).", ("route",), buckets=SIZE_BUCKETS)
+http_in_flight = Gauge("http_requests_in_flight", "Requests currently being handled.")
+http_db_queries = Histogram("http_request_db_queries", "SQL statements per request.", ("route",), buckets=COUNT_BUCKETS)
+
+# ---------- DB pool ----------
+pool_wait = Histogram("db_pool_checkout_wait_seconds", "Time waiting for a pooled connection.", ("pool",))
+
+# ---------- uploads / outbound ----------
+outbound_latency = Histogram("outbound_request_duration_seconds", "Calls to external services.", ("target", "outcome"))
+upload_size = Histogram("upload_size_bytes", "Accepted upload sizes.", buckets=SIZE_BUCKETS + (16777216,))
+upload_stage = Histogram("upload_stage_seconds", "Streaming an upload to disk.")
+
+# ---------- images (/img) ----------
+image_cache = Counter("image_derivative_requests_total", "Resized image lookups by disk cache result.", ("result",))
+image_render = Histogram("image_render_seconds", "Resizing an image in the worker pool.", ("format",))
+
+
+def route_label(scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path:
+        return path
+    raw = scope.get("path", "")
+    for prefix in ("/static", "/assets", "/img"):
+        if raw.startswith(prefix + "/"):
+            return prefix
+    return "<unmatched>"
+
+
+METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+
+def method_label(scope) -> str:
+    """The request method, or "other": clients can send any token there."""
+    method = scope["method"]
+    return method if method in METHODS else "other"
+
+
+class _Call:
+    __slots__ = ("outcome",)
+
+    def __init__(self):
+        self.outcome = "ok"
+
+
+@contextmanager
+def outbound(target: str):
+    """
+    Time a call to an external service. An exception marks it "error"; callers
+    that report failure by value can set `call.outcome` themselves.
+    """
+    call = _Call()
+    started = time.perf_counter()
+    try:
+        yield call
+    except BaseException:
+        call.outcome = "error"
+        raise
+    finally:
+        outbound_latency.observe(time.perf_counter() - started, target, call.outcome)
+
+
+def register_collector(fn: Callable[[], List[str]]) -> None:
+    """Add a function producing extra exposition lines at scrape time."""
+    _collectors.append(fn)
+
+
+def register_pool(name: str, pool) -> None:
+    """Export occupancy of a SQLAlchemy QueuePool at scrape time."""
+    def collect() -> List[str]:
+        try:
+            values = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": max(pool.overflow(), 0),
+                "idle": pool.checkedin(),
+            }
+        except Exception:
+            return []
+        return [f'db_pool_connections{{pool="{name}",state="{k}"}} {v}' for k, v in values.items()]
+    register_collector(collect)
+
+
+def _cache_lines() -> List[str]:
+    from .cache import all_cache_stats
+    out = [
+        "# HELP cache_hit_ratio Hits / lookups per in-process cache.",
+        "# TYPE cache_hit_ratio gauge",
+    ]
+    stats = all_cache_stats()
+    for name, s in stats.items():
+        out.append(f'cache_hit_ratio{{cache="{name}"}} {s["hit_ratio"]:.4f}')
+    for field, kind in (("hits", "counter"), ("misses", "counter"), ("evictions", "counter"), ("size", "gauge")):
+        metric = f"cache_{field}" + ("_total" if kind == "counter" else "")
+        out += [f"# TYPE {metric} {kind}"]
+        out += [f'{metric}{{cache="{name}"}} {s[field]}' for name, s in stats.items()]
+    return out
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in registry:
+        lines += metric.render()
+    for collect in [_cache_lines, lambda: ["# TYPE db_pool_connections gauge"]] + _collectors:
+        try:
+            lines += collect()
+        except Exception as e:  # a broken collector shouldn't take /metrics down
+            lines.append(f"# collector error: {e!r}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Records latency, size, status and in-flight count for every HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = ["500"]
+        size = [0]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = str(message["status"])
+            elif message["type"] == "http.response.body":
+                size[0] += len(message.get("body", b""))
+            await send(message)
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec()
+            route = route_label(scope)
+            method = method_label(scope)
+            http_latency.observe(time.perf_counter() - started, method, route)
+            http_requests.inc(method, route, status[0])
+            http_size.observe(size[0], route)
+            stats = current_query_stats()
+            if stats is not None:
+                http_db_queries.observe(stats.count, route)
@@ -0,0 +1,156 @@
+# app/services/page_cache.py
+"""
+Rendered-page cache for the public HTML routes.
+
+Pages are keyed by path + variant (full page vs HTMX partial, from the
+HX-Request header); query strings are ignored because the public handlers
+don't read them, and so is the Host header, so cached pages must not contain
+host-derived URLs (use asset_url() / PUBLIC_URL, not request.url_for). Each
+entry keeps the rendered body plus gzip (and brotli, when the package is
+installed) encodings made once at store time, in a worker thread, and is
+tagged with the data it was built from so services/invalidation.py can evict
+it on commit. Concurrent misses for one page render it once (single-flight);
+that shared render gets its own DB session in place of the leader's
+request-scoped one, so it survives the leader disconnecting.
+Logged-in admins always get a fresh render. Decorated handlers
+also get ETag / Last-Modified validators (services/conditional.py).
+"""
+import functools
+import gzip
+from typing import Dict, Iterable, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from ..db.session import AsyncSessionLocal
+from ..security.auth import get_current_admin
+from .cache import SingleFlightTimeout, TTLCache, flight, versions
+
+try:  # optional: brotli only if the wheel is available
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+PAGE_TTL = 5 * 60           # backstop for time-based content ("upcoming" events)
+MIN_COMPRESS_SIZE = 1024    # same threshold as the GZipMiddleware in main.py
+# paid on every cache miss, unlike build-time asset compression: keep it cheap
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+BASE_TAGS = ("site", "hours")  # footer hours + socials are on every page
+
+pages = TTLCache("pages", default_ttl=PAGE_TTL, maxsize=64)
+
+
+class CachedPage:
+    __slots__ = ("body", "encoded", "media_type", "status_code")
+
+    def __init__(self, body: bytes, media_type: str, status_code: int = 200,
+                 encoded: Optional[Dict[str, bytes]] = None):
+        self.body = body
+        self.media_type = media_type
+        self.status_code = status_code
+        self.encoded: Dict[str, bytes] = compress_variants(body) if encoded is None else encoded
+
+
+def compress_variants(body: bytes) -> Dict[str, bytes]:
+    """Precompute the encodings we can serve for `body` (empty when it's tiny)."""
+    if len(body) < MIN_COMPRESS_SIZE:
+        return {}
+    out = {"gzip": gzip.compress(body, compresslevel=GZIP_LEVEL)}
+    if brotli is not None:
+        out["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return out
+
+
+def pick_encoding(accept_encoding: str, available: Iterable[str]) -> Optional[str]:
+    """Best encoding we have that the client accepts (br over gzip)."""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        token, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.add(token.strip().lower())
+    for enc in ("br", "gzip"):
+        if enc in available and enc in accepted:
+            return enc
+    return None
+
+
+def page_key(request: Request) -> str:
+    variant = "htmx" if request.headers.get("HX-Request") else "full"
+    # not the Host header: clients choose it, and each value would be a new entry
+    return f"{request.url.path}|{variant}"
+
+
+def is_cacheable(request: Request) -> bool:
+    return request.method == "GET" and get_current_admin(request) is None
+
+
+def page_response(request: Request, page: CachedPage, status: str = "HIT") -> Response:
+    headers = {"Vary": "Accept-Encoding, HX-Request", "X-Cache": status}
+    enc = pick_encoding(request.headers.get("accept-encoding", ""), page.encoded)
+    body = page.body
+    if enc:
+        body = page.encoded[enc]
+        # GZipMiddleware passes through responses that already set this
+        headers["Content-Encoding"] = enc
+    return Response(body, status_code=page.status_code, media_type=page.media_type, headers=headers)
+
+
+def cached_page(*tags: str, ttl: Optional[float] = None):
+    """
+    Decorator for public handlers that return a rendered template.
+    The handler must take `request: Request`; only 200 responses are stored.
+    """
+    all_tags = BASE_TAGS + tuple(t for t in tags if t not in BASE_TAGS)
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            request: Request = kwargs["request"]
+            if not is_cacheable(request):
+                return await fn(*args, **kwargs)
+
+            key = page_key(request)
+            page = pages.get(key)
+            if page is not None:
+                return page_response(request, page)
+
+            # concurrent misses for the same page share one render
+            led = False
+
+            async def render():
+                nonlocal led
+                led = True
+                # stamp versions before rendering so a concurrent commit wins
+                stamp = versions.stamp(all_tags)
+                # followers await this task too: don't use the leader's session,
+                # whose dependency teardown closes it if the leader goes away
+                async with AsyncSessionLocal() as db:
+                    own = {k: db if isinstance(v, AsyncSession) else v for k, v in kwargs.items()}
+                    response = await fn(*args, **own)
+                body = getattr(response, "body", None)
+                if response.status_code != 200 or not isinstance(body, bytes):
+                    return None, response
+                # compressing a full page takes milliseconds: not on the loop
+                encoded = await run_in_threadpool(compress_variants, body)
+                page = CachedPage(body, response.media_type or "text/html", encoded=encoded)
+                pages.set(key, page, ttl=ttl, stamp=stamp)
+                return page, response
+
+            try:
+                page, response = await flight.do_async(f"pages:{key}", render)
+            except SingleFlightTimeout:
+                return await fn(*args, **kwargs)
+            if page is not None:
+                return page_response(request, page, status="MISS" if led else "HIT")
+            # not storable (error page, streaming body): followers render their own
+            return response if led else await fn(*args, **kwargs)
+
+        # ConditionalGetMiddleware answers If-None-Match from the same tags
+        wrapper.etag_tags = all_tags
+        return wrapper
+
+    return decorator
@@ -0,0 +1,143 @@
+# app/services/pagination.py
+"""
+Keyset ("seek") pagination for the admin lists.
+
+Pages are ordered newest first on (sort column, id) and the cursor is the
+last row's pair, so page N costs the same as page 1 (an index range scan
+from the cursor) instead of an OFFSET that reads and throws away every
+earlier row. Filters go into the same WHERE, so the index does the work.
+
+Totals come from estimate_count(): an exact count capped at COUNT_CAP rows,
+and past the cap the planner's row estimate for an unfiltered table. The
+template shows "10,000+" rather than paying for a full count on every load.
+
+"Load more" is HTMX: the button requests the same URL plus ?cursor=...,
+and the router renders just the rows partial (is_htmx_request) to swap in.
+"""
+import base64
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from fastapi import HTTPException, Request
+from sqlalchemy import and_, func, or_, select, text, tuple_
+from sqlalchemy.sql import Select
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+COUNT_CAP = 10_000
+
+Cursor = Tuple[Optional[datetime], int]
+
+
+def encode_cursor(value: Optional[datetime], id_: int) -> str:
+    raw = f"{value.isoformat() if value else ''}|{id_}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Cursor]:
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        value, id_ = raw.rsplit("|", 1)
+        return (datetime.fromisoformat(value) if value else None), int(id_)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def parse_date(value: Optional[str], name: str) -> Optional[datetime]:
+    """A YYYY-MM-DD (or full ISO) filter value; blank means no filter."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name} date")
+
+
+def is_htmx_request(request: Request) -> bool:
+    return "HX-Request" in request.headers
+
+
+@dataclass
+class Page:
+    rows: List[Any]
+    next_cursor: Optional[str]
+    total: Optional[int]           # capped / estimated, see estimate_count
+    total_is_estimate: bool
+    next_url: Optional[str] = None
+
+    @property
+    def total_label(self) -> str:
+        if self.total is None:
+            return ""
+        return f"{self.total:,}+" if self.total_is_estimate else f"{self.total:,}"
+
+
+def seek(stmt: Select, sort_col, id_col, cursor: Optional[Cursor]) -> Select:
+    """
+    Order `stmt` newest first on (sort_col, id_col) and start after `cursor`.
+    Postgres sorts NULLs first in DESC order (a backward scan of a plain
+    (sort_col, id) index), so rows without a timestamp lead, by id; once the
+    cursor is past them it's a plain row-value range.
+    """
+    stmt = stmt.order_by(sort_col.desc(), id_col.desc())
+    if cursor is None:
+        return stmt
+    value, id_ = cursor
+    if value is None:
+        return stmt.where(or_(and_(sort_col.is_(None), id_col < id_), sort_col.isnot(None)))
+    return stmt.where(tuple_(sort_col, id_col) < tuple_(value, id_))
+
+
+async def estimate_count(db, stmt: Select, table_name: str, filtered: bool) -> Tuple[int, bool]:
+    """(count, is_estimate): exact up to COUNT_CAP, then an estimate."""
+    capped = select(func.count()).select_from(stmt.order_by(None).limit(COUNT_CAP + 1).subquery())
+    count = await db.scalar(capped)
+    if count <= COUNT_CAP:
+        return count, False
+    if not filtered:
+        # planner statistics (kept fresh by autovacuum / ANALYZE)
+        estimate = await db.scalar(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:t)"), {"t": table_name}
+        )
+        if estimate and estimate > COUNT_CAP:
+            return int(estimate), True
+    return COUNT_CAP, True
+
+
+async def paginate(
+    db,
+    request: Request,
+    stmt: Select,
+    sort_col,
+    id_col,
+    table_name: str,
+    filtered: bool,
+    limit: int = PAGE_SIZE,
+) -> Page:
+    """
+    One page of `stmt` (a select of one ORM entity, filters applied) after
+    the request's ?cursor. The total is only computed for the first page;
+    "load more" requests don't show it.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    cursor = decode_cursor(request.query_params.get("cursor"))
+    rows = (await db.scalars(seek(stmt, sort_col, id_col, cursor).limit(limit + 1))).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_col.key), getattr(last, id_col.key))
+
+    total, estimated = (None, False)
+    if cursor is None:
+        total, estimated = await estimate_count(db, stmt, table_name, filtered)
+
+    page = Page(rows=rows, next_cursor=next_cursor, total=total, total_is_estimate=estimated)
+    if next_cursor:
+        params = [(k, v) for k, v in request.query_params.multi_items() if k != "cursor"]
+        page.next_url = f"{request.url.path}?{urlencode(params + [('cursor', next_cursor)])}"
+    return page
@@ -0,0 +1,284 @@
+# app/services/recurrence.py
+"""
+Recurring events: a small RRULE subset and a lazy occurrence expander.
+
+Supported (RFC 5545 names): FREQ=DAILY|WEEKLY|MONTHLY, INTERVAL, COUNT,
+UNTIL, BYDAY (MO..SU, with an ordinal for MONTHLY, e.g. 1TH or -1FR) and
+BYMONTHDAY. Examples:
+
+    FREQ=WEEKLY;BYDAY=TH              every Thursday ("Trivia Thursday")
+    FREQ=WEEKLY;INTERVAL=2;BYDAY=FR   every other Friday
+    FREQ=MONTHLY;BYDAY=-1SA           last Saturday of the month
+
+Event.exdates holds skipped dates ("2025-12-25,2026-01-01"). Occurrences
+are expanded per calendar month and cached by (event, rule version, month),
+so a calendar window only ever expands the months it touches.
+"""
+import calendar
+import hashlib
+import json
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from .cache import TTLCache
+
+WEEKDAYS = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+FREQS = ("DAILY", "WEEKLY", "MONTHLY")
+MAX_OCCURRENCES = 2000  # hard stop for runaway rules
+MAX_COUNT = 10000       # COUNT rules are walked from the first occurrence
+
+occurrence_cache = TTLCache("occurrences", default_ttl=6 * 60 * 60, maxsize=4096)
+
+
+class RecurrenceError(ValueError):
+    pass
+
+
+class Rule:
+    __slots__ = ("freq", "interval", "count", "until", "byday", "bymonthday")
+
+    def __init__(self, freq: str, interval: int = 1, count: Optional[int] = None,
+                 until: Optional[datetime] = None, byday=(), bymonthday=()):
+        self.freq = freq
+        self.interval = interval
+        self.count = count
+        self.until = until
+        self.byday: Tuple[Tuple[Optional[int], int], ...] = tuple(byday)  # (ordinal, weekday)
+        self.bymonthday: Tuple[int, ...] = tuple(bymonthday)
+
+
+def parse_rrule(text: str) -> Rule:
+    """Parse "FREQ=WEEKLY;BYDAY=TH" (an optional "RRULE:" prefix is fine)."""
+    text = (text or "").strip()
+    if text.upper().startswith("RRULE:"):
+        text = text[6:]
+    parts: Dict[str, str] = {}
+    for chunk in filter(None, text.split(";")):
+        key, sep, value = chunk.partition("=")
+        if not sep:
+            raise RecurrenceError(f"bad rule part: {chunk!r}")
+        parts[key.strip().upper()] = value.strip().upper()
+
+    freq = parts.pop("FREQ", "")
+    if freq not in FREQS:
+        raise RecurrenceError(f"FREQ must be one of {', '.join(FREQS)}")
+    try:
+        interval = int(parts.pop("INTERVAL", "1"))
+        count = int(parts["COUNT"]) if "COUNT" in parts else None
+        parts.pop("COUNT", None)
+        until = None
+        if "UNTIL" in parts:
+            raw = parts.pop("UNTIL").rstrip("Z")
+            fmt = "%Y%m%dT%H%M%S" if "T" in raw else "%Y%m%d"
+            until = datetime.strptime(raw, fmt)
+            if fmt == "%Y%m%d":
+                until = until.replace(hour=23, minute=59, second=59)
+        byday = []
+        for token in filter(None, parts.pop("BYDAY", "").split(",")):
+            wd = token[-2:]
+            if wd not in WEEKDAYS:
+                raise RecurrenceError(f"bad BYDAY value: {token}")
+            ordinal = int(token[:-2]) if token[:-2] else None
+            if ordinal is not None and (ordinal == 0 or freq != "MONTHLY"):
+                raise RecurrenceError("BYDAY ordinals are only valid with FREQ=MONTHLY")
+            byday.append((ordinal, WEEKDAYS[wd]))
+        bymonthday = [int(d) for d in filter(None, parts.pop("BYMONTHDAY", "").split(","))]
+    except ValueError as e:
+        if isinstance(e, RecurrenceError):
+            raise
+        raise RecurrenceError(str(e))
+    if parts:
+        raise RecurrenceError(f"unsupported rule parts: {', '.join(sorted(parts))}")
+    if interval < 1 or (count is not None and count < 1):
+        raise RecurrenceError("INTERVAL and COUNT must be positive")
+    if count is not None and count > MAX_COUNT:
+        raise RecurrenceError(f"COUNT must be at most {MAX_COUNT}")
+    if any(d == 0 or abs(d) > 31 for d in bymonthday):
+        raise RecurrenceError("BYMONTHDAY must be 1..31 or -31..-1")
+    return Rule(freq, interval, count, until, byday, bymonthday)
+
+
+def parse_exdates(text: Optional[str]) -> Set[date]:
+    out = set()
+    for token in filter(None, (t.strip() for t in (text or "").split(","))):
+        try:
+            out.add(date.fromisoformat(token[:10]))
+        except ValueError:
+            raise RecurrenceError(f"bad exception date: {token}")
+    return out
+
+
+# ---------- generation ----------
+def _add_months(year: int, month: int, n: int) -> Tuple[int, int]:
+    idx = year * 12 + (month - 1) + n
+    return idx // 12, idx % 12 + 1
+
+
+def _month_days(rule: Rule, dtstart: datetime, year: int, month: int) -> List[int]:
+    ndays = calendar.monthrange(year, month)[1]
+    days: Set[int] = set()
+    for d in rule.bymonthday:
+        day = d if d > 0 else ndays + 1 + d
+        if 1 <= day <= ndays:
+            days.add(day)
+    for ordinal, wd in rule.byday:
+        first = (wd - calendar.weekday(year, month, 1)) % 7 + 1
+        matches = list(range(first, ndays + 1, 7))
+        if ordinal is None:
+            days.update(matches)
+        elif -len(matches) <= ordinal <= len(matches):
+            days.add(matches[ordinal - 1 if ordinal > 0 else ordinal])
+    if not rule.byday and not rule.bymonthday and dtstart.day <= ndays:
+        days.add(dtstart.day)
+    return sorted(days)
+
+
+def _candidates(rule: Rule, dtstart: datetime, skip_to: Optional[datetime]) -> Iterator[datetime]:
+    """Rule starts in order (may include values < dtstart; callers filter)."""
+    t = dtstart.time()
+    # Without COUNT we may jump straight to the period containing `skip_to`.
+    jump = skip_to is not None and rule.count is None and skip_to > dtstart
+    if rule.freq == "DAILY":
+        n = ((skip_to - dtstart).days // rule.interval) if jump else 0
+        while True:
+            yield dtstart + timedelta(days=n * rule.interval)
+            n += 1
+    elif rule.freq == "WEEKLY":
+        week0 = dtstart.date() - timedelta(days=dtstart.weekday())  # WKST=MO
+        days = sorted({wd for _, wd in rule.byday}) or [dtstart.weekday()]
+        n = (((skip_to.date() - week0).days // 7) // rule.interval) if jump else 0
+        while True:
+            monday = week0 + timedelta(weeks=n * rule.interval)
+            for wd in days:
+                yield datetime.combine(monday + timedelta(days=wd), t)
+            n += 1
+    else:  # MONTHLY
+        n = 0
+        if jump:
+            months = (skip_to.year - dtstart.year) * 12 + (skip_to.month - dtstart.month)
+            n = months // rule.interval
+        while True:
+            year, month = _add_months(dtstart.year, dtstart.month, n * rule.interval)
+            for day in _month_days(rule, dtstart, year, month):
+                yield datetime.combine(date(year, month, day), t)
+            n += 1
+
+
+def iter_starts(rule: Rule, dtstart: datetime, exdates: Set[date] = frozenset(),
+                skip_to: Optional[datetime] = None) -> Iterator[datetime]:
+    """Occurrence starts from dtstart on (COUNT/UNTIL applied, exdates removed)."""
+    emitted = 0
+    for start in _candidates(rule, dtstart, skip_to):
+        if start < dtstart:
+            continue
+        if rule.until and start > rule.until:
+            return
+        emitted += 1
+        if rule.count and emitted > rule.count:
+            return
+        if start.date() in exdates:
+            continue
+        yield start
+
+
+# ---------- expansion ----------
+def rule_version(event) -> str:
+    """Changes whenever anything that affects the occurrences changes."""
+    raw = f"{event.start.isoformat()}|{event.end.isoformat() if event.end else ''}|{event.rrule}|{event.exdates or ''}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+
+def _month_starts(event, year: int, month: int) -> List[datetime]:
+    rule = parse_rrule(event.rrule)
+    exdates = parse_exdates(event.exdates)
+    lo = datetime(year, month, 1)
+    hi = datetime(*_add_months(year, month, 1), 1)
+    out = []
+    for start in iter_starts(rule, event.start, exdates, skip_to=lo):
+        if start >= hi or len(out) >= MAX_OCCURRENCES:
+            break
+        if start >= lo:
+            out.append(start)
+    return out
+
+
+def _last_start(event) -> Optional[datetime]:
+    """Latest start the rule allows (UNTIL / COUNT), or None if it never ends."""
+    rule = parse_rrule(event.rrule)
+    if rule.count is None:
+        return rule.until
+    last = None
+    # exdates still use up COUNT, so they don't move the end
+    for last in iter_starts(Rule(rule.freq, rule.interval, min(rule.count, MAX_COUNT), rule.until,
+                                 rule.byday, rule.bymonthday), event.start):
+        pass
+    return last
+
+
+def occurrence_starts(event, lo: datetime, hi: datetime) -> List[datetime]:
+    """Starts of `event`'s occurrences overlapping [lo, hi], cached per month."""
+    duration = (event.end - event.start) if event.end and event.end > event.start else timedelta(0)
+    version = rule_version(event)
+    # only walk the months the rule can produce anything in
+    last = occurrence_cache.get_or_set(f"{event.id}:{version}:last", lambda: _last_start(event))
+    if last is not None:
+        hi = min(hi, last)
+    if hi < event.start:
+        return []
+    first = max(lo - duration, datetime(event.start.year, event.start.month, 1))
+    out: List[datetime] = []
+    year, month = first.year, first.month
+    while datetime(year, month, 1) <= hi:
+        key = f"{event.id}:{version}:{year:04d}-{month:02d}"
+        starts = occurrence_cache.get_or_set(key, lambda y=year, m=month: _month_starts(event, y, m))
+        out.extend(s for s in starts if s <= hi and s + duration >= lo)
+        if len(out) >= MAX_OCCURRENCES:
+            break
+        year, month = _add_months(year, month, 1)
+    return out
+
+
+class Occurrence:
+    """
+    One concrete showing of an event. Has the Event attributes templates and
+    seo/schema.py read, so it can stand in for an Event row.
+    """
+    __slots__ = ("id", "title", "start", "end", "description", "image_url",
+                 "image", "venue_area", "ticket_url", "recurring", "json")
+
+    def __init__(self, event, start: Optional[datetime] = None):
+        self.id = event.id
+        self.title = event.title
+        self.description = event.description
+        self.image_url = event.image_url
+        self.image = getattr(event, "image_meta", None)   # services/image_meta.attach()
+        self.venue_area = event.venue_area
+        self.ticket_url = event.ticket_url
+        self.recurring = bool(getattr(event, "rrule", None))
+        if start is None:
+            self.start, self.end = event.start, event.end
+        else:
+            self.start = start
+            self.end = (start + (event.end - event.start)) if event.end else None
+        payload = {
+            "id": self.id,
+            "title": self.title,
+            "start": self.start.isoformat() if self.start else None,
+            "end": self.end.isoformat() if self.end else None,
+            "description": self.description or "",
+        }
+        if self.image_url:
+            payload["image_url"] = self.image_url
+            payload["image"] = self.image
+        if self.recurring:
+            # FullCalendar treats events sharing a groupId as one series
+            payload["groupId"] = f"event-{self.id}"
+        self.json = json.dumps(payload, ensure_ascii=False).encode()
+
+
+def expand(event, lo: datetime, hi: datetime) -> List[Occurrence]:
+    """Occurrences of `event` overlapping [lo, hi] (single events included)."""
+    if not getattr(event, "rrule", None):
+        end = event.end or event.start
+        return [Occurrence(event)] if event.start <= hi and end >= lo else []
+    return [Occurrence(event, s) for s in occurrence_starts(event, lo, hi)]
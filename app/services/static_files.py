@@ -0,0 +1,66 @@
+# app/services/static_files.py
+"""
+StaticFiles with long-lived caching for content-addressed paths.
+
+Anything under an IMMUTABLE_PREFIXES directory has its content hash in the
+URL (see services/media_store.py and services/assets.py), so browsers and
+CDNs can keep it forever without revalidating. Everything else keeps
+Starlette's default ETag / Last-Modified handling.
+
+Built assets (_build/) also have .br / .gz siblings made at build time;
+the one the client accepts is sent as-is, and PrecompressedGZipMiddleware
+keeps the gzip middleware from compressing these (or media) again.
+"""
+import mimetypes
+import os
+
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from .assets import pick_encoding
+
+BUILD_PREFIX = "_build/"
+IMMUTABLE_PREFIXES = ("media/cas/", BUILD_PREFIX)
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# request paths the gzip middleware leaves alone: already compressed or binary
+NO_GZIP_PREFIXES = ("/static/_build/", "/static/media/", "/img/")
+
+
+class CachedStaticFiles(StaticFiles):
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        rel = self.get_path(scope).replace(os.sep, "/")
+        if rel.startswith(BUILD_PREFIX):
+            response = self._precompressed_response(full_path, stat_result, scope, status_code)
+        else:
+            response = super().file_response(full_path, stat_result, scope, status_code)
+        if rel.startswith(IMMUTABLE_PREFIXES):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+    def _precompressed_response(self, full_path, stat_result, scope, status_code):
+        request_headers = Headers(scope=scope)
+        path, encoding = pick_encoding(full_path, request_headers.get("accept-encoding", ""))
+        media_type = mimetypes.guess_type(full_path)[0] or "text/plain"
+        if encoding:
+            stat_result = os.stat(path)
+        response = FileResponse(path, status_code=status_code, stat_result=stat_result, media_type=media_type)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        if path != full_path or os.path.exists(full_path + ".gz"):
+            response.headers["Vary"] = "Accept-Encoding"
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+class PrecompressedGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware that passes NO_GZIP_PREFIXES through untouched."""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith(NO_GZIP_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
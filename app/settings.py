@@ -14,6 +14,10 @@ class Settings(BaseSettings):
 
     # DB (required)
     database_url: str  # maps to DATABASE_URL
+    db_max_connections: int = 15  # DB_MAX_CONNECTIONS (per worker, sync + async pools together)
+
+    # Public site URL, for absolute links in cached pages (og:image); Host isn't trusted
+    public_url: str = ""                          # PUBLIC_URL (e.g. https://themine606.com)
 
     # CORS
     cors_origins: List[str] = ["*"]  # accepts JSON list string in .env
@@ -29,12 +33,26 @@ class Settings(BaseSettings):
     google_places_api_key: Optional[str] = None   # GOOGLE_PLACES_API_KEY
     yelp_api_key: Optional[str] = None            # YELP_API_KEY
     facebook_graph_token: Optional[str] = None    # FACEBOOK_GRAPH_TOKEN
+    integrations_fake: bool = False               # INTEGRATIONS_FAKE (canned data, no network)
     
     # Cloudinary (for image uploads)
     cloudinary_cloud_name: Optional[str] = None   # CLOUDINARY_CLOUD_NAME
     cloudinary_api_key: Optional[str] = None      # CLOUDINARY_API_KEY
     cloudinary_api_secret: Optional[str] = None   # CLOUDINARY_API_SECRET
 
+    # Observability
+    slow_query_ms: int = 200                      # SLOW_QUERY_MS (0 disables the slow-query log)
+    server_timing: bool = True                    # SERVER_TIMING (db/app timings response header)
+    metrics_token: Optional[str] = None           # METRICS_TOKEN (Bearer token for /metrics scrapers)
+    metrics_allow_ips: List[str] = ["127.0.0.1", "::1"]  # METRICS_ALLOW_IPS (direct, unproxied clients)
+
+    # Uploads
+    max_upload_bytes: int = 5_000_000             # MAX_UPLOAD_BYTES (local and cloud)
+
+    # Resized images (/img)
+    image_workers: int = 2                        # IMAGE_WORKERS (processes for resizing)
+    image_cache_max_bytes: int = 500_000_000      # IMAGE_CACHE_MAX_BYTES (disk cache of derivatives)
+
     # Formspree endpoints (optional)
     formspree_musician_endpoint: Optional[str] = None  # FORMSPREE_MUSICIAN_ENDPOINT
     formspree_rental_endpoint: Optional[str] = None    # FORMSPREE_RENTAL_ENDPOINT
@@ -1,2 +1,23 @@
 // Mobile nav is now handled by Alpine.js in base.html template
 // This file is kept for future JavaScript utilities
+
+// Footer weather widget (shown when Site settings -> "Show weather widget" is on).
+// /api/weather only reads the server's cache; "pending" means a refresh was
+// just scheduled, so ask once more after Retry-After.
+async function loadWeather(el, retries = 1) {
+  try {
+    const res = await fetch('/api/weather', { headers: { Accept: 'application/json' } });
+    const data = await res.json();
+    if (data.ok) {
+      el.textContent = `${data.temp}°F · ${data.description}`;
+      el.hidden = false;
+    } else if (data.reason === 'pending' && retries > 0) {
+      const wait = parseInt(res.headers.get('Retry-After') || '5', 10);
+      setTimeout(() => loadWeather(el, retries - 1), wait * 1000);
+    }
+  } catch (e) {
+    // widget is optional: leave it hidden
+  }
+}
+
+document.querySelectorAll('[data-weather]').forEach((el) => loadWeather(el));
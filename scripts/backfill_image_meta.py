@@ -0,0 +1,120 @@
+# scripts/backfill_image_meta.py
+"""
+Fill media_meta (services/image_meta.py) for images uploaded before it
+existed, or re-probe everything.
+
+    python -m scripts.backfill_image_meta                  # URLs without metadata
+    python -m scripts.backfill_image_meta --force          # every URL again
+    python -m scripts.backfill_image_meta --workers 8 --batch-size 200
+
+Walks the distinct MenuItem / Event image URLs in order, a batch at a time:
+local files are read from disk, Cloudinary (or other remote) URLs are
+fetched, each is probed on a small thread pool and the batch is upserted in
+one transaction, so it can be stopped and re-run. An image that can't be
+read is reported and skipped. Running app workers pick the new rows up when
+their menu / event caches next rebuild.
+"""
+import argparse
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import httpx
+from sqlalchemy import select, union
+
+from app.db.session import SessionLocal
+from app.models.events import Event
+from app.models.media import MediaMeta
+from app.models.menu import MenuItem
+from app.services.image_meta import upsert
+from app.services.image_worker import probe
+from app.services.images import resolve_source
+
+BATCH_SIZE = 100
+WORKERS = 4
+FETCH_TIMEOUT = 20.0
+MAX_FETCH_BYTES = 25_000_000
+
+
+def pending_urls(db, force: bool, after: str, limit: int) -> List[str]:
+    """The next `limit` image URLs after `after` (skipping probed ones unless `force`)."""
+    urls = union(
+        select(MenuItem.image_url.label("url")).where(MenuItem.image_url != ""),
+        select(Event.image_url.label("url")).where(Event.image_url != ""),
+    ).subquery()
+    stmt = select(urls.c.url).where(urls.c.url > after).order_by(urls.c.url).limit(limit)
+    if not force:
+        stmt = stmt.where(~select(MediaMeta.url).where(MediaMeta.url == urls.c.url).exists())
+    return list(db.scalars(stmt))
+
+
+def _source(client: httpx.Client, url: str):
+    if url.startswith(("/static/", "/assets/")):
+        path = resolve_source(url.lstrip("/"))
+        if path is None:
+            raise FileNotFoundError(url)
+        return path
+    if url.startswith(("http://", "https://")):
+        resp = client.get(url)
+        resp.raise_for_status()
+        if len(resp.content) > MAX_FETCH_BYTES:
+            raise ValueError(f"{len(resp.content)} bytes is too large to probe")
+        return io.BytesIO(resp.content)
+    raise ValueError("not a local or http(s) URL")
+
+
+def _probe_one(client: httpx.Client, url: str) -> Optional[dict]:
+    try:
+        return probe(_source(client, url))
+    except Exception as e:
+        print(f"  ! {url}: {e!r}")
+        return None
+
+
+def backfill(force: bool = False, batch_size: int = BATCH_SIZE, workers: int = WORKERS) -> None:
+    stored = failed = 0
+    after = ""
+    started = time.perf_counter()
+    with httpx.Client(timeout=FETCH_TIMEOUT, follow_redirects=True) as client, \
+            ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            db = SessionLocal()
+            try:
+                urls = pending_urls(db, force, after, batch_size)
+            finally:
+                db.close()
+            if not urls:
+                break
+            after = urls[-1]
+            # probe outside any transaction; write the batch in one
+            results = list(pool.map(lambda u: _probe_one(client, u), urls))
+            db = SessionLocal()
+            try:
+                for url, meta in zip(urls, results):
+                    if meta is not None:
+                        upsert(db, url, meta)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+            ok = sum(1 for m in results if m is not None)
+            stored += ok
+            failed += len(urls) - ok
+            print(f"  {stored} stored, {failed} failed ({time.perf_counter() - started:.1f}s)")
+    print(f"Done: {stored} images probed, {failed} skipped.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--force", action="store_true", help="re-probe URLs that already have metadata")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="images probed in parallel")
+    args = parser.parse_args()
+    backfill(force=args.force, batch_size=args.batch_size, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
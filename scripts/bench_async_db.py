@@ -0,0 +1,78 @@
+# scripts/bench_async_db.py
+"""
+Show that `async def` handlers on the async session no longer serialize
+behind slow queries.
+
+Mounts two throwaway routes on a bare FastAPI app, both running
+`SELECT pg_sleep(delay)`: one through the sync Session (the old pattern in
+async handlers), one through get_async_db. Fires N concurrent requests at
+each in-process and prints per-request latency. With the sync session the
+total is ~N * delay; with the async one it's ~delay (pool size permitting).
+
+    python -m scripts.bench_async_db --requests 10 --delay 0.2
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal, get_async_db
+
+
+def build_app(delay: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/sync-session")
+    async def sync_session():
+        db: Session = SessionLocal()
+        try:
+            db.execute(text("SELECT pg_sleep(:d)"), {"d": delay})  # blocks the loop
+        finally:
+            db.close()
+        return {"ok": True}
+
+    @app.get("/async-session")
+    async def async_session(db=Depends(get_async_db)):
+        await db.execute(text("SELECT pg_sleep(:d)"), {"d": delay})
+        return {"ok": True}
+
+    return app
+
+
+async def run(client: httpx.AsyncClient, path: str, n: int):
+    async def one():
+        t0 = time.perf_counter()
+        r = await client.get(path)
+        r.raise_for_status()
+        return time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    latencies = await asyncio.gather(*(one() for _ in range(n)))
+    return time.perf_counter() - t0, sorted(latencies)
+
+
+async def main(n: int, delay: float):
+    app = build_app(delay)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/async-session")  # warm both pools
+        await client.get("/sync-session")
+        print(f"{n} concurrent requests, each waiting on a {delay:.2f}s query")
+        for path in ("/sync-session", "/async-session"):
+            total, lat = await run(client, path, n)
+            p50 = statistics.median(lat)
+            p95 = lat[min(len(lat) - 1, int(len(lat) * 0.95))]
+            print(f"{path:16} total {total:6.2f}s  p50 {p50:6.2f}s  p95 {p95:6.2f}s  max {lat[-1]:6.2f}s")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--requests", type=int, default=10)
+    ap.add_argument("--delay", type=float, default=0.2)
+    args = ap.parse_args()
+    asyncio.run(main(args.requests, args.delay))
@@ -0,0 +1,231 @@
+# scripts/bench_http.py
+"""
+Benchmark the public and API hot paths in-process.
+
+Boots app.main:app behind httpx.ASGITransport (no server, no network) against
+the database in DATABASE_URL, so seed it first (scripts/seed_dev.py).
+Startup hooks don't run, so the outbox dispatcher and integrations sweep stay
+out of the numbers.
+
+Each path first gets --cold requests one at a time, with every app cache
+cleared before each (services/cache.py clear_caches), so they measure the
+rebuild: the queries a cache miss costs. Then --warmup unmeasured requests,
+then --requests requests with at most --concurrency in flight, which are
+mostly cache hits. Reported per path, for both passes: p50/p95/p99 and mean
+latency, errors, and SQL statements / DB time per request (read back from the
+Server-Timing header, see db/query_stats.py); throughput for the warm pass.
+Peak RSS is for the whole process.
+
+    python -m scripts.bench_http --requests 500 --concurrency 20 --out bench.json
+    python -m scripts.bench_http --baseline bench.json     # exit 1 on regression
+
+A path regresses when its p95 grows, or its throughput drops, by more than
+--tolerance (fractional, default 0.20), when it issues more queries per
+request than the baseline (cold or warm), or when it returns errors the
+baseline didn't.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import re
+import resource
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import httpx
+
+DEFAULT_PATHS = ["/", "/menu", "/location", "/api/events/data", "/api/items", "/api/categories"]
+TIMING_RE = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+
+def with_query(path: str) -> str:
+    """The calendar feed needs a range: use the next six weeks, like FullCalendar would."""
+    if path == "/api/events/data":
+        start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        end = start + timedelta(weeks=6)
+        return f"{path}?start={start.isoformat()}&end={end.isoformat()}"
+    return path
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+class Sample:
+    """Latencies, query counts and DB time of a batch of requests."""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.queries: List[int] = []
+        self.db_ms: List[float] = []
+        self.errors = 0
+
+    async def get(self, client: httpx.AsyncClient, url: str) -> None:
+        t0 = time.perf_counter()
+        try:
+            r = await client.get(url)
+        except Exception:
+            self.errors += 1
+            return
+        self.latencies.append(time.perf_counter() - t0)
+        if r.status_code >= 400:
+            self.errors += 1
+        m = TIMING_RE.search(r.headers.get("server-timing", ""))
+        if m:
+            self.db_ms.append(float(m.group(1)))
+            self.queries.append(int(m.group(2)))
+
+    def summary(self, n: int) -> Dict:
+        latencies = sorted(self.latencies)
+        ms = lambda s: round(s * 1000, 2)
+        return {
+            "requests": n,
+            "errors": self.errors,
+            "p50_ms": ms(percentile(latencies, 50)),
+            "p95_ms": ms(percentile(latencies, 95)),
+            "p99_ms": ms(percentile(latencies, 99)),
+            "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else 0.0,
+            # None when Server-Timing is off (SERVER_TIMING=false)
+            "queries_per_request": round(sum(self.queries) / len(self.queries), 2) if self.queries else None,
+            "db_ms_per_request": round(sum(self.db_ms) / len(self.db_ms), 2) if self.db_ms else None,
+        }
+
+
+async def bench_path(client: httpx.AsyncClient, path: str, n: int, concurrency: int, warmup: int, cold: int) -> Dict:
+    from app.services.cache import clear_caches
+
+    url = with_query(path)
+    # one at a time, so no request can reuse what another one just built
+    cold_sample = Sample()
+    for _ in range(cold):
+        clear_caches()
+        await cold_sample.get(client, url)
+
+    for _ in range(warmup):
+        await client.get(url)
+
+    sample = Sample()
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            await sample.get(client, url)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n)))
+    elapsed = time.perf_counter() - t0
+    result = sample.summary(n)
+    result["throughput_rps"] = round(n / elapsed, 1) if elapsed else 0.0
+    result["cold"] = cold_sample.summary(cold) if cold else None
+    return result
+
+
+async def run(paths: List[str], n: int, concurrency: int, warmup: int, cold: int) -> Dict:
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in paths:
+            results[path] = await bench_path(client, path, n, concurrency, warmup, cold)
+            r = results[path]
+            print(
+                f"{path:18} {r['throughput_rps']:8.1f} req/s  p50 {r['p50_ms']:7.2f}ms  "
+                f"p95 {r['p95_ms']:7.2f}ms  p99 {r['p99_ms']:7.2f}ms  "
+                f"queries {_q(r):>5}  errors {r['errors']}"
+            )
+            c = r["cold"]
+            if c:
+                print(
+                    f"{'  cold':18} {'':14}  p50 {c['p50_ms']:7.2f}ms  "
+                    f"p95 {c['p95_ms']:7.2f}ms  p99 {c['p99_ms']:7.2f}ms  "
+                    f"queries {_q(c):>5}  errors {c['errors']}"
+                )
+    return {
+        "meta": {
+            "when": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "requests": n,
+            "concurrency": concurrency,
+            "warmup": warmup,
+            "cold": cold,
+        },
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "paths": results,
+    }
+
+
+def _q(r: Dict) -> str:
+    return "-" if r["queries_per_request"] is None else str(r["queries_per_request"])
+
+
+def compare(result: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    problems = []
+    for path, now in result["paths"].items():
+        before = baseline.get("paths", {}).get(path)
+        if not before:
+            continue
+        if before["p95_ms"] and now["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            problems.append(f"{path}: p95 {before['p95_ms']}ms -> {now['p95_ms']}ms")
+        if before["throughput_rps"] and now["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            problems.append(f"{path}: throughput {before['throughput_rps']} -> {now['throughput_rps']} req/s")
+        passes = [("", before, now)]
+        if before.get("cold") and now.get("cold"):
+            passes.append(("cold ", before["cold"], now["cold"]))
+        for label, b, n in passes:
+            qb, qn = b.get("queries_per_request"), n.get("queries_per_request")
+            if qb is not None and qn is not None and qn > qb:
+                problems.append(f"{path}: {label}queries/request {qb} -> {qn}")
+            if n["errors"] > b.get("errors", 0):
+                problems.append(f"{path}: {label}errors {b.get('errors', 0)} -> {n['errors']}")
+    return problems
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--requests", type=int, default=200, help="measured requests per path")
+    ap.add_argument("--concurrency", type=int, default=10)
+    ap.add_argument("--cold", type=int, default=10, help="requests per path with the caches cleared before each (0 to skip)")
+    ap.add_argument("--warmup", type=int, default=5, help="unmeasured requests per path before the warm pass")
+    ap.add_argument("--paths", nargs="+", default=DEFAULT_PATHS)
+    ap.add_argument("--out", help="write results as JSON here")
+    ap.add_argument("--baseline", help="JSON from an earlier run to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.20)
+    args = ap.parse_args(argv)
+
+    result = asyncio.run(run(args.paths, args.requests, args.concurrency, args.warmup, args.cold))
+    print(f"peak RSS {result['peak_rss_mb']} MB")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"wrote {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        problems = compare(result, baseline, args.tolerance)
+        if problems:
+            print(f"REGRESSION vs {args.baseline}:")
+            for p in problems:
+                print(f"  {p}")
+            return 1
+        print(f"no regression vs {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
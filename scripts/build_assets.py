@@ -0,0 +1,16 @@
+# scripts/build_assets.py
+"""
+Fingerprint and precompress static assets (see app/services/assets.py).
+
+    python -m scripts.build_assets
+"""
+from app.services.assets import BUILD_DIR, brotli, build
+
+
+def main():
+    manifest = build()
+    print(f"Built {len(manifest)} assets into {BUILD_DIR}" + ("" if brotli else " (no brotli: .gz only)"))
+
+
+if __name__ == "__main__":
+    main()
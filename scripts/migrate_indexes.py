@@ -0,0 +1,287 @@
+# scripts/migrate_indexes.py
+"""
+Versioned performance-index migrations, plus a query-plan check.
+
+    python -m scripts.migrate_indexes              # apply pending versions
+    python -m scripts.migrate_indexes --status     # list versions / index state
+    python -m scripts.migrate_indexes --dry-run    # print the SQL only
+    python -m scripts.migrate_indexes --check      # EXPLAIN the hot queries
+
+Each version is a list of indexes. On Postgres they're built with CREATE
+INDEX CONCURRENTLY, so the site keeps taking writes during the build. That
+can't run inside a transaction, so every statement autocommits. A version is
+recorded in schema_versions once all of its indexes exist, and re-running is
+always safe:
+- an index that already exists under its name is skipped,
+- an index left INVALID by an interrupted build is dropped and rebuilt,
+- an index whose columns are already covered by one of the same shape under
+  another name (e.g. a unique constraint) is skipped.
+
+--check EXPLAINs each query in HOT_QUERIES (the shapes the app runs on its
+hot paths) and exits 1 if any plan sequentially scans a table the planner
+believes holds more than --seq-scan-rows rows. Small tables are expected to
+be scanned, so seed first (scripts/seed_dev.py --preset medium) and ANALYZE.
+"""
+import argparse
+import json
+import sys
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.db.session import engine
+
+VERSIONS_TABLE = "schema_versions"
+
+
+@dataclass
+class Index:
+    name: str
+    table: str
+    columns: Sequence[str]          # column names or expressions, in order
+    where: Optional[str] = None     # partial-index predicate
+
+    def sql(self, concurrently: bool) -> str:
+        cols = ", ".join(self.columns)
+        how = "CONCURRENTLY " if concurrently else ""
+        where = f" WHERE {self.where}" if self.where else ""
+        return f"CREATE INDEX {how}IF NOT EXISTS {self.name} ON {self.table} ({cols}){where}"
+
+
+@dataclass
+class Migration:
+    version: str
+    description: str
+    indexes: List[Index]
+
+
+MIGRATIONS: List[Migration] = [
+    Migration("0001", "admin list keyset indexes (services/pagination.py)", [
+        Index("ix_rentals_date_id", "rentals", ["date", "id"]),
+        Index("ix_rentals_status_date_id", "rentals", ["status", "date", "id"]),
+        Index("ix_musician_submitted_id", "musician_applications", ["submitted_at", "id"]),
+        Index("ix_musician_status_submitted_id", "musician_applications", ["status", "submitted_at", "id"]),
+        Index("ix_events_start_id", "events", ["start", "id"]),
+    ]),
+    Migration("0002", "public events and menu hot paths", [
+        # timeline / calendar feed: one-off events overlapping a window
+        Index("ix_events_until", "events", ['(coalesce("end", start))']),
+        # recurring rules are loaded whole; keep them out of the big index scans
+        Index("ix_events_recurring_start", "events", ["start"], where="rrule IS NOT NULL"),
+        Index("ix_menu_items_featured", "menu_items", ["featured_rank", "available"], where="featured_rank > 0"),
+        Index("ix_menu_items_category", "menu_items", ["category_id"]),
+        Index("ix_menu_item_tags_item_tag", "menu_item_tags", ["item_id", "tag_id"]),
+        Index("ix_menu_item_tags_tag", "menu_item_tags", ["tag_id"]),
+    ]),
+    Migration("0003", "image URL lookups (media_store collector)", [
+        Index("ix_menu_items_image_url", "menu_items", ["image_url"]),
+        Index("ix_events_image_url", "events", ["image_url"]),
+    ]),
+]
+
+# (name, SQL, params): the statement shapes the app issues on hot paths
+HOT_QUERIES: List[Tuple[str, str, Dict]] = [
+    ("timeline one-off events (services/event_timeline.py)",
+     """SELECT * FROM events WHERE is_published = true AND (rrule IS NULL OR rrule = '')
+        AND start <= now() + interval '800 days' AND coalesce("end", start) >= now() - interval '400 days'""", {}),
+    ("timeline recurring rules",
+     """SELECT * FROM events WHERE is_published = true AND rrule IS NOT NULL AND rrule <> ''
+        AND start <= now() + interval '800 days'""", {}),
+    ("calendar feed outside the horizon (api/events.py)",
+     """SELECT * FROM events WHERE is_published = true AND start <= now() - interval '2 years'
+        AND (rrule IS NOT NULL OR coalesce("end", start) >= now() - interval '2 years 1 month')
+        ORDER BY start""", {}),
+    ("upcoming events (api/events.py)",
+     "SELECT * FROM events WHERE start >= now() ORDER BY start LIMIT 6", {}),
+    ("featured menu items",
+     "SELECT * FROM menu_items WHERE featured_rank > 0 AND available ORDER BY featured_rank LIMIT 9", {}),
+    ("item tags (selectin load)",
+     """SELECT t.* FROM menu_item_tags it JOIN menu_tags t ON t.id = it.tag_id
+        WHERE it.item_id IN (1, 2, 3, 4, 5, 6, 7, 8, 9, 10)""", {}),
+    ("admin rentals, first page",
+     "SELECT * FROM rentals ORDER BY date DESC, id DESC LIMIT 51", {}),
+    ("admin rentals by status, later page",
+     """SELECT * FROM rentals WHERE status = 'new' AND (date, id) < (now(), 2147483647)
+        ORDER BY date DESC, id DESC LIMIT 51""", {}),
+    ("admin musician applications by status",
+     """SELECT * FROM musician_applications WHERE status = 'new'
+        ORDER BY submitted_at DESC, id DESC LIMIT 51""", {}),
+    ("admin events, later page",
+     "SELECT * FROM events WHERE (start, id) < (now(), 2147483647) ORDER BY start DESC, id DESC LIMIT 51", {}),
+    ("outbox claim (services/forms.py)",
+     """SELECT * FROM outbox WHERE status = 'pending' AND next_attempt_at <= now()
+        ORDER BY id LIMIT 50 FOR UPDATE SKIP LOCKED""", {}),
+]
+
+
+# ---------- catalog helpers (Postgres) ----------
+def _is_postgres() -> bool:
+    return engine.dialect.name == "postgresql"
+
+
+def _index_state(conn: Connection, name: str) -> Optional[bool]:
+    """True = valid, False = left invalid by a failed CONCURRENTLY build, None = missing."""
+    return conn.execute(text(
+        "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND pg_catalog.pg_table_is_visible(c.oid)"
+    ), {"name": name}).scalar()
+
+
+def _covered_by(conn: Connection, index: Index) -> Optional[str]:
+    """Name of another valid, non-partial index on the same columns, if any."""
+    if index.where or any("(" in c for c in index.columns):
+        return None
+    rows = conn.execute(text(
+        "SELECT c.relname, i.indkey::int2[]::int[] AS cols "
+        "FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE i.indrelid = to_regclass(:table) AND i.indisvalid AND i.indpred IS NULL AND c.relname <> :name"
+    ), {"table": index.table, "name": index.name}).all()
+    if not rows:
+        return None
+    attnums = dict(conn.execute(text(
+        "SELECT attname, attnum FROM pg_attribute WHERE attrelid = to_regclass(:table) AND attnum > 0"
+    ), {"table": index.table}).all())
+    wanted = [attnums.get(col.strip('"')) for col in index.columns]
+    for name, cols in rows:
+        if list(cols) == wanted:
+            return name
+    return None
+
+
+# ---------- apply ----------
+def _ensure_versions_table(conn: Connection) -> None:
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {VERSIONS_TABLE} ("
+        " version VARCHAR(20) PRIMARY KEY,"
+        " description VARCHAR(200) NOT NULL,"
+        " applied_at TIMESTAMP NOT NULL DEFAULT NOW())"
+    ))
+
+
+def applied_versions(conn: Connection) -> Dict[str, str]:
+    _ensure_versions_table(conn)
+    return dict(conn.execute(text(f"SELECT version, applied_at::text FROM {VERSIONS_TABLE}")).all())
+
+
+def apply_index(conn: Connection, index: Index, dry_run: bool = False) -> str:
+    concurrently = _is_postgres()
+    if concurrently:
+        state = _index_state(conn, index.name)
+        if state is True:
+            return "exists"
+        if state is None:
+            other = _covered_by(conn, index)
+            if other:
+                return f"covered by {other}"
+        if state is False:
+            drop = f"DROP INDEX CONCURRENTLY IF EXISTS {index.name}"
+            print(f"    {drop}  -- invalid, from an interrupted build")
+            if not dry_run:
+                conn.execute(text(drop))
+    sql = index.sql(concurrently)
+    print(f"    {sql}")
+    if not dry_run:
+        conn.execute(text(sql))
+    return "created"
+
+
+def migrate(dry_run: bool = False) -> int:
+    # CONCURRENTLY refuses to run in a transaction block: autocommit each statement
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        done = applied_versions(conn)
+        pending = [m for m in MIGRATIONS if m.version not in done]
+        if not pending:
+            print("[MIGRATE] Up to date.")
+            return 0
+        for m in pending:
+            print(f"[MIGRATE] {m.version}: {m.description}")
+            for index in m.indexes:
+                result = apply_index(conn, index, dry_run)
+                if result != "created":
+                    print(f"    {index.name}: {result}")
+            if not dry_run:
+                conn.execute(text(
+                    f"INSERT INTO {VERSIONS_TABLE} (version, description) VALUES (:v, :d) "
+                    "ON CONFLICT (version) DO NOTHING"
+                ), {"v": m.version, "d": m.description})
+        print("[MIGRATE] Done." if not dry_run else "[MIGRATE] Dry run; nothing applied.")
+    return 0
+
+
+def status() -> int:
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        done = applied_versions(conn)
+        for m in MIGRATIONS:
+            print(f"{m.version}  {'applied ' + done[m.version] if m.version in done else 'pending'}  {m.description}")
+            if _is_postgres():
+                for index in m.indexes:
+                    state = {True: "valid", False: "INVALID", None: "missing"}[_index_state(conn, index.name)]
+                    print(f"      {index.name:36} {state}")
+    return 0
+
+
+# ---------- plan check ----------
+def _walk(plan: Dict) -> Iterable[Dict]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _walk(child)
+
+
+def seq_scans(conn: Connection, sql: str, params: Dict) -> List[Tuple[str, int]]:
+    """(table, estimated table rows) for every Seq Scan in the plan of `sql`."""
+    plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    found = []
+    for node in _walk(plan[0]["Plan"]):
+        if node.get("Node Type") == "Seq Scan":
+            table = node.get("Relation Name", "?")
+            rows = conn.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:t)"), {"t": table}
+            ).scalar() or 0
+            found.append((table, int(rows)))
+    return found
+
+
+def check(max_rows: int) -> int:
+    if not _is_postgres():
+        print("[CHECK] Plan checks need Postgres.")
+        return 1
+    failures = 0
+    with engine.connect() as conn:
+        for name, sql, params in HOT_QUERIES:
+            scans = seq_scans(conn, sql, params)
+            bad = [(t, n) for t, n in scans if n > max_rows]
+            if bad:
+                failures += 1
+                detail = ", ".join(f"seq scan on {t} (~{n:,} rows)" for t, n in bad)
+                print(f"FAIL  {name}: {detail}")
+            else:
+                note = f"  (seq scans on small tables: {', '.join(t for t, _ in scans)})" if scans else ""
+                print(f"ok    {name}{note}")
+        conn.rollback()
+    print(f"[CHECK] {failures} of {len(HOT_QUERIES)} hot queries scan tables over {max_rows:,} rows.")
+    return 1 if failures else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    mode = ap.add_mutually_exclusive_group()
+    mode.add_argument("--status", action="store_true", help="list versions and index state")
+    mode.add_argument("--dry-run", action="store_true", help="print pending SQL without running it")
+    mode.add_argument("--check", action="store_true", help="EXPLAIN hot queries, fail on large seq scans")
+    ap.add_argument("--seq-scan-rows", type=int, default=10_000,
+                    help="with --check: largest table a plan may scan sequentially")
+    args = ap.parse_args(argv)
+
+    if args.status:
+        return status()
+    if args.check:
+        return check(args.seq_scan_rows)
+    return migrate(dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -44,6 +44,46 @@ ALTER TABLE events
 ALTER TABLE events
   ALTER COLUMN is_published SET NOT NULL;
 
+-- recurring events (RRULE subset + skipped dates)
+ALTER TABLE events
+  ADD COLUMN IF NOT EXISTS rrule VARCHAR(255),
+  ADD COLUMN IF NOT EXISTS exdates TEXT;
+
+
+-- === MEDIA (content-addressed uploads) ===
+CREATE TABLE IF NOT EXISTS media_blobs (
+  sha256 VARCHAR(64) PRIMARY KEY,
+  url VARCHAR(255) NOT NULL UNIQUE,
+  mime VARCHAR(40) NOT NULL,
+  size INTEGER NOT NULL,
+  created_at TIMESTAMP DEFAULT NOW()
+);
+-- use is derived from menu_items / events image_url, not counted
+ALTER TABLE media_blobs DROP COLUMN IF EXISTS refcount;
+
+-- === IMAGE METADATA (services/image_meta.py, filled by scripts/backfill_image_meta.py) ===
+CREATE TABLE IF NOT EXISTS media_meta (
+  url VARCHAR(255) PRIMARY KEY,
+  width INTEGER NOT NULL,
+  height INTEGER NOT NULL,
+  color VARCHAR(7) NOT NULL,
+  lqip TEXT NOT NULL,
+  created_at TIMESTAMP DEFAULT NOW()
+);
+
+-- === OUTBOX (form submissions to forward) ===
+CREATE TABLE IF NOT EXISTS outbox (
+  id SERIAL PRIMARY KEY,
+  kind VARCHAR(30) NOT NULL,
+  payload JSON NOT NULL,
+  status VARCHAR(20) NOT NULL DEFAULT 'pending',
+  attempts INTEGER NOT NULL DEFAULT 0,
+  next_attempt_at TIMESTAMP NOT NULL DEFAULT NOW(),
+  last_error TEXT,
+  created_at TIMESTAMP DEFAULT NOW(),
+  sent_at TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS ix_outbox_due ON outbox (status, next_attempt_at);
 
 -- === MUSICIAN APPLICATIONS (optional fields) ===
 ALTER TABLE musician_applications
@@ -56,12 +96,28 @@ ALTER TABLE rentals
   ADD COLUMN IF NOT EXISTS phone VARCHAR(50),
   ADD COLUMN IF NOT EXISTS party_size VARCHAR(20),
   ADD COLUMN IF NOT EXISTS status VARCHAR(20) DEFAULT 'new';
+
+-- === DASHBOARD COUNTERS (services/counters.py, filled by the reconciler) ===
+CREATE TABLE IF NOT EXISTS stat_counters (
+  metric VARCHAR(40) NOT NULL,
+  bucket VARCHAR(80) NOT NULL DEFAULT '',
+  value BIGINT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP DEFAULT NOW(),
+  PRIMARY KEY (metric, bucket)
+);
+
+-- Performance indexes are versioned in scripts/migrate_indexes.py (built CONCURRENTLY)
 """
 
+def statements(sql: str):
+    """SQL split into statements; "--" comment lines are dropped first so a ";" in one can't split a statement."""
+    body = "\n".join(line for line in sql.splitlines() if not line.lstrip().startswith("--"))
+    return [s for s in body.split(";") if s.strip()]
+
 def main():
     print("[DB PATCH] Applying schema changes...")
     with engine.begin() as conn:
-        for chunk in [s for s in SQL.split(";") if s.strip()]:
+        for chunk in statements(SQL):
             conn.execute(text(chunk))
     print("[DB PATCH] Done.")
 
@@ -1,11 +1,31 @@
 # scripts/seed_dev.py
+"""
+Dev seed data.
+
+    python -m scripts.seed_dev                    # the small hand-written set
+    python -m scripts.seed_dev --preset medium    # plus synthetic bulk data
+    python -m scripts.seed_dev --preset large --truncate
+
+Presets (see PRESETS) add menu items, events spread over several years and
+rental / musician submissions, shaped like a busy venue: skewed category and
+tag popularity, events clustered on weekend evenings with a few weekly
+series, and submission volume growing over time. Rows are generated
+deterministically (--seed) and bulk-inserted in batches through Core
+executemany, then the tables are ANALYZEd so query plans see real stats.
+"""
+import argparse
+import random
+import time
 from datetime import datetime, timedelta
+from sqlalchemy import insert, select, text
 from sqlalchemy.orm import Session
 from app.db.session import engine, SessionLocal
 from app.db.base import Base
-from app.models import menu, events, site, user  # register models
+from app.models import menu, events, site, user, musician, rentals  # register models
 from app.models.menu import MenuCategory, MenuTag, MenuItem, MenuItemTag
 from app.models.events import Event
+from app.models.musician import MusicianApp
+from app.models.rentals import Rental
 from app.models.site import SiteSetting, Hours
 from passlib.context import CryptContext
 import os
@@ -99,8 +119,273 @@ def seed_events(db: Session):
         ]
         db.add_all(evs)
 
-def main():
+# ---------- bulk / synthetic data ----------
+PRESETS = {
+    #          menu items  events   rentals    musician apps
+    "small":  dict(items=1_000,   events=5_000,   rentals=10_000,    musicians=10_000),
+    "medium": dict(items=10_000,  events=50_000,  rentals=100_000,   musicians=100_000),
+    "large":  dict(items=100_000, events=100_000, rentals=1_000_000, musicians=1_000_000),
+}
+BATCH_SIZE = 5_000
+YEARS_BACK = 5  # events and submissions start this many years ago
+
+# (name, weight): a few categories hold most of the menu
+CATEGORIES = [
+    ("Entrees", 30), ("Starters", 18), ("Drinks", 14), ("Cocktails", 10), ("Burgers", 8),
+    ("Pizza", 6), ("Salads", 5), ("Desserts", 4), ("Kids", 2), ("Sides", 2), ("Beer", 1),
+]
+# (slug, type, chance an item carries it)
+TAGS = [
+    ("vegetarian", "dietary", 0.30), ("gluten-free", "dietary", 0.18), ("dairy-free", "dietary", 0.12),
+    ("vegan", "dietary", 0.07), ("spicy", "spice", 0.15), ("contains-nuts", "allergen", 0.08),
+    ("shellfish", "allergen", 0.04), ("house-favorite", "other", 0.03),
+]
+ADJECTIVES = ["Smoked", "Crispy", "Loaded", "Classic", "Spicy", "Grilled", "Honey", "Cajun",
+              "Mountain", "Double", "Blackened", "Hickory", "Garden", "Southern", "Miner's"]
+NOUNS = ["Burger", "Wings", "Tacos", "Flatbread", "Nachos", "Chicken Sandwich", "Pickles", "Fries",
+         "Salad", "Brisket", "Pizza", "Quesadilla", "Lemonade", "Margarita", "Old Fashioned", "Sundae"]
+EVENT_TITLES = ["Live Band Night", "Trivia Thursday", "Acoustic Sunday", "Karaoke", "Open Mic",
+                "DJ Night", "Bluegrass Jam", "Comedy Night", "Game Day Watch Party", "Line Dancing"]
+VENUE_AREAS = [("Deck", 5), ("Indoors", 4), ("Patio", 1)]
+GENRES = [("Country", 30), ("Rock", 22), ("Bluegrass", 14), ("Acoustic", 12), ("Blues", 8),
+          ("Hip Hop", 6), ("Jazz", 4), ("Metal", 4)]
+PACKAGES = [("Deck Party", 5), ("Private Room", 3), ("Full Buyout", 1), ("Birthday", 4)]
+FIRST = ["Jamie", "Alex", "Sam", "Taylor", "Jordan", "Casey", "Riley", "Morgan", "Drew", "Avery"]
+LAST = ["Smith", "Johnson", "Hatfield", "McCoy", "Blackburn", "Stanley", "Adkins", "Bentley", "Ratliff"]
+
+
+def _weighted(rng: random.Random, pairs):
+    names, weights = zip(*pairs)
+    return rng.choices(names, weights=weights)[0]
+
+
+def _recent_bias(rng: random.Random, start: datetime, end: datetime) -> datetime:
+    """A time in [start, end], denser towards `end` (the venue got busier)."""
+    return start + (end - start) * (rng.random() ** 0.5)
+
+
+def _bulk(table, rows, label: str, after=None) -> int:
+    """
+    executemany in BATCH_SIZE chunks, one transaction each; `rows` may be a
+    generator. With `after`, ids are returned and after(conn, batch, ids) runs
+    in the batch's transaction (for child rows).
+    """
+    done, batch, t0 = 0, [], time.perf_counter()
+
+    def flush():
+        nonlocal done
+        with engine.begin() as conn:
+            if after is None:
+                conn.execute(insert(table), batch)
+            else:
+                stmt = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+                after(conn, batch, conn.execute(stmt, batch).scalars().all())
+        done += len(batch)
+        batch.clear()
+        print(f"  {label}: {done:,} rows ({done / (time.perf_counter() - t0):,.0f}/s)", end="\r")
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            flush()
+    if batch:
+        flush()
+    print()
+    return done
+
+
+def _ensure_lookup(db: Session, model, rows):
+    """Get-or-create lookup rows by slug; returns {slug: id}."""
+    existing = {slug: id_ for id_, slug in db.execute(select(model.id, model.slug))}
+    for row in rows:
+        if row["slug"] not in existing:
+            obj = model(**row)
+            db.add(obj)
+            db.flush()
+            existing[row["slug"]] = obj.id
+    db.commit()
+    return existing
+
+
+def bulk_menu(rng: random.Random, n: int) -> None:
+    db = SessionLocal()
+    try:
+        categories = _ensure_lookup(db, MenuCategory, [
+            {"name": name, "slug": name.lower(), "sort_order": i}
+            for i, (name, _w) in enumerate(CATEGORIES, start=1)
+        ])
+        tags = _ensure_lookup(db, MenuTag, [
+            {"name": slug.replace("-", " "), "slug": slug, "type": kind} for slug, kind, _p in TAGS
+        ])
+        has_featured = db.scalar(select(MenuItem.id).where(MenuItem.featured_rank > 0).limit(1)) is not None
+    finally:
+        db.close()
+
+    cat_weights = [(categories[name.lower()], w) for name, w in CATEGORIES]
+
+    def items():
+        for i in range(n):
+            cat_id = _weighted(rng, cat_weights)
+            yield {
+                "name": f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}",
+                "category": "",
+                "category_id": cat_id,
+                "price": round(rng.lognormvariate(2.4, 0.4), 2),
+                "description": "Made in house. " * rng.randint(1, 4),
+                "image_url": f"/assets/images/placeholders/dish-{rng.randint(1, 3)}.jpg",
+                "available": rng.random() < 0.92,
+                # keep the homepage carousel populated after --truncate
+                "featured_rank": i + 1 if i < 3 and not has_featured else 0,
+                "allergens": "",
+                "is_favorite": False,
+            }
+
+    def tag_items(conn, batch, ids):
+        links = [
+            {"item_id": item_id, "tag_id": tags[slug]}
+            for item_id in ids
+            for slug, _kind, chance in TAGS
+            if rng.random() < chance
+        ]
+        if links:
+            conn.execute(insert(MenuItemTag.__table__), links)
+
+    _bulk(MenuItem.__table__, items(), "menu_items", after=tag_items)
+
+
+def bulk_events(rng: random.Random, n: int) -> None:
+    now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    start, end = now - timedelta(days=365 * YEARS_BACK), now + timedelta(days=365)
+    span_days = (end - start).days
+
+    def rows():
+        for _ in range(n):
+            day = start + timedelta(days=rng.randrange(span_days))
+            # most shows land Thu-Sat
+            if rng.random() < 0.7:
+                day += timedelta(days=(rng.choice((3, 4, 5)) - day.weekday()) % 7)
+            begins = day.replace(hour=rng.choice((17, 18, 19, 20, 21)))
+            recurring = rng.random() < 0.02
+            yield {
+                "title": rng.choice(EVENT_TITLES),
+                "start": begins,
+                "end": begins + timedelta(hours=rng.choice((2, 3, 4))),
+                "description": "Come hang out.",
+                "image_url": "/assets/images/placeholders/event.jpg",
+                "venue_area": _weighted(rng, VENUE_AREAS),
+                "is_published": rng.random() < 0.95,
+                "ticket_url": "",
+                "rrule": "FREQ=WEEKLY;COUNT=12" if recurring else None,
+                "exdates": None,
+            }
+
+    _bulk(Event.__table__, rows(), "events")
+
+
+def _person(rng: random.Random, i: int):
+    first, last = rng.choice(FIRST), rng.choice(LAST)
+    return f"{first} {last}", f"{first.lower()}.{last.lower()}{i}@example.com", f"(606) 555-{rng.randrange(10000):04d}"
+
+
+def _status(rng: random.Random, submitted: datetime, now: datetime, recent, old) -> str:
+    # recent submissions are mostly untouched, old ones mostly resolved
+    return _weighted(rng, recent if (now - submitted).days < 30 else old)
+
+
+def bulk_rentals(rng: random.Random, n: int) -> None:
+    now = datetime.utcnow()
+    start = now - timedelta(days=365 * YEARS_BACK)
+
+    def rows():
+        for i in range(n):
+            submitted = _recent_bias(rng, start, now)
+            name, email, phone = _person(rng, i)
+            yield {
+                "name": name, "email": email, "phone": phone,
+                "date": submitted + timedelta(days=rng.randint(7, 120)),
+                "package": _weighted(rng, PACKAGES),
+                "message": "Looking to book for a group." if rng.random() < 0.6 else None,
+                "submitted_at": submitted,
+                "venue_area": _weighted(rng, VENUE_AREAS),
+                "party_size": str(rng.choice((10, 20, 30, 50, 75, 100, 150))),
+                "status": _status(rng, submitted, now,
+                                  [("new", 6), ("pending", 3), ("approved", 1)],
+                                  [("closed", 6), ("approved", 3), ("pending", 1)]),
+            }
+
+    _bulk(Rental.__table__, rows(), "rentals")
+
+
+def bulk_musicians(rng: random.Random, n: int) -> None:
+    now = datetime.utcnow()
+    start = now - timedelta(days=365 * YEARS_BACK)
+
+    def rows():
+        for i in range(n):
+            submitted = _recent_bias(rng, start, now)
+            name, email, phone = _person(rng, i)
+            handle = name.lower().replace(" ", "")
+            yield {
+                "name": name, "email": email, "phone": phone,
+                "link": f"https://youtube.com/@{handle}",
+                "message": "We'd love to play your deck." if rng.random() < 0.5 else None,
+                "submitted_at": submitted,
+                "genre": _weighted(rng, GENRES),
+                "socials_json": {"instagram": f"@{handle}"} if rng.random() < 0.4 else None,
+                "file_url": "",
+                "status": _status(rng, submitted, now,
+                                  [("new", 7), ("contacted", 3)],
+                                  [("closed", 5), ("contacted", 3), ("booked", 2)]),
+            }
+
+    _bulk(MusicianApp.__table__, rows(), "musician_applications")
+
+
+BULK_TABLES = ["menu_item_tags", "menu_items", "events", "rentals", "musician_applications"]
+
+
+def truncate_bulk_tables() -> None:
+    with engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {', '.join(BULK_TABLES)} RESTART IDENTITY CASCADE"))
+
+
+def analyze_bulk_tables() -> None:
+    with engine.begin() as conn:
+        for table in BULK_TABLES:
+            conn.execute(text(f"ANALYZE {table}"))
+
+
+def seed_bulk(counts: dict, seed: int = 606) -> None:
+    rng = random.Random(seed)
+    t0 = time.perf_counter()
+    if counts.get("items"):
+        bulk_menu(rng, counts["items"])
+    if counts.get("events"):
+        bulk_events(rng, counts["events"])
+    if counts.get("rentals"):
+        bulk_rentals(rng, counts["rentals"])
+    if counts.get("musicians"):
+        bulk_musicians(rng, counts["musicians"])
+    analyze_bulk_tables()
+    # Core inserts skip the session hooks that keep the dashboard counters
+    from app.services.counters import reconcile
+    reconcile()
+    print(f"Bulk seed complete in {time.perf_counter() - t0:.1f}s.")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--preset", choices=sorted(PRESETS), help="add synthetic bulk data of this size")
+    for key in ("items", "events", "rentals", "musicians"):
+        ap.add_argument(f"--{key}", type=int, help=f"override the preset's {key} count")
+    ap.add_argument("--seed", type=int, default=606, help="random seed (same seed, same data)")
+    ap.add_argument("--truncate", action="store_true",
+                    help="empty menu items, events, rentals and musician apps first")
+    args = ap.parse_args(argv)
+
     ensure_tables()
+    if args.truncate:
+        truncate_bulk_tables()
     db = SessionLocal()
     try:
         seed_site(db)
@@ -112,5 +397,12 @@ def main():
     finally:
         db.close()
 
+    counts = dict(PRESETS.get(args.preset, {}))
+    for key in ("items", "events", "rentals", "musicians"):
+        if getattr(args, key) is not None:
+            counts[key] = getattr(args, key)
+    if any(counts.values()):
+        seed_bulk(counts, args.seed)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,24 @@
+# tests/conftest.py
+"""
+Shared fixtures. Settings need a DATABASE_URL to import the app; engines
+connect lazily, so the placeholder is never dialled. Tests that touch the
+database use an in-memory SQLite session factory (`sqlite_sessions`).
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "postgresql+psycopg://test@localhost/test")
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+@pytest.fixture
+def sqlite_sessions():
+    """sessionmaker on a fresh in-memory database; create the tables you need on `.kw["bind"]`."""
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    try:
+        yield sessionmaker(bind=engine, autoflush=False, future=True)
+    finally:
+        engine.dispose()
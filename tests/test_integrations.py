@@ -0,0 +1,86 @@
+# tests/test_integrations.py
+"""Stale-while-revalidate and single-flight refreshes, on the fake providers."""
+import asyncio
+import time
+
+import pytest
+
+from app.services import integrations as mod
+from app.services.integrations import FakeProvider, integrations, store, use_fake_providers
+
+
+class SlowFake(FakeProvider):
+    """A fake whose fetch takes a moment, so a burst of reads overlaps it."""
+
+    async def fetch(self, client, site):
+        await asyncio.sleep(0.05)
+        return await super().fetch(client, site)
+
+
+@pytest.fixture
+def weather(monkeypatch):
+    async def no_site_settings():
+        return {}
+
+    monkeypatch.setattr(mod, "get_cached_site_settings_async", no_site_settings)
+    monkeypatch.setattr(mod, "get_client", lambda: None)   # fakes never touch the network
+    use_fake_providers()
+    provider = SlowFake("weather", {"temp": 70, "description": "clear sky"}, ttl=60)
+    integrations.register(provider)
+    yield provider
+    # back to what the app registered at import
+    use_fake_providers() if mod.settings.integrations_fake else mod.use_real_providers()
+    store.clear()
+
+
+def test_fake_providers_serve_canned_data(weather):
+    async def go():
+        for name in mod.FAKE_DATA:
+            await integrations.refresh(name)
+        return {name: integrations.peek(name) for name in mod.FAKE_DATA}
+
+    data = asyncio.run(go())
+    assert data["places"] == mod.FAKE_DATA["places"]
+    assert data["weather"] == {"temp": 70, "description": "clear sky"}
+
+
+def test_burst_of_reads_fetches_once(weather):
+    async def go():
+        # nothing cached: every read answers None at once, only the first schedules
+        first = [integrations.peek("weather") for _ in range(20)]
+        await asyncio.sleep(0)   # let the scheduled refresh start
+        joined = await asyncio.gather(*(integrations.refresh("weather") for _ in range(20)))
+        return first, joined, integrations.peek("weather")
+
+    first, joined, after = asyncio.run(go())
+    assert first == [None] * 20
+    assert joined == [{"temp": 70, "description": "clear sky"}] * 20
+    assert after == {"temp": 70, "description": "clear sky"}
+    assert weather.calls == 1
+
+
+def test_stale_entry_is_served_while_revalidating(weather):
+    async def go():
+        await integrations.refresh("weather")
+        # age the entry past its ttl (it's kept for stale_ttl)
+        data, _ = store.get("weather")
+        store.set("weather", (data, time.time() - weather.ttl - 1), tags=("site",))
+        weather.data = {"temp": 55, "description": "rain"}
+
+        stale = [integrations.peek("weather") for _ in range(10)]   # answered at once
+        await asyncio.sleep(0)
+        await integrations.refresh("weather")                       # joins the one refresh
+        return stale, integrations.peek("weather")
+
+    stale, fresh = asyncio.run(go())
+    assert stale == [{"temp": 70, "description": "clear sky"}] * 10
+    assert fresh == {"temp": 55, "description": "rain"}
+    assert weather.calls == 2   # the initial fill plus exactly one revalidation
+
+
+def test_provider_must_implement_fetch():
+    class Incomplete(mod.Provider):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,130 @@
+# tests/test_outbox_dispatcher.py
+"""OutboxDispatcher against a local stand-in for Formspree (httpx.MockTransport)."""
+import asyncio
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+from app.models.outbox import OutboxMessage
+from app.services import forms
+
+ENDPOINTS = {"musician": "http://forms.test/musician", "rental": "http://forms.test/rental"}
+
+
+@pytest.fixture
+def outbox(sqlite_sessions, monkeypatch):
+    OutboxMessage.__table__.create(sqlite_sessions.kw["bind"])
+    monkeypatch.setattr(forms, "SessionLocal", sqlite_sessions)
+    monkeypatch.setattr(forms, "endpoint_for", ENDPOINTS.get)
+    return sqlite_sessions
+
+
+class FakeFormspree:
+    """Answers every POST with `status`, recording bodies and per-endpoint concurrency."""
+
+    def __init__(self, status: int = 200, delay: float = 0.0):
+        self.status = status
+        self.delay = delay
+        self.received = defaultdict(list)
+        self.in_flight = Counter()
+        self.peak = Counter()
+        self.peak_total = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.in_flight[path] += 1
+        self.peak[path] = max(self.peak[path], self.in_flight[path])
+        self.peak_total = max(self.peak_total, sum(self.in_flight.values()))
+        try:
+            await asyncio.sleep(self.delay)
+            self.received[path].append({k: v[0] for k, v in parse_qs(request.content.decode()).items()})
+            return httpx.Response(self.status, json={"ok": self.status < 300})
+        finally:
+            self.in_flight[path] -= 1
+
+
+def add(sessions, kind: str, n: int = 1):
+    db = sessions()
+    try:
+        for i in range(n):
+            forms.enqueue(db, kind, {"name": f"{kind}-{i}"})
+        db.commit()
+    finally:
+        db.close()
+
+
+def rows(sessions):
+    db = sessions()
+    try:
+        return db.query(OutboxMessage).order_by(OutboxMessage.id).all()
+    finally:
+        db.close()
+
+
+def drain(server: FakeFormspree) -> int:
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(server)) as client:
+            return await forms.OutboxDispatcher(client=client).drain_once()
+    return asyncio.run(go())
+
+
+def test_delivers_due_messages(outbox):
+    add(outbox, "musician", 2)
+    add(outbox, "rental")
+    server = FakeFormspree()
+
+    assert drain(server) == 3
+
+    assert [m["name"] for m in server.received["/musician"]] == ["musician-0", "musician-1"]
+    assert [m["name"] for m in server.received["/rental"]] == ["rental-0"]
+    assert {(r.status, r.attempts) for r in rows(outbox)} == {("sent", 1)}
+    assert drain(server) == 0   # nothing left to send
+
+
+def test_server_error_retries_with_backoff(outbox):
+    add(outbox, "rental")
+    before = datetime.utcnow()
+
+    assert drain(FakeFormspree(status=503)) == 1
+
+    (row,) = rows(outbox)
+    assert (row.status, row.attempts) == ("pending", 1)
+    assert "HTTP 503" in row.last_error
+    # first retry: BACKOFF_BASE seconds, +-20% jitter
+    wait = row.next_attempt_at - before
+    assert timedelta(seconds=forms.BACKOFF_BASE * 0.8) <= wait <= timedelta(seconds=forms.BACKOFF_BASE * 1.2 + 1)
+
+    # not due yet
+    server = FakeFormspree()
+    assert drain(server) == 0 and not server.received
+
+    db = outbox()
+    db.get(OutboxMessage, row.id).next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    db.close()
+    assert drain(server) == 1
+    (row,) = rows(outbox)
+    assert (row.status, row.attempts, row.last_error) == ("sent", 2, None)
+
+
+def test_client_error_is_not_retried(outbox):
+    add(outbox, "musician")
+    drain(FakeFormspree(status=422))
+    (row,) = rows(outbox)
+    assert row.status == "dead"
+
+
+def test_batches_concurrently_per_destination(outbox):
+    add(outbox, "musician", 10)
+    add(outbox, "rental", 10)
+    server = FakeFormspree(delay=0.02)
+
+    assert drain(server) == 20
+
+    assert len(server.received["/musician"]) == len(server.received["/rental"]) == 10
+    # each endpoint is capped, and the two are sent in parallel
+    assert server.peak["/musician"] == server.peak["/rental"] == forms.PER_DESTINATION
+    assert server.peak_total == 2 * forms.PER_DESTINATION